@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Prediction, TelegramProfile
+from .models import BulkPrediction, Prediction, TelegramProfile
 
 admin.site.register(Prediction)
-admin.site.register(TelegramProfile)
\ No newline at end of file
+admin.site.register(TelegramProfile)
+admin.site.register(BulkPrediction)
\ No newline at end of file
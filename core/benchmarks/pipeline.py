@@ -0,0 +1,159 @@
+"""
+Stage-level benchmark of the prediction pipeline.
+
+Runs every stage of ``StockPredictor.run`` separately (fetch, preprocess,
+load_model, predict, metrics, plots, db_save) for a number of tickers,
+history lengths and concurrency levels, on offline data from the synthetic
+market data source. The evaluation store and result cache are bypassed so
+each run pays for the full computation.
+
+Driven by ``manage.py benchmark_predictor``, which writes the results as JSON
+that can be compared between commits.
+"""
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from django.db import connection
+
+from core.models import Prediction
+from core.services import model_registry
+from core.services.predictor import StockPredictor
+from core.services.price_store import PriceStore
+
+STAGES = ("fetch", "preprocess", "load_model", "predict", "metrics", "plots", "db_save")
+
+
+@contextmanager
+def timed(timings, stage):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+
+def time_stages(ticker, history_bars, user, source="synthetic"):
+    """Run the pipeline once for ``ticker`` and return seconds spent per stage."""
+    timings = {}
+    predictor = StockPredictor(ticker, source=source)
+    # Enough years of history for the requested number of bars (~252 per year)
+    store = PriceStore(source=source, lookback_years=math.ceil(history_bars / 252) + 1)
+
+    with timed(timings, "fetch"):
+        predictor.df = store.history(ticker).iloc[-history_bars:]
+    with timed(timings, "preprocess"):
+        X, y = predictor.preprocess()
+    with timed(timings, "load_model"):
+        predictor.load_model()
+    with timed(timings, "predict"):
+        next_day = predictor.predict_next_day_async()
+        y_pred = predictor.predict(X)
+        next_day_price = next_day.result()
+    with timed(timings, "metrics"):
+        mse, rmse, r2 = predictor.calculate_metrics(y, y_pred)
+    with timed(timings, "plots"):
+        plot_urls = predictor.generate_plots(y, y_pred)
+    with timed(timings, "db_save"):
+        Prediction.objects.create(
+            user=user,
+            ticker=predictor.ticker,
+            metrics={
+                "next_day_price": round(next_day_price, 2),
+                "mse": round(float(mse), 3),
+                "rmse": round(float(rmse), 3),
+                "r2": round(float(r2), 3),
+            },
+            plot_urls=plot_urls,
+        )
+    return timings
+
+
+def summarize(samples):
+    """Median, p95, min and max in milliseconds for each stage."""
+    summary = {}
+    for stage in STAGES:
+        values = np.array([sample[stage] for sample in samples]) * 1000
+        summary[stage] = {
+            "median_ms": round(float(np.median(values)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3),
+            "min_ms": round(float(values.min()), 3),
+            "max_ms": round(float(values.max()), 3),
+        }
+    return summary
+
+
+def run_case(tickers, history_bars, concurrency, user, repeat=3, warmup=1, source="synthetic"):
+    """
+    Benchmark ``tickers`` at one history length and concurrency level.
+
+    ``warmup`` untimed rounds fill the price store and model registry first,
+    so the timed rounds measure the steady state of a long-running worker.
+    """
+    def job(ticker):
+        try:
+            return time_stages(ticker, history_bars, user, source)
+        finally:
+            # Worker threads each open their own database connection
+            connection.close()
+
+    samples = []
+    wall = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for round_ in range(warmup + repeat):
+            start = time.perf_counter()
+            results = list(pool.map(job, tickers))
+            if round_ >= warmup:
+                wall += time.perf_counter() - start
+                samples.extend(results)
+
+    runs = len(tickers) * repeat
+    return {
+        "tickers": len(tickers),
+        "history_bars": history_bars,
+        "concurrency": concurrency,
+        "runs": runs,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(runs / wall, 3) if wall else None,
+        "stages": summarize(samples),
+    }
+
+
+def run_suite(ticker_count, history_lengths, concurrency_levels, user,
+              repeat=3, warmup=1, source="synthetic"):
+    """Run every combination of history length and concurrency level."""
+    tickers = [f"BENCH{i}" for i in range(ticker_count)]
+    return {
+        "model_version": model_registry.model_version(),
+        "source": source,
+        "repeat": repeat,
+        "cases": [
+            run_case(tickers, bars, concurrency, user, repeat, warmup, source)
+            for bars in history_lengths
+            for concurrency in concurrency_levels
+        ],
+    }
+
+
+def compare(baseline, current, max_regression):
+    """
+    Compare median stage times of matching cases.
+
+    Returns a list of ``(case, stage, baseline_ms, current_ms, ratio)`` for
+    every stage slower than ``1 + max_regression`` times the baseline.
+    """
+    def key(case):
+        return case["tickers"], case["history_bars"], case["concurrency"]
+
+    baseline_cases = {key(case): case for case in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        before = baseline_cases.get(key(case))
+        if before is None:
+            continue
+        for stage in STAGES:
+            old = before["stages"][stage]["median_ms"]
+            new = case["stages"][stage]["median_ms"]
+            if old > 0 and new / old > 1 + max_regression:
+                regressions.append((key(case), stage, old, new, round(new / old, 2)))
+    return regressions
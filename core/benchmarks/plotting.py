@@ -0,0 +1,121 @@
+"""
+Benchmark for rendering the prediction plots.
+
+Compares the previous pyplot-based rendering of the full series with the
+per-figure Agg canvas and LTTB downsampling used by ``core.services.plotting``,
+for the two charts of one prediction on histories of ~2,500 and ~11,000 bars,
+and renders several predictions concurrently in threads.
+
+Run with::
+
+    python -m core.benchmarks.plotting
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.benchmarks.windowing import HISTORIES
+from core.services.plotting import render_line_chart
+
+
+def pyplot_charts(directory, close, actual, predicted):
+    """The previous implementation, kept here as the baseline."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig1, ax1 = plt.subplots(figsize=(10, 4))
+    ax1.plot(close)
+    ax1.set_title("Closing Price History")
+    fig1.savefig(os.path.join(directory, "history.png"))
+    plt.close(fig1)
+
+    fig2, ax2 = plt.subplots(figsize=(10, 4))
+    ax2.plot(actual, label="Actual")
+    ax2.plot(predicted, label="Predicted")
+    ax2.legend()
+    ax2.set_title("Actual vs Predicted Prices")
+    fig2.savefig(os.path.join(directory, "pred_vs_actual.png"))
+    plt.close(fig2)
+
+
+def canvas_charts(directory, close, actual, predicted):
+    steps = np.arange(len(actual))
+    render_line_chart(
+        os.path.join(directory, "history.png"),
+        [(None, np.arange(len(close)), close)],
+        "Closing Price History",
+    )
+    render_line_chart(
+        os.path.join(directory, "pred_vs_actual.png"),
+        [("Actual", steps, actual), ("Predicted", steps, predicted)],
+        "Actual vs Predicted Prices",
+    )
+
+
+def synthetic_series(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    actual = close[60:]
+    predicted = actual * (1 + rng.normal(0, 0.01, len(actual)))
+    return close, actual, predicted
+
+
+def measure(func, series, repeat=3):
+    with tempfile.TemporaryDirectory() as directory:
+        func(directory, *series)  # font cache and backend warm-up
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(directory, *series)
+            seconds.append(time.perf_counter() - start)
+        tracemalloc.start()
+        func(directory, *series)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return min(seconds), peak
+
+
+def measure_threads(series, workers=4):
+    """Render ``workers`` predictions at once; only possible without pyplot."""
+    with tempfile.TemporaryDirectory() as directory:
+        dirs = [os.path.join(directory, str(i)) for i in range(workers)]
+        for d in dirs:
+            os.makedirs(d)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda d: canvas_charts(d, *series), dirs))
+        return time.perf_counter() - start
+
+
+def run():
+    results = []
+    for name, rows in HISTORIES.items():
+        series = synthetic_series(rows)
+        pyplot_s, pyplot_peak = measure(pyplot_charts, series)
+        canvas_s, canvas_peak = measure(canvas_charts, series)
+        results.append({
+            "history": name,
+            "rows": rows,
+            "pyplot_ms": round(pyplot_s * 1000, 1),
+            "canvas_ms": round(canvas_s * 1000, 1),
+            "speedup": round(pyplot_s / canvas_s, 1),
+            "pyplot_peak_kib": round(pyplot_peak / 1024, 1),
+            "canvas_peak_kib": round(canvas_peak / 1024, 1),
+            "threads_4_ms": round(measure_threads(series) * 1000, 1),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(
+            f"{row['history']:>4} ({row['rows']} rows): "
+            f"pyplot {row['pyplot_ms']} ms / {row['pyplot_peak_kib']} KiB peak, "
+            f"canvas+LTTB {row['canvas_ms']} ms / {row['canvas_peak_kib']} KiB peak "
+            f"({row['speedup']}x faster); 4 predictions in threads {row['threads_4_ms']} ms"
+        )
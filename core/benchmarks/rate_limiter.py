@@ -0,0 +1,104 @@
+"""
+Concurrency benchmark for the rate limiter.
+
+Many threads hammer a single key with a limit far below the number of
+attempts. The atomic sliding-window script must admit exactly ``limit``
+requests; the previous read-modify-write list implementation is run as a
+baseline to show how many requests leak through under the same load.
+
+Run against a local Redis with::
+
+    python -m core.benchmarks.rate_limiter --redis-url redis://localhost:6379/15
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import redis
+
+from core.utils.rate_limiter import RedisSlidingWindowLimiter
+
+
+class LegacyListLimiter:
+    """The previous implementation: a JSON list of ISO timestamps per key."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def check(self, key, limit, window_seconds):
+        cache_key = f"legacy_rate_limit:{key}"
+        now = datetime.now()
+        raw = self.client.get(cache_key)
+        request_data = [datetime.fromisoformat(t) for t in json.loads(raw)] if raw else []
+        window_start = now - timedelta(seconds=window_seconds)
+        request_data = [t for t in request_data if t > window_start]
+        if len(request_data) >= limit:
+            return False, 0, None
+        request_data.append(now)
+        self.client.set(cache_key, json.dumps([t.isoformat() for t in request_data]), ex=int(window_seconds))
+        return True, limit - len(request_data), None
+
+
+def hammer(limiter, threads, attempts, limit, window_seconds):
+    key = f"bench:{uuid.uuid4().hex}"
+    allowed = []
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        local_allowed, local_latencies = 0, []
+        barrier.wait()
+        for _ in range(attempts):
+            start = time.perf_counter()
+            ok, _, _ = limiter.check(key, limit, window_seconds)
+            local_latencies.append(time.perf_counter() - start)
+            local_allowed += ok
+        with lock:
+            allowed.append(local_allowed)
+            latencies.extend(local_latencies)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "checks": len(latencies),
+        "allowed": sum(allowed),
+        "limit": limit,
+        "checks_per_second": round(len(latencies) / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=float, default=60)
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url)
+    for name, limiter in (
+        ("sliding-window script", RedisSlidingWindowLimiter(client)),
+        ("legacy list", LegacyListLimiter(client)),
+    ):
+        result = hammer(limiter, args.threads, args.attempts, args.limit, args.window)
+        verdict = "OK" if result["allowed"] == result["limit"] else "LEAKED"
+        print(f"{name:>22}: {verdict} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import platform
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks.pipeline import compare, run_suite
+from core.services.data_sources import SOURCES
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Time each stage of the prediction pipeline on offline data and report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tickers',
+            type=int,
+            default=4,
+            help='Number of synthetic tickers per round',
+        )
+        parser.add_argument(
+            '--history-bars',
+            type=int,
+            nargs='+',
+            default=[1260, 2520],
+            help='History lengths (daily bars) to benchmark',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 4],
+            help='Numbers of tickers processed in parallel',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed rounds per case',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Untimed rounds per case (fills the price store and loads the model)',
+        )
+        parser.add_argument(
+            '--source',
+            choices=sorted(SOURCES),
+            default='synthetic',
+            help='Market data source; keep the default for reproducible offline runs',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the JSON results to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='Baseline JSON file from a previous run to compare median stage times against',
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=0.25,
+            help='Fail when a stage median is this fraction slower than the baseline',
+        )
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(
+            username='benchmark_predictor',
+            defaults={'email': 'benchmark@prediction.com'}
+        )
+
+        try:
+            suite = run_suite(
+                options['tickers'],
+                options['history_bars'],
+                options['concurrency'],
+                user,
+                repeat=options['repeat'],
+                warmup=options['warmup'],
+                source=options['source'],
+            )
+        except FileNotFoundError as e:
+            raise CommandError(f'Model file error: {str(e)}')
+        finally:
+            # Benchmark rows must not show up in anybody's prediction history
+            user.predictions.all().delete()
+
+        report = {
+            'commit': self.git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'inference_batching': settings.INFERENCE_BATCHING,
+            **suite,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.report_regressions(options['compare'], report, options['max_regression'])
+
+    def report_regressions(self, path, report, max_regression):
+        with open(path) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, max_regression)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(
+                f'No stage regressed by more than {max_regression:.0%} against {path}'
+            ))
+            return
+        for (tickers, bars, concurrency), stage, old, new, ratio in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'  {stage:<10} tickers={tickers} bars={bars} concurrency={concurrency}: '
+                f'{old} ms -> {new} ms ({ratio}x)'
+            ))
+        raise CommandError(f'{len(regressions)} stage(s) regressed against {path}')
+
+    @staticmethod
+    def git_commit():
+        try:
+            proc = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, cwd=settings.BASE_DIR,
+            )
+            return proc.stdout.strip() or None
+        except OSError:
+            return None
@@ -0,0 +1,41 @@
+"""
+Django management command feeding the fair queue to Celery
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services import fair_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Dispatch prediction jobs from the fair queue to Celery as workers free up'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Dispatch what the workers can take now and exit'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Polls the broker queues and hands over the next fair-queued jobs
+        whenever fewer than FAIR_QUEUE_MAX_DISPATCHED messages are waiting
+        """
+        self.stdout.write(self.style.SUCCESS('Starting prediction dispatcher...'))
+        
+        while True:
+            try:
+                sent = fair_queue.dispatch()
+            except Exception as e:
+                logger.error(f"Error dispatching predictions: {e}")
+                sent = 0
+            if options['once']:
+                self.stdout.write(f'Dispatched {sent} jobs')
+                return
+            if not sent:
+                time.sleep(settings.FAIR_QUEUE_POLL_INTERVAL)
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules that only inference workers should ever import
+HEAVY_MODULES = ('tensorflow', 'keras', 'matplotlib', 'sklearn', 'yfinance', 'pandas')
+
+# Entry points loaded by the web server, the Telegram bot and Celery
+ENTRY_POINTS = ('zproject.urls', 'core.tasks', 'core.telegram.bot')
+
+
+class Command(BaseCommand):
+    help = 'Report import time of the web/bot entry points and fail if they load the ML stack'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of slowest imports to list',
+        )
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=None,
+            help='Fail if importing the entry points takes longer than this',
+        )
+
+    def handle(self, *args, **options):
+        # Measure in a fresh interpreter so modules already loaded here don't hide regressions
+        code = (
+            'import django, json, sys; django.setup(); '
+            f'[__import__(m) for m in {ENTRY_POINTS!r}]; '
+            'print(json.dumps(sorted(sys.modules)))'
+        )
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'zproject.settings')
+        # Keep the report independent of whether the model warm-up is enabled
+        env['WEB_MODEL_WARMUP'] = 'False'
+
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f'Importing entry points failed:\n{proc.stderr[-2000:]}')
+
+        modules = json.loads(proc.stdout.strip().splitlines()[-1])
+        timings = self.parse_importtime(proc.stderr)
+        total_ms = sum(cumulative for _, cumulative, depth in timings if depth == 0) / 1000
+
+        self.stdout.write(f'Imported {len(modules)} modules in {total_ms:.1f} ms')
+        self.stdout.write('Slowest top-level imports (cumulative):')
+        top_level = sorted((t for t in timings if t[2] == 0), key=lambda t: -t[1])
+        for name, cumulative, _ in top_level[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+        loaded = sorted(m for m in modules if m in HEAVY_MODULES)
+        if loaded:
+            raise CommandError(
+                f'Heavy modules imported on the web/bot path: {", ".join(loaded)}'
+            )
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            raise CommandError(
+                f'Import time {total_ms:.1f} ms exceeds budget of {options["budget_ms"]} ms'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✓ No heavy ML modules imported'))
+
+    @staticmethod
+    def parse_importtime(stderr):
+        """Parse ``-X importtime`` output into (module, cumulative_us, depth) tuples"""
+        timings = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            timings.append((name.strip(), int(cumulative), depth))
+        return timings
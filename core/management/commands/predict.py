@@ -1,7 +1,10 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from core.models import Prediction
-from core.services.predictor import StockPredictor
+from core.models import BulkPrediction, Prediction
+from core.services import bulk
+from core.services.cache_warming import SYSTEM_USERNAME
+from core.services.data_sources import SOURCES
+from core.services.predictor import predict_many
 
 User = get_user_model()
 
@@ -20,6 +23,32 @@ class Command(BaseCommand):
             action='store_true',
             help='Run predictions for all predefined tickers',
         )
+        parser.add_argument(
+            '--tickers-file',
+            help='File with the tickers to predict (whitespace or comma separated, # comments)',
+        )
+        parser.add_argument(
+            '--parallel',
+            type=int,
+            default=1,
+            help='Predict batches of tickers in this many worker processes',
+        )
+        parser.add_argument(
+            '--via-celery',
+            action='store_true',
+            help='Queue the batches for the Celery cpu workers instead of running them here',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Tickers per batch in bulk mode (defaults to BULK_PREDICTION_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--source',
+            choices=sorted(SOURCES),
+            help='Market data source (defaults to the MARKET_DATA_SOURCE setting)',
+        )
 
     def handle(self, *args, **options):
         # Predefined list of tickers for --all option
@@ -27,17 +56,27 @@ class Command(BaseCommand):
         
         ticker = options.get('ticker')
         run_all = options.get('all')
+        tickers_file = options.get('tickers_file')
         
         # Validate arguments
-        if not ticker and not run_all:
-            raise CommandError('You must specify either --ticker TICKER or --all')
+        selected = [bool(ticker), bool(run_all), bool(tickers_file)]
+        if not any(selected):
+            raise CommandError('You must specify either --ticker TICKER, --all or --tickers-file FILE')
         
-        if ticker and run_all:
-            raise CommandError('You cannot use both --ticker and --all options together')
+        if sum(selected) > 1:
+            raise CommandError('You can only use one of --ticker, --all and --tickers-file')
+        
+        if tickers_file:
+            try:
+                file_tickers = bulk.read_tickers_file(tickers_file)
+            except OSError as e:
+                raise CommandError(f'Cannot read tickers file: {e}')
+            if not file_tickers:
+                raise CommandError(f'No tickers found in {tickers_file}')
         
         # Get or create a system user for management command predictions
         system_user, created = User.objects.get_or_create(
-            username='system_predictor',
+            username=SYSTEM_USERNAME,
             defaults={
                 'email': 'system@prediction.com',
                 'first_name': 'System',
@@ -51,24 +90,76 @@ class Command(BaseCommand):
             )
         
         # Determine which tickers to process
-        tickers_to_process = [ticker] if ticker else predefined_tickers
+        if tickers_file:
+            tickers_to_process = file_tickers
+        else:
+            tickers_to_process = [ticker] if ticker else predefined_tickers
+        
+        if tickers_file or options['parallel'] > 1 or options['via_celery']:
+            return self.run_bulk(tickers_to_process, system_user, options)
         
         self.stdout.write(
             self.style.SUCCESS(f'Starting predictions for: {", ".join(tickers_to_process)}')
         )
         
+        try:
+            # All tickers share stacked forward passes through the model
+            results, errors = predict_many(tickers_to_process, source=options.get('source'))
+        except FileNotFoundError as e:
+            # Handle model file not found
+            raise CommandError(f'Model file error: {str(e)}')
+        
         for ticker_symbol in tickers_to_process:
-            self.run_prediction(ticker_symbol, system_user)
+            ticker_symbol = ticker_symbol.upper()
+            if ticker_symbol in results:
+                self.save_prediction(ticker_symbol, results[ticker_symbol], system_user)
+            else:
+                self.report_error(ticker_symbol, errors[ticker_symbol])
     
-    def run_prediction(self, ticker, user):
-        """Run prediction for a single ticker and save to database"""
-        try:
-            self.stdout.write(f'\nProcessing {ticker}...')
-            
-            # Create predictor instance and run prediction
-            predictor = StockPredictor(ticker)
-            result = predictor.run()
+    def run_bulk(self, tickers, user, options):
+        """Predict ``tickers`` in batches and record the outcome in a BulkPrediction"""
+        record = BulkPrediction.objects.create(
+            user=user,
+            tickers=[t.upper() for t in dict.fromkeys(tickers)]
+        )
+        batches = len(bulk.shard(record.tickers, options['batch_size']))
+        
+        if options['via_celery']:
+            from core.tasks import submit_bulk_prediction
             
+            # Batches go through the fair queue's batch tier, behind API and Telegram work
+            submit_bulk_prediction(record, options['batch_size'], options.get('source'))
+            self.stdout.write(self.style.SUCCESS(
+                f'Queued bulk prediction {record.id}: {len(record.tickers)} tickers in {batches} batches'
+            ))
+            return
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Starting bulk prediction {record.id}: {len(record.tickers)} tickers in {batches} batches, '
+            f'{max(options["parallel"], 1)} process(es)'
+        ))
+        record = bulk.run_local(
+            record,
+            parallel=options['parallel'],
+            batch_size=options['batch_size'],
+            source=options.get('source')
+        )
+        
+        for ticker_symbol in record.tickers:
+            if ticker_symbol in record.results:
+                result = record.results[ticker_symbol]
+                self.stdout.write(
+                    f'✓ {ticker_symbol}: ${result["next_day_price"]} (prediction {result["prediction_id"]})'
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f'✗ {ticker_symbol}: {record.errors.get(ticker_symbol)}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'\nBulk prediction {record.id}: {len(record.results)} succeeded, {len(record.errors)} failed'
+        ))
+    
+    def save_prediction(self, ticker, result, user):
+        """Save a finished prediction to the database and print it"""
+        try:
             # Save prediction to database
             prediction = Prediction.objects.create(
                 user=user,
@@ -84,7 +175,7 @@ class Command(BaseCommand):
             
             # Print results to console
             self.stdout.write(
-                self.style.SUCCESS(f'✓ Prediction completed for {ticker}')
+                self.style.SUCCESS(f'\n✓ Prediction completed for {ticker}')
             )
             self.stdout.write(f'  Ticker: {result["ticker"]}')
             self.stdout.write(f'  Predicted next-day price: ${result["next_day_price"]}')
@@ -94,18 +185,18 @@ class Command(BaseCommand):
             self.stdout.write(f'  Plot URLs: {", ".join(result["plot_urls"])}')
             self.stdout.write(f'  Saved to database with ID: {prediction.id}')
             
-        except ValueError as e:
+        except Exception as e:
+            self.report_error(ticker, e)
+    
+    def report_error(self, ticker, error):
+        """Print why a ticker could not be predicted"""
+        if isinstance(error, ValueError):
             # Handle invalid ticker or data fetch errors
             self.stdout.write(
-                self.style.ERROR(f'✗ Error processing {ticker}: {str(e)}')
-            )
-        except FileNotFoundError as e:
-            # Handle model file not found
-            self.stdout.write(
-                self.style.ERROR(f'✗ Model file error for {ticker}: {str(e)}')
+                self.style.ERROR(f'\n✗ Error processing {ticker}: {str(error)}')
             )
-        except Exception as e:
+        else:
             # Handle any other unexpected errors
             self.stdout.write(
-                self.style.ERROR(f'✗ Unexpected error processing {ticker}: {str(e)}')
+                self.style.ERROR(f'\n✗ Unexpected error processing {ticker}: {str(error)}')
             )
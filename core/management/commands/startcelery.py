@@ -1,6 +1,9 @@
+import os
 import subprocess
 import sys
-from django.core.management.base import BaseCommand
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
@@ -12,11 +15,20 @@ class Command(BaseCommand):
             default='INFO',
             help='Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)'
         )
+        parser.add_argument(
+            '--role',
+            choices=['io', 'cpu', 'dispatcher', 'all'],
+            default='all',
+            help='Worker role: io (thread pool for network stages), cpu (prefork '
+                 'pool for inference and plotting), dispatcher (feeds the fair '
+                 'queue to the workers) or all (one of each)'
+        )
         parser.add_argument(
             '--concurrency',
             type=int,
             default=None,
-            help='Number of worker processes/threads'
+            help='Number of worker processes/threads (defaults depend on the role; '
+                 'needs a single --role)'
         )
         parser.add_argument(
             '--beat',
@@ -25,29 +37,62 @@ class Command(BaseCommand):
         )
         parser.add_argument(
             '--queue',
-            default='celery',
-            help='Queue to consume from'
+            default=None,
+            help='Queues to consume from, overriding the role\'s (needs a single --role)'
         )
 
-    def handle(self, *args, **options):
-        cmd = [sys.executable, '-m', 'celery', '-A', 'zproject', 'worker']
-        
+    def worker_command(self, role, options):
+        if role == 'io':
+            pool, queues = 'threads', 'io'
+            concurrency = settings.CELERY_IO_CONCURRENCY
+        else:
+            # Unrouted tasks stay on the default queue, served by the cpu worker
+            pool, queues = 'prefork', 'cpu,celery'
+            concurrency = settings.CELERY_CPU_CONCURRENCY or os.cpu_count() or 1
+
+        cmd = [sys.executable, '-m', 'celery', '-A', 'zproject', 'worker', '-n', f'{role}@%h']
+
         if options['loglevel']:
             cmd.extend(['--loglevel', options['loglevel']])
-        
-        if options['concurrency']:
-            cmd.extend(['--concurrency', str(options['concurrency'])])
-        
-        if options['queue']:
-            cmd.extend(['-Q', options['queue']])
-        
-        if options['beat']:
+
+        cmd.extend(['--pool', pool])
+        cmd.extend(['--concurrency', str(options['concurrency'] or concurrency)])
+        cmd.extend(['-Q', options['queue'] or queues])
+
+        if options['beat'] and role == 'io':
             cmd.extend(['--beat'])
-        
-        self.stdout.write(self.style.SUCCESS(f'Starting Celery worker: {" ".join(cmd)}'))
-        
+
+        return cmd
+
+    def handle(self, *args, **options):
+        if options['role'] == 'all' and (options['concurrency'] or options['queue']):
+            # One value cannot fit both the thread-pool and the prefork worker
+            raise CommandError('--concurrency and --queue apply to one worker; pass --role io or --role cpu')
+
+        roles = ['io', 'cpu', 'dispatcher'] if options['role'] == 'all' else [options['role']]
+        if options['beat'] and 'io' not in roles:
+            roles = roles + ['beat']
+
+        processes = []
+        for role in roles:
+            if role == 'beat':
+                cmd = [sys.executable, '-m', 'celery', '-A', 'zproject', 'beat', '--loglevel', options['loglevel']]
+            elif role == 'dispatcher':
+                cmd = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'dispatchpredictions']
+            else:
+                cmd = self.worker_command(role, options)
+            self.stdout.write(self.style.SUCCESS(f'Starting Celery {role}: {" ".join(cmd)}'))
+            processes.append(subprocess.Popen(cmd))
+
         try:
-            subprocess.call(cmd)
+            # Exit as soon as any worker does, so a supervisor restarts the set
+            while all(process.poll() is None for process in processes):
+                time.sleep(1)
         except KeyboardInterrupt:
             self.stdout.write(self.style.WARNING('Celery worker stopped'))
             sys.exit(0)
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.terminate()
+                    process.wait()
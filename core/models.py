@@ -10,9 +10,32 @@ class Prediction(models.Model):
     metrics = models.JSONField()
     plot_urls = models.JSONField()
     
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created"], name="prediction_user_created_idx"),
+        ]
+    
     def __str__(self):
         return f"{self.ticker} {self.created}"
     
+class BulkPrediction(models.Model):
+    """One bulk run over a ticker list, with the outcome of every ticker."""
+    RUNNING = "running"
+    COMPLETED = "completed"
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bulk_predictions")
+    tickers = models.JSONField()
+    status = models.CharField(max_length=20, default=RUNNING)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # ticker -> {"prediction_id", "next_day_price"}
+    results = models.JSONField(default=dict)
+    # ticker -> error message
+    errors = models.JSONField(default=dict)
+    
+    def __str__(self):
+        return f"Bulk prediction of {len(self.tickers)} tickers {self.created}"
+    
 class TelegramProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="telegram_profile")
     chat_id = models.CharField(max_length=100, unique=True)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class PredictionCursorPagination(CursorPagination):
+    """
+    Newest-first pages over a user's predictions.
+
+    A cursor encodes the position in ``created`` order, so every page is an
+    index range scan on ``(user, created)`` however deep the client pages,
+    and rows added meanwhile never shift or repeat entries.
+    """
+    ordering = "-created"
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        # Read per request so the sizes follow settings overrides; DRF
+        # assigns page_size itself, so these cannot be properties
+        self.page_size = settings.PREDICTIONS_PAGE_SIZE
+        self.max_page_size = settings.PREDICTIONS_MAX_PAGE_SIZE
@@ -0,0 +1,146 @@
+"""
+Admission control for prediction requests.
+
+Before new work is accepted the current load is compared with per-channel
+limits: the number of predictions waiting (in the fair queue and in the
+broker queues that run predictions), and the number of predictions in
+flight (running in a cpu worker or synchronously in a web process). Over
+either limit the request is degraded to a cached result when one exists, or
+rejected with a ``retry_after`` hint, instead of growing the backlog every
+user waits on.
+
+Reading the load costs a few Redis round trips; it is cached in the process
+for ``ADMISSION_CACHE_SECONDS`` so bursts of requests share one reading.
+When Redis cannot be reached requests are admitted.
+"""
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import fair_queue
+from ..utils.redis_client import get_broker_redis, get_redis, redis_cache_configured
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_KEY = "admission:in_flight"
+
+Load = namedtuple("Load", ["queued", "in_flight"])
+Decision = namedtuple("Decision", ["allowed", "retry_after", "reason"])
+
+_cached = None
+_cached_at = 0.0
+_lock = threading.Lock()
+
+
+def is_prediction_task(name):
+    """Whether task ``name`` is routed to one of the ``ADMISSION_QUEUES``."""
+    return settings.CELERY_TASK_ROUTES.get(name, {}).get("queue") in settings.ADMISSION_QUEUES
+
+
+def read_load():
+    """Query the fair queue backlog, the broker queue lengths and the in-flight set."""
+    queued = fair_queue.pending()
+    queued += sum(get_broker_redis().llen(queue) for queue in settings.ADMISSION_QUEUES)
+    in_flight = 0
+    if redis_cache_configured():
+        client = get_redis()
+        # Entries of crashed workers expire instead of counting forever
+        client.zremrangebyscore(IN_FLIGHT_KEY, 0, time.time() - settings.ADMISSION_IN_FLIGHT_TTL)
+        in_flight = client.zcard(IN_FLIGHT_KEY)
+    return Load(queued, in_flight)
+
+
+def current_load():
+    """Return the load, read at most once per ``ADMISSION_CACHE_SECONDS``; ``None`` if unknown."""
+    global _cached, _cached_at
+    with _lock:
+        if time.monotonic() - _cached_at < settings.ADMISSION_CACHE_SECONDS:
+            return _cached
+        try:
+            _cached = read_load()
+        except Exception as e:
+            logger.warning(f"Could not read prediction load, admitting requests: {e}")
+            _cached = None
+        _cached_at = time.monotonic()
+        return _cached
+
+
+def reset():
+    """Forget the cached load (tests, or after changing limits)."""
+    global _cached, _cached_at
+    with _lock:
+        _cached, _cached_at = None, 0.0
+
+
+def admit(channel):
+    """
+    Decide whether to accept a new prediction on ``channel`` ("api" or "telegram").
+
+    Returns:
+        Decision: ``allowed``, plus for rejections a ``retry_after`` in seconds
+        that grows with how far the load is over the limit, and the ``reason``
+    """
+    if not settings.ADMISSION_CONTROL:
+        return Decision(True, 0, None)
+    limits = settings.ADMISSION_LIMITS[channel]
+    load = current_load()
+    if load is None:
+        return Decision(True, 0, None)
+
+    overload = 0.0
+    reasons = []
+    for name, value in load._asdict().items():
+        limit = limits.get(f"max_{name}")
+        if limit and value >= limit:
+            overload = max(overload, value / limit)
+            reasons.append(f"{value} {name.replace('_', ' ')} (limit {limit})")
+    if not reasons:
+        return Decision(True, 0, None)
+    retry_after = min(math.ceil(settings.ADMISSION_RETRY_AFTER * overload), settings.ADMISSION_MAX_RETRY_AFTER)
+    return Decision(False, retry_after, ", ".join(reasons))
+
+
+def task_started(task_id):
+    try:
+        get_redis().zadd(IN_FLIGHT_KEY, {task_id: time.time()})
+    except Exception as e:
+        logger.warning(f"Could not record in-flight prediction {task_id}: {e}")
+
+
+def task_finished(task_id):
+    try:
+        get_redis().zrem(IN_FLIGHT_KEY, task_id)
+    except Exception as e:
+        logger.warning(f"Could not clear in-flight prediction {task_id}: {e}")
+
+
+@contextmanager
+def in_flight():
+    """Count a prediction running outside Celery (synchronous API) as in flight."""
+    if not redis_cache_configured():
+        yield
+        return
+    token = f"sync:{uuid.uuid4().hex}"
+    task_started(token)
+    try:
+        yield
+    finally:
+        task_finished(token)
+
+
+# Celery signal handlers, connected in zproject.celery
+
+def on_task_prerun(task_id=None, task=None, **kwargs):
+    if redis_cache_configured() and is_prediction_task(task.name):
+        task_started(task_id)
+
+
+def on_task_postrun(task_id=None, task=None, **kwargs):
+    if redis_cache_configured() and is_prediction_task(task.name):
+        task_finished(task_id)
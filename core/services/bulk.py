@@ -0,0 +1,136 @@
+"""
+Bulk predictions over large ticker lists.
+
+The list is split into batches; every batch runs through ``predict_many`` (one
+model, stacked forward passes) and saves its Predictions. Batches run side by
+side, in local worker processes or as Celery tasks submitted through the
+fair queue's batch tier, and their per-ticker outcomes are merged into one
+``BulkPrediction`` record.
+Failures are recorded per ticker, so one bad symbol or batch never loses the
+rest of the run.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import BulkPrediction, Prediction
+from .predictor import predict_many
+
+
+def parse_tickers(text):
+    """
+    Return the tickers in ``text``, upper-cased and without duplicates.
+
+    Symbols are separated by whitespace or commas; ``#`` starts a comment.
+    """
+    tickers = []
+    for line in text.splitlines():
+        tickers.extend(t.upper() for t in re.split(r"[\s,]+", line.split("#", 1)[0]) if t)
+    return list(dict.fromkeys(tickers))
+
+
+def read_tickers_file(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_tickers(f.read())
+
+
+def shard(tickers, batch_size=None):
+    size = batch_size or settings.BULK_PREDICTION_BATCH_SIZE
+    return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+
+def run_batch(tickers, user_id, source=None):
+    """
+    Predict and save one batch.
+
+    Returns:
+        dict: ``{"results": {ticker: {"prediction_id", "next_day_price"}},
+        "errors": {ticker: message}}``, JSON-serializable for Celery
+    """
+    try:
+        results, errors = predict_many(tickers, source=source)
+    except Exception as e:
+        # Model could not be loaded: the whole batch fails
+        return {"results": {}, "errors": {t.upper(): str(e) for t in tickers}}
+
+    saved = {}
+    failed = {ticker: str(e) for ticker, e in errors.items()}
+    for ticker, result in results.items():
+        try:
+            prediction = Prediction.objects.create(
+                user_id=user_id,
+                ticker=result["ticker"],
+                metrics={
+                    "next_day_price": result["next_day_price"],
+                    "mse": result["mse"],
+                    "rmse": result["rmse"],
+                    "r2": result["r2"],
+                },
+                plot_urls=result["plot_urls"],
+            )
+        except Exception as e:
+            failed[ticker] = str(e)
+            continue
+        saved[ticker] = {"prediction_id": prediction.id, "next_day_price": result["next_day_price"]}
+    return {"results": saved, "errors": failed}
+
+
+def finish(bulk, outputs):
+    """Merge the outputs of :func:`run_batch` into ``bulk`` and mark it completed."""
+    for output in outputs:
+        bulk.results.update(output["results"])
+        bulk.errors.update(output["errors"])
+    bulk.status = BulkPrediction.COMPLETED
+    bulk.finished = timezone.now()
+    bulk.save(update_fields=["results", "errors", "status", "finished"])
+    return bulk
+
+
+def pending(bulk_id, tickers):
+    """
+    Return the record's user id and the tickers of ``tickers`` it has no
+    outcome for yet, so a redelivered batch does not predict them again.
+    """
+    user_id, results, errors = BulkPrediction.objects.values_list(
+        "user_id", "results", "errors"
+    ).get(id=bulk_id)
+    return user_id, [t for t in tickers if t.upper() not in results and t.upper() not in errors]
+
+
+def merge(bulk_id, output):
+    """
+    Add the output of one batch to the record, completing it once every
+    ticker is accounted for. Batches finishing at once are serialized by a
+    row lock; tickers that already have an outcome keep it, so merging a
+    redelivered batch twice changes nothing.
+    """
+    with transaction.atomic():
+        record = BulkPrediction.objects.select_for_update().get(id=bulk_id)
+        done = record.results.keys() | record.errors.keys()
+        record.results.update({t: r for t, r in output["results"].items() if t not in done})
+        record.errors.update({t: e for t, e in output["errors"].items() if t not in done})
+        if record.status != BulkPrediction.COMPLETED and len(record.results) + len(record.errors) >= len(record.tickers):
+            record.status = BulkPrediction.COMPLETED
+            record.finished = timezone.now()
+        record.save(update_fields=["results", "errors", "status", "finished"])
+    return record
+
+
+def run_local(bulk, parallel=1, batch_size=None, source=None):
+    """
+    Run ``bulk`` in this process, or in ``parallel`` worker processes that
+    each load the model once and take batches as they finish.
+    """
+    batches = shard(bulk.tickers, batch_size)
+    if parallel <= 1:
+        outputs = [run_batch(batch, bulk.user_id, source) for batch in batches]
+    else:
+        # Forked workers must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=parallel) as pool:
+            outputs = list(pool.map(run_batch, batches, repeat(bulk.user_id), repeat(source)))
+    return finish(bulk, outputs)
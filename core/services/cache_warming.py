@@ -0,0 +1,82 @@
+"""
+Pre-market warming of the prediction result cache.
+
+Results are cached per market session, so the first request for a ticker
+after a session closes runs the whole pipeline. Demand peaks at the open, so
+in the hours before it the most requested tickers of recent days, plus the
+``CACHE_WARM_WATCHLIST``, are predicted ahead of time: their price history is
+updated, the prediction cached and its plots rendered. The first requests of
+the day are then cache hits.
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import Prediction
+from .plot_store import resolve_plot_file
+from .predictor import StockPredictor
+from .result_cache import get_cached_prediction
+
+logger = logging.getLogger(__name__)
+
+# Owner of `manage.py predict` runs; its rows are scheduled work, not demand
+SYSTEM_USERNAME = "system_predictor"
+
+
+def in_warm_window(now=None):
+    """Whether ``now`` is a weekday between CACHE_WARM_START and MARKET_OPEN_TIME."""
+    tz = pytz.timezone(settings.MARKET_TIMEZONE)
+    now = (now or datetime.now(pytz.utc)).astimezone(tz)
+    start = time.fromisoformat(settings.CACHE_WARM_START)
+    market_open = time.fromisoformat(settings.MARKET_OPEN_TIME)
+    return now.weekday() < 5 and start <= now.time() < market_open
+
+
+def popular_tickers(limit, days=None):
+    """Most requested tickers over the last ``days``, most requested first."""
+    since = timezone.now() - timedelta(days=days or settings.CACHE_WARM_LOOKBACK_DAYS)
+    rows = (
+        Prediction.objects.filter(created__gte=since)
+        .exclude(user__username=SYSTEM_USERNAME)
+        .values("ticker")
+        .annotate(requests=Count("id"))
+        .order_by("-requests", "ticker")[:limit]
+    )
+    return [row["ticker"] for row in rows]
+
+
+def warm_targets():
+    """The watchlist followed by the popular tickers, at most CACHE_WARM_MAX_TICKERS."""
+    limit = settings.CACHE_WARM_MAX_TICKERS
+    watchlist = [t.strip().upper() for t in settings.CACHE_WARM_WATCHLIST.split(",") if t.strip()]
+    tickers = list(dict.fromkeys(watchlist + [t.upper() for t in popular_tickers(limit)]))
+    return tickers[:limit]
+
+
+def lanes(tickers, concurrency=None):
+    """
+    Deal ``tickers`` round-robin into at most ``concurrency`` lanes. Each lane
+    is warmed sequentially, so no more than ``concurrency`` predictions run at
+    once and the rest of the workers stay free for live requests.
+    """
+    count = max(1, min(concurrency or settings.CACHE_WARM_CONCURRENCY, len(tickers)))
+    return [tickers[i::count] for i in range(count)]
+
+
+def warm_ticker(ticker):
+    """
+    Cache the prediction of ``ticker`` for the last closed session and render
+    its plots. Does nothing but a cache lookup when it is already warm.
+    """
+    result = get_cached_prediction(
+        ticker,
+        compute=lambda: StockPredictor(ticker).run(),
+        allow_stale=False
+    )
+    for plot_url in result["plot_urls"]:
+        resolve_plot_file(plot_url)
+    return result
@@ -0,0 +1,74 @@
+"""
+Persistent per-ticker evaluation results.
+
+For every ticker and model version the store keeps the model's prediction for
+each historical window (keyed by the date of the bar it predicts), the
+next-day price and the metrics computed from them. The scaler range used to
+produce the predictions is recorded too: predictions stay valid while the
+range is unchanged, so after a new bar only the new windows need inference.
+A new high or low rescales every window and invalidates the stored series.
+
+Files are ``TICKER.<model_version>.npy`` holding a ``(2, n)`` float64 array
+(target date in days since the epoch, predicted price) and a JSON sidecar with
+the scaler range, next-day price and metrics.
+"""
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .data_sources import get_data_source
+
+_write_lock = threading.Lock()
+
+
+class EvaluationStore:
+    """On-disk predicted series and metrics per ticker and model version."""
+
+    def __init__(self, root=None):
+        self.root = str(root or settings.EVALUATION_STORE_DIR)
+
+    def _paths(self, ticker, version):
+        base = os.path.join(self.root, f"{ticker.upper()}.{version}")
+        return f"{base}.npy", f"{base}.json"
+
+    def load(self, ticker, version):
+        """Return ``(series, meta)`` for ``ticker``, or ``(None, {})`` if none is stored."""
+        data_path, meta_path = self._paths(ticker, version)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            return np.load(data_path), meta
+        except FileNotFoundError:
+            # Never evaluated, or replaced by another model version meanwhile
+            return None, {}
+
+    def save(self, ticker, version, series, meta):
+        """
+        Store ``series`` and ``meta`` for ``ticker`` and drop the results of
+        other model versions, which can never be served again.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(ticker, version)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with _write_lock:
+            with open(data_path + suffix, "wb") as f:
+                np.save(f, np.ascontiguousarray(series, dtype=np.float64))
+            os.replace(data_path + suffix, data_path)
+            with open(meta_path + suffix, "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + suffix, meta_path)
+
+            pattern = f"{glob.escape(ticker.upper())}.{'[0-9a-f]' * len(version)}.*"
+            for path in glob.glob(os.path.join(self.root, pattern)):
+                if path not in (data_path, meta_path) and not path.endswith(".tmp"):
+                    os.remove(path)
+
+
+def get_evaluation_store(source=None):
+    # Each data source has its own histories and therefore its own evaluations
+    name = get_data_source(source).name
+    return EvaluationStore(os.path.join(settings.EVALUATION_STORE_DIR, name))
@@ -0,0 +1,55 @@
+"""
+Redis pub/sub channel carrying prediction job events.
+
+Workers publish every job update on ``predict_events:<job_id>``; the SSE
+endpoint subscribes to that channel so a browser holds one idle connection
+per job instead of polling the status endpoint.
+"""
+import json
+import logging
+
+from django.conf import settings
+
+from core.utils.redis_client import get_redis, redis_cache_configured
+
+logger = logging.getLogger(__name__)
+
+
+def channel(job_id):
+    return f"predict_events:{job_id}"
+
+
+def publish(job):
+    """Publish a job record to its channel; failures never break the pipeline."""
+    if not redis_cache_configured():
+        return
+    try:
+        get_redis().publish(channel(job["job_id"]), json.dumps(job))
+    except Exception as e:
+        logger.warning(f"Could not publish event for job {job.get('job_id')}: {e}")
+
+
+async def subscribe(job_id, timeout):
+    """
+    Yield job records published for ``job_id`` as they arrive, or ``None``
+    after ``timeout`` seconds without a message so callers can send keepalives.
+
+    The first item is always ``None``, yielded as soon as the subscription is
+    active; reading the current job state after it cannot miss an update.
+    """
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(channel(job_id))
+        yield None
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+            if message is None:
+                yield None
+            elif message["type"] == "message":
+                yield json.loads(message["data"])
+    finally:
+        await pubsub.reset()
+        await client.connection_pool.disconnect()
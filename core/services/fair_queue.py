@@ -0,0 +1,279 @@
+"""
+Weighted fair queuing of prediction work in front of Celery.
+
+Celery's broker queues are FIFO, so one API user or Telegram chat submitting
+many predictions makes everyone behind them wait. Prediction work is
+submitted here instead: one list per tenant (a user or chat) inside a
+priority tier, served by deficit round robin (DRR), while a dispatcher hands
+jobs to Celery only as fast as the workers take them, keeping the broker
+queues short. Each active tenant gets a share proportional to its weight
+however much it submits, so an ordinary user waits behind at most a few
+jobs per active tenant rather than behind the busiest tenant's backlog.
+
+Dispatched work is bounded by what the broker queues hold: with
+``CELERY_WORKER_PREFETCH_MULTIPLIER = 1`` and late acknowledgement of cpu
+tasks, workers reserve at most one message per busy io thread beyond the
+queues. A job reaching the head of its round therefore starts after at most
+``FAIR_QUEUE_MAX_DISPATCHED + CELERY_IO_CONCURRENCY`` jobs already handed
+to Celery, however long another tenant's backlog is.
+
+Tiers are strict priorities (``FAIR_QUEUE_TIERS``, highest first):
+interactive API requests are dispatched before Telegram ones, and those
+before batch runs of ``manage.py predict``.
+
+When the default cache is not Redis (tests, local runs without Redis) an
+in-process queue with the same semantics is used instead.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from celery import signature
+from django.conf import settings
+
+from . import metrics
+from ..utils.redis_client import get_broker_redis, get_redis, redis_cache_configured
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "fairq:pending"
+DISPATCH_LOCK_KEY = "fairq:dispatch"
+
+# KEYS: active tenants list, tenant queue, deficit hash, quantum hash, pending
+# counter; ARGV: tenant, job, quantum. A tenant joins the end of the round
+# with one quantum of credit when its queue becomes non-empty.
+ENQUEUE_SCRIPT = """
+local n = redis.call('RPUSH', KEYS[2], ARGV[2])
+if n == 1 then
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+    redis.call('HSET', KEYS[4], ARGV[1], ARGV[3])
+end
+redis.call('INCR', KEYS[5])
+return n
+"""
+
+# KEYS: active tenants list, deficit hash, quantum hash, pending counter;
+# ARGV: prefix of the tenant queue keys. The tenant at the head of the round
+# is served while its credit covers the cost of its next job; otherwise it
+# earns its quantum and moves to the end. Empty tenants leave the round.
+DEQUEUE_SCRIPT = """
+for _ = 1, 1000 do
+    local tenant = redis.call('LINDEX', KEYS[1], 0)
+    if not tenant then
+        return false
+    end
+    local queue = ARGV[1] .. tenant
+    local job = redis.call('LINDEX', queue, 0)
+    if not job then
+        redis.call('LPOP', KEYS[1])
+        redis.call('HDEL', KEYS[2], tenant)
+        redis.call('HDEL', KEYS[3], tenant)
+    else
+        local cost = tonumber(cjson.decode(job)['cost']) or 1
+        local deficit = tonumber(redis.call('HGET', KEYS[2], tenant)) or 0
+        if deficit >= cost then
+            redis.call('LPOP', queue)
+            redis.call('DECR', KEYS[4])
+            if redis.call('LLEN', queue) == 0 then
+                redis.call('LPOP', KEYS[1])
+                redis.call('HDEL', KEYS[2], tenant)
+                redis.call('HDEL', KEYS[3], tenant)
+            else
+                redis.call('HSET', KEYS[2], tenant, deficit - cost)
+            end
+            return {tenant, job}
+        end
+        local quantum = tonumber(redis.call('HGET', KEYS[3], tenant)) or 1
+        redis.call('HSET', KEYS[2], tenant, deficit + quantum)
+        redis.call('RPUSH', KEYS[1], redis.call('LPOP', KEYS[1]))
+    end
+end
+return false
+"""
+
+
+class RedisFairQueue:
+    def __init__(self, client):
+        self.client = client
+        self.enqueue_script = client.register_script(ENQUEUE_SCRIPT)
+        self.dequeue_script = client.register_script(DEQUEUE_SCRIPT)
+
+    @staticmethod
+    def _keys(tier):
+        prefix = f"fairq:{tier}"
+        return f"{prefix}:active", f"{prefix}:deficit", f"{prefix}:quantum", f"{prefix}:q:"
+
+    def push(self, tier, tenant, job, quantum):
+        active, deficit, quanta, queue_prefix = self._keys(tier)
+        self.enqueue_script(
+            keys=[active, queue_prefix + tenant, deficit, quanta, PENDING_KEY],
+            args=[tenant, job, quantum],
+        )
+
+    def pop(self, tier):
+        """Return ``(tenant, job)`` for the next job of ``tier``, or ``None``."""
+        active, deficit, quanta, queue_prefix = self._keys(tier)
+        popped = self.dequeue_script(keys=[active, deficit, quanta, PENDING_KEY], args=[queue_prefix])
+        if not popped:
+            return None
+        tenant, job = popped
+        return tenant.decode(), job.decode()
+
+    def pending(self):
+        return int(self.client.get(PENDING_KEY) or 0)
+
+
+class LocalFairQueue:
+    """Same algorithm over per-process deques; only for non-Redis setups."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # tier -> OrderedDict of tenant -> [deque of jobs, deficit, quantum],
+        # in round order
+        self.tiers = {}
+
+    def push(self, tier, tenant, job, quantum):
+        with self.lock:
+            tenants = self.tiers.setdefault(tier, OrderedDict())
+            if tenant not in tenants:
+                tenants[tenant] = [deque(), quantum, quantum]
+            tenants[tenant][0].append(job)
+
+    def pop(self, tier):
+        with self.lock:
+            tenants = self.tiers.get(tier)
+            while tenants:
+                tenant, state = next(iter(tenants.items()))
+                jobs, deficit, quantum = state
+                cost = json.loads(jobs[0]).get("cost", 1)
+                if deficit >= cost:
+                    job = jobs.popleft()
+                    state[1] = deficit - cost
+                    if not jobs:
+                        del tenants[tenant]
+                    return tenant, job
+                state[1] = deficit + quantum
+                tenants.move_to_end(tenant)
+            return None
+
+    def pending(self):
+        with self.lock:
+            return sum(len(state[0]) for tenants in self.tiers.values() for state in tenants.values())
+
+
+_local_queue = LocalFairQueue()
+_redis_queue = None
+
+
+def get_fair_queue():
+    global _redis_queue
+    if not redis_cache_configured():
+        return _local_queue
+    if _redis_queue is None:
+        _redis_queue = RedisFairQueue(get_redis())
+    return _redis_queue
+
+
+def quantum(tenant):
+    """Credit ``tenant`` earns per round: its ``FAIR_QUEUE_WEIGHTS`` entry times the quantum."""
+    return settings.FAIR_QUEUE_WEIGHTS.get(tenant, 1) * settings.FAIR_QUEUE_QUANTUM
+
+
+def submit(tier, tenant, sig, cost=1):
+    """
+    Queue the Celery signature ``sig`` for ``tenant`` in ``tier`` and
+    dispatch whatever the workers can take now.
+
+    Args:
+        tier (str): One of ``FAIR_QUEUE_TIERS``
+        tenant (str): Who the work is for, e.g. ``"user:42"`` or ``"telegram:<chat_id>"``
+        sig: Celery signature or chain to run
+        cost (int): Work units of the job, charged against the tenant's share
+    """
+    if not settings.FAIR_QUEUE_ENABLED:
+        return sig.apply_async()
+    if tier not in settings.FAIR_QUEUE_TIERS:
+        raise ValueError(f"Unknown fair queue tier {tier!r}")
+    job = json.dumps({"cost": cost, "queued_at": time.time(), "sig": sig})
+    get_fair_queue().push(tier, tenant, job, quantum(tenant))
+    dispatch()
+
+
+def next_job():
+    """Return ``(tier, tenant, job)`` from the highest non-empty tier, or ``None``."""
+    queue = get_fair_queue()
+    for tier in settings.FAIR_QUEUE_TIERS:
+        popped = queue.pop(tier)
+        if popped is not None:
+            return (tier, *popped)
+    return None
+
+
+def broker_depth():
+    """
+    Messages waiting in the broker queues the dispatcher feeds. Messages
+    reserved by workers are not counted; prefetching is limited to one per
+    slot so that stays small (see ``CELERY_WORKER_PREFETCH_MULTIPLIER``).
+    """
+    if not redis_cache_configured():
+        return 0
+    client = get_broker_redis()
+    return sum(client.llen(queue) for queue in settings.FAIR_QUEUE_BROKER_QUEUES)
+
+
+_local_dispatch_lock = threading.Lock()
+
+
+def dispatch():
+    """
+    Move jobs to Celery until ``FAIR_QUEUE_MAX_DISPATCHED`` messages wait in
+    the broker. Only one process dispatches at a time; the others return.
+    Jobs handed over stay handed over even if the lock expired meanwhile
+    (broker retries outlasting ``FAIR_QUEUE_LOCK_TIMEOUT``), so callers never
+    see an error for work that was accepted.
+
+    Returns:
+        int: Number of jobs handed to Celery
+    """
+    if redis_cache_configured():
+        from redis.exceptions import LockError
+
+        lock = get_redis().lock(DISPATCH_LOCK_KEY, timeout=settings.FAIR_QUEUE_LOCK_TIMEOUT)
+        release_errors = (LockError,)
+    else:
+        lock = _local_dispatch_lock
+        release_errors = ()
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        sent = 0
+        budget = settings.FAIR_QUEUE_MAX_DISPATCHED - broker_depth()
+        while sent < budget:
+            popped = next_job()
+            if popped is None:
+                break
+            tier, tenant, job = popped
+            data = json.loads(job)
+            try:
+                signature(data["sig"]).apply_async()
+            except Exception as e:
+                # Broker unavailable: keep the job, at the end of the tenant's queue
+                logger.error(f"Could not dispatch job of {tenant}: {e}")
+                get_fair_queue().push(tier, tenant, job, quantum(tenant))
+                break
+            metrics.FAIR_QUEUE_WAIT_SECONDS.labels(tier=tier).observe(max(time.time() - data["queued_at"], 0))
+            sent += 1
+        return sent
+    finally:
+        try:
+            lock.release()
+        except release_errors as e:
+            logger.warning(f"Fair queue dispatch lock expired before release: {e}")
+
+
+def pending():
+    """Jobs submitted but not yet dispatched, across all tiers."""
+    return get_fair_queue().pending()
@@ -0,0 +1,174 @@
+"""
+In-process micro-batching inference server.
+
+Callers submit single ``(1, seq_len, 1)`` windows and get a
+:class:`concurrent.futures.Future` back. A background thread collects requests
+for up to ``max_wait_ms`` (or until ``max_batch_size`` is reached), runs one
+forward pass per model and resolves every future from the batched output, so
+concurrent predictions in threaded Celery pools or web workers share a single
+TensorFlow call instead of paying its overhead each.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+from . import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the queueing delay histogram buckets
+DELAY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class InferenceServer:
+    def __init__(self, max_batch_size=None, max_wait_ms=None):
+        self.max_batch_size = max_batch_size or settings.INFERENCE_MAX_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.INFERENCE_MAX_WAIT_MS) / 1000
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._requests = 0
+        self._batches = 0
+        self._batch_sizes = Counter()
+        self._delay_buckets = Counter()
+        self._delay_total = 0.0
+        self._delay_max = 0.0
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so prefork children start their own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._reset_stats()
+            thread = threading.Thread(target=self._loop, name="inference-server", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, window, model_path=None):
+        """
+        Queue one input window for inference.
+
+        Returns:
+            Future: resolves to the model output row for ``window``
+        """
+        self._ensure_started()
+        future = Future()
+        path = model_path or settings.MODEL_PATH
+        self._queue.put((path, np.asarray(window, dtype=np.float32), future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[3] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                self._serve(batch)
+            except Exception as e:
+                # The thread must survive: callers block on the futures it resolves
+                logger.error(f"Inference server loop failed: {e}")
+                self._fail(batch, e)
+
+    def _serve(self, batch):
+        started = time.perf_counter()
+
+        groups = {}
+        for item in batch:
+            groups.setdefault((item[0], item[1].shape[1:]), []).append(item)
+
+        for (path, _), items in groups.items():
+            try:
+                model = model_registry.get_model(path)
+                inputs = np.concatenate([item[1] for item in items])
+                # Calling the model directly avoids predict()'s per-call setup
+                output = np.asarray(model(inputs, training=False))
+            except Exception as e:
+                logger.error(f"Batched inference failed: {e}")
+                self._fail(items, e)
+                continue
+
+            offset = 0
+            for item in items:
+                rows = len(item[1])
+                item[2].set_result(output[offset:offset + rows])
+                offset += rows
+
+        self._record(batch, started)
+
+    @staticmethod
+    def _fail(items, error):
+        for item in items:
+            if not item[2].done():
+                item[2].set_exception(error)
+
+    def _record(self, batch, started):
+        with self._lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._batch_sizes[len(batch)] += 1
+            for item in batch:
+                delay = started - item[3]
+                self._delay_total += delay
+                self._delay_max = max(self._delay_max, delay)
+                bucket = next((b for b in DELAY_BUCKETS_MS if delay * 1000 <= b), "inf")
+                self._delay_buckets[bucket] += 1
+
+    def stats(self):
+        """Batch-size histogram and queueing delay for this process."""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch_size": round(self._requests / self._batches, 2) if self._batches else None,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_delay_ms": {
+                    "mean": round(self._delay_total / self._requests * 1000, 3) if self._requests else None,
+                    "max": round(self._delay_max * 1000, 3),
+                    "histogram": {
+                        str(b): self._delay_buckets[b]
+                        for b in (*DELAY_BUCKETS_MS, "inf")
+                    },
+                },
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_inference_server():
+    """Return the process-wide :class:`InferenceServer`."""
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                _server = InferenceServer()
+    return _server
@@ -0,0 +1,71 @@
+"""
+Status records for asynchronous prediction jobs.
+
+A job is created when the API accepts a prediction request and is updated by
+the Celery task as the pipeline moves through its stages, so the status
+endpoint can answer from the cache without touching the result backend.
+Every update is also published for the server-sent events stream.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import events
+
+# Pipeline stages in order, with the progress (percent) reached when each starts
+STAGES = {
+    "queued": 0,
+    "fetching": 10,
+    "preprocessing": 30,
+    "inferring": 50,
+    "plotting": 80,
+    "saved": 100,
+}
+
+
+def _key(job_id):
+    return f"predict_job:{job_id}"
+
+
+def create_job(user_id, ticker):
+    """Create a queued job for ``user_id`` and return its id."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    cache.set(_key(job_id), {
+        "job_id": job_id,
+        "user_id": user_id,
+        "ticker": ticker.upper(),
+        "status": "queued",
+        "stage": "queued",
+        "progress": STAGES["queued"],
+        "prediction_id": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }, timeout=settings.PREDICTION_JOB_TIMEOUT)
+    return job_id
+
+
+def get_job(job_id):
+    """Return the job record or ``None`` if it is unknown or expired."""
+    return cache.get(_key(job_id))
+
+
+def update_job(job_id, **fields):
+    """Merge ``fields`` into the job record; only the owning worker writes to it."""
+    if not job_id:
+        return None
+    job = get_job(job_id)
+    if job is None:
+        return None
+    job.update(fields, updated_at=time.time())
+    cache.set(_key(job_id), job, timeout=settings.PREDICTION_JOB_TIMEOUT)
+    events.publish(job)
+    return job
+
+
+def report_stage(job_id, stage):
+    """Mark ``job_id`` as running ``stage``."""
+    return update_job(job_id, status="running", stage=stage, progress=STAGES[stage])
@@ -0,0 +1,155 @@
+"""
+Prometheus metrics for the prediction pipeline.
+
+Web, bot and Celery processes all record into the metrics below. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (it must be, before any process starts,
+whenever more than one process serves requests or runs tasks) every process
+writes its samples to memory-mapped files in that directory and the
+``/metrics/`` endpoint aggregates them, so prefork Celery children and
+multiple web workers are all reported.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Pipeline stages take from milliseconds (cached fetch) to tens of seconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "predictor_stage_seconds",
+    "Time spent in each stage of StockPredictor.run",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+PREDICT_REQUEST_SECONDS = Histogram(
+    "predict_request_seconds",
+    "Latency of the predict API",
+    ["mode", "status"],
+    buckets=STAGE_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    "celery_task_seconds",
+    "Run time of Celery tasks",
+    ["task", "state"],
+    buckets=STAGE_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "celery_queue_wait_seconds",
+    "Time between publishing a task and a worker starting it",
+    ["task"],
+    buckets=STAGE_BUCKETS,
+)
+RESULT_CACHE_REQUESTS = Counter(
+    "prediction_cache_requests_total",
+    "Prediction result cache lookups by outcome (hit, stale, miss, waited)",
+    ["result"],
+)
+MODEL_LOADS = Counter(
+    "model_loads_total",
+    "Models loaded from disk by the model registry",
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "model_load_seconds",
+    "Time to load a model from disk",
+    buckets=STAGE_BUCKETS,
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limit checks by channel (user, telegram) and decision",
+    ["channel", "decision"],
+)
+FAIR_QUEUE_WAIT_SECONDS = Histogram(
+    "fair_queue_wait_seconds",
+    "Time prediction jobs wait in the fair queue before being handed to Celery",
+    ["tier"],
+    buckets=STAGE_BUCKETS,
+)
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "Prediction admission decisions by channel (api, telegram) and outcome (admitted, degraded, rejected)",
+    ["channel", "decision"],
+)
+TELEGRAM_SEND_SECONDS = Histogram(
+    "telegram_send_seconds",
+    "Latency of Telegram Bot API calls",
+    ["method", "status"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Header added when a task is published, read back when a worker starts it
+PUBLISHED_AT_HEADER = "published_at"
+
+
+@contextmanager
+def time_stage(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def time_telegram(method):
+    """Time one Telegram API call, labelled with whether it raised."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        TELEGRAM_SEND_SECONDS.labels(method=method, status=status).observe(time.perf_counter() - start)
+
+
+def rate_limit_decision(key, is_allowed):
+    channel = key.split(":", 1)[0] if ":" in key else "other"
+    RATE_LIMIT_DECISIONS.labels(channel=channel, decision="allowed" if is_allowed else "rejected").inc()
+
+
+# Celery signal handlers, connected in zproject.celery
+
+_task_started = {}
+
+
+def on_before_task_publish(headers=None, **kwargs):
+    if headers is not None:
+        headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+def on_task_prerun(task_id=None, task=None, **kwargs):
+    published_at = task.request.get(PUBLISHED_AT_HEADER)
+    if published_at:
+        QUEUE_WAIT_SECONDS.labels(task=task.name).observe(max(time.time() - published_at, 0))
+    _task_started[task_id] = time.perf_counter()
+
+
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    start = _task_started.pop(task_id, None)
+    if start is not None:
+        TASK_SECONDS.labels(task=task.name, state=state or "UNKNOWN").observe(time.perf_counter() - start)
+
+
+def mark_process_dead(pid):
+    """Drop the live gauges of an exited worker process (multiprocess mode only)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+def render():
+    """Return ``(body, content_type)`` with the metrics of all processes."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,171 @@
+"""
+Process-wide registry of loaded Keras models.
+
+Loading a ``.keras`` file and tracing its first ``predict`` call costs several
+hundred milliseconds, so every process keeps one instance of each model keyed
+by its absolute path and file version (mtime, size and content hash). When the
+file on disk is replaced the next lookup transparently loads the new version.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_models = {}
+_hashes = {}
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "loads": 0,
+    "load_seconds": 0.0,
+    "warmups": 0,
+    "warmup_seconds": 0.0,
+}
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_hash(path, signature):
+    """Return the sha256 of the model file, cached per (path, mtime, size)."""
+    cached = _hashes.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    _hashes[path] = (signature, digest.hexdigest())
+    return _hashes[path][1]
+
+
+def model_version(model_path=None):
+    """
+    Return a short content hash identifying the model file at ``model_path``.
+
+    Used as part of cache keys so that results computed by an older model are
+    never served once the file is replaced.
+    """
+    path = os.path.abspath(model_path or settings.MODEL_PATH)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found at {path}")
+    with _lock:
+        return _file_hash(path, _file_signature(path))[:12]
+
+
+def _param_bytes(model):
+    """Size of the model's weights from their shapes, without copying them out."""
+    return sum(
+        int(np.prod(w.shape)) * np.dtype(getattr(w.dtype, "as_numpy_dtype", w.dtype)).itemsize
+        for w in model.weights
+    )
+
+
+def get_model(model_path=None):
+    """
+    Return the Keras model stored at ``model_path``, loading it at most once
+    per process and file version.
+    """
+    path = os.path.abspath(model_path or settings.MODEL_PATH)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found at {path}")
+
+    with _lock:
+        signature = _file_signature(path)
+        entry = _models.get(path)
+        if entry and entry["signature"] == signature:
+            _stats["hits"] += 1
+            return entry["model"]
+
+        _stats["misses"] += 1
+        from tensorflow.keras.models import load_model
+
+        start = time.perf_counter()
+        model = load_model(path)
+        elapsed = time.perf_counter() - start
+
+        _models[path] = {
+            "model": model,
+            "signature": signature,
+            "hash": _file_hash(path, signature),
+            "loaded_at": time.time(),
+            "load_seconds": elapsed,
+            "param_bytes": _param_bytes(model),
+            "warm": False,
+        }
+        _stats["loads"] += 1
+        _stats["load_seconds"] += elapsed
+        metrics.MODEL_LOADS.inc()
+        metrics.MODEL_LOAD_SECONDS.observe(elapsed)
+        logger.info(f"Loaded model {path} in {elapsed:.3f}s")
+        return model
+
+
+def warm_up(model_path=None, seq_len=60):
+    """
+    Load the model and run one inference on a dummy ``(1, seq_len, 1)`` input
+    so that graph tracing happens before the first real request.
+    """
+    path = os.path.abspath(model_path or settings.MODEL_PATH)
+    model = get_model(path)
+
+    start = time.perf_counter()
+    model.predict(np.zeros((1, seq_len, 1), dtype=np.float32), verbose=0)
+    elapsed = time.perf_counter() - start
+
+    with _lock:
+        if path in _models:
+            _models[path]["warm"] = True
+        _stats["warmups"] += 1
+        _stats["warmup_seconds"] += elapsed
+    logger.info(f"Warmed up model {path} in {elapsed:.3f}s")
+    return model
+
+
+def warm_up_safely(model_path=None, seq_len=60):
+    """Run :func:`warm_up`, logging instead of raising on failure."""
+    try:
+        warm_up(model_path, seq_len)
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+
+
+def stats():
+    """Return hit/miss counters and per-model memory information."""
+    with _lock:
+        models = []
+        for path, entry in _models.items():
+            models.append({
+                "path": path,
+                "version": entry["hash"][:12],
+                "file_bytes": entry["signature"][1],
+                "param_bytes": entry["param_bytes"],
+                "loaded_at": entry["loaded_at"],
+                "load_seconds": round(entry["load_seconds"], 4),
+                "warm": entry["warm"],
+            })
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+            "models": models,
+        }
+
+
+def clear():
+    """Drop every loaded model (mainly for tests)."""
+    with _lock:
+        _models.clear()
+        _hashes.clear()
@@ -0,0 +1,146 @@
+"""
+Content-addressed plot artifacts, rendered on first access.
+
+A prediction only stores the data of its charts, as ``<key>.npz`` under
+``MEDIA_ROOT/plots`` where ``key`` is a hash of the series, labels and title.
+Identical charts (the same ticker and session predicted twice) share one
+file, and a key never changes meaning, so old predictions keep pointing at
+their own images. The PNG is drawn the first time its URL is requested and
+kept next to the data; most consumers never view plots, so most charts are
+never rendered at all.
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.urls import reverse
+
+from . import plotting
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{24}$")
+URL_PATTERN = re.compile(r"/plots/([0-9a-f]{24})\.png$")
+
+
+def _plots_dir():
+    return os.path.join(settings.MEDIA_ROOT, "plots")
+
+
+def _paths(key):
+    if not KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid plot key {key!r}")
+    base = os.path.join(_plots_dir(), key)
+    return f"{base}.npz", f"{base}.png"
+
+
+def _tmp_suffix():
+    return f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def save_chart(lines, title):
+    """
+    Store the data of a chart and return its key.
+
+    Args:
+        lines (list): ``(label, x, y)`` tuples as for ``plotting.render_line_chart``
+        title (str): Chart title
+    """
+    meta = {"title": title, "labels": [label for label, _, _ in lines]}
+    arrays = {}
+    digest = hashlib.sha256(json.dumps(meta).encode())
+    for i, (_, x, y) in enumerate(lines):
+        arrays[f"x{i}"] = np.ascontiguousarray(x)
+        arrays[f"y{i}"] = np.ascontiguousarray(np.asarray(y).reshape(-1))
+        for array in (arrays[f"x{i}"], arrays[f"y{i}"]):
+            digest.update(array.dtype.str.encode())
+            digest.update(array.tobytes())
+    key = digest.hexdigest()[:24]
+
+    data_path, _ = _paths(key)
+    if not os.path.exists(data_path):
+        os.makedirs(_plots_dir(), exist_ok=True)
+        tmp = data_path + _tmp_suffix()
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, data_path)
+    return key
+
+
+def load_chart(key):
+    """Return ``(title, lines)`` for ``key``; raises ``FileNotFoundError`` if unknown."""
+    data_path, _ = _paths(key)
+    with np.load(data_path) as data:
+        meta = json.loads(str(data["meta"]))
+        lines = [
+            (label, data[f"x{i}"], data[f"y{i}"])
+            for i, label in enumerate(meta["labels"])
+        ]
+    return meta["title"], lines
+
+
+def chart_image(key):
+    """Return the path of the PNG for ``key``, rendering it on first use."""
+    _, image_path = _paths(key)
+    if not os.path.exists(image_path):
+        title, lines = load_chart(key)
+        tmp = image_path + _tmp_suffix() + ".png"
+        plotting.render_line_chart(tmp, lines, title)
+        # Concurrent first requests may both render; the result is identical
+        os.replace(tmp, image_path)
+    return image_path
+
+
+def chart_url(key):
+    return reverse("plot", args=[key])
+
+
+def resolve_plot_file(plot_url, render=True):
+    """
+    Return a local image file for a plot URL, rendering it if needed (unless
+    ``render`` is false), or ``None`` when it cannot be found. Older
+    predictions reference files under ``MEDIA_URL`` directly.
+    """
+    match = URL_PATTERN.search(plot_url)
+    if match:
+        if not render:
+            image_path = _paths(match.group(1))[1]
+            return image_path if os.path.exists(image_path) else None
+        try:
+            return chart_image(match.group(1))
+        except FileNotFoundError:
+            return None
+    if plot_url.startswith(settings.MEDIA_URL):
+        path = os.path.join(settings.MEDIA_ROOT, plot_url[len(settings.MEDIA_URL):])
+        return path if os.path.exists(path) else None
+    return None
+
+
+def _encode(values):
+    """Little-endian float32 bytes, base64 encoded (``Float32Array`` in the browser)."""
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
+
+
+def chart_series(key, points=None):
+    """
+    Return the data of a chart for client-side drawing.
+
+    Arrays are float32 and base64 encoded; dates are days since the Unix
+    epoch (``x_type`` is ``"date"``), otherwise ``x`` is a plain index.
+    With ``points`` every series is reduced to at most that many points
+    with LTTB, as for the rendered images.
+    """
+    title, lines = load_chart(key)
+    series = []
+    x_type = "index"
+    for label, x, y in lines:
+        if points:
+            x, y = plotting.downsample(x, y, points)
+        if np.issubdtype(x.dtype, np.datetime64):
+            x_type = "date"
+            x = x.astype("datetime64[D]").astype(np.int64)
+        series.append({"label": label, "x": _encode(x), "y": _encode(y)})
+    return {"key": key, "title": title, "x_type": x_type, "series": series}
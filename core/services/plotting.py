@@ -0,0 +1,81 @@
+"""
+Thread-safe chart rendering for prediction plots.
+
+Every chart gets its own ``Figure`` drawn on an Agg canvas, never touching the
+global ``matplotlib.pyplot`` state, so several predictions can render plots
+concurrently in threads. Series longer than the image is wide are reduced
+with Largest-Triangle-Three-Buckets (LTTB) first: at most one point per pixel
+is drawn, and the points kept are the ones that define the visible shape
+(peaks, troughs), so the image looks the same at a fraction of the cost.
+"""
+import numpy as np
+
+# Output size of every chart, matching the previous figsize=(10, 4) at 100 dpi
+WIDTH_PX = 1000
+HEIGHT_PX = 400
+DPI = 100
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Return the indices of at most ``threshold`` points of ``(x, y)`` chosen by
+    Largest-Triangle-Three-Buckets. The first and last points are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(x, y, threshold=WIDTH_PX):
+    """Reduce ``(x, y)`` to at most ``threshold`` points; ``x`` may be datetime64."""
+    x = np.asarray(x)
+    y = np.asarray(y).reshape(-1)
+    numeric_x = x.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+    indices = lttb_indices(numeric_x, y, threshold)
+    return x[indices], y[indices]
+
+
+def render_line_chart(path, lines, title, width_px=WIDTH_PX, height_px=HEIGHT_PX):
+    """
+    Draw ``lines`` into a PNG at ``path``.
+
+    Args:
+        path (str): Output file
+        lines (list): ``(label, x, y)`` tuples; a legend is drawn when any
+            label is set
+        title (str): Chart title
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(width_px / DPI, height_px / DPI), dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for label, x, y in lines:
+        ax.plot(*downsample(x, y, width_px), label=label)
+    if any(label for label, _, _ in lines):
+        ax.legend()
+    ax.set_title(title)
+    fig.savefig(path)
+    return path
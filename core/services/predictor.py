@@ -1,47 +1,78 @@
-import yfinance as yf
+# TensorFlow, matplotlib, scikit-learn and yfinance are imported inside the
+# methods that need them so that importing this module (as the web, bot and
+# admin processes do) stays cheap; only processes that actually run a
+# prediction pay for the ML stack.
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend for plotting
-import matplotlib.pyplot as plt
-import os
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import Future
 from django.conf import settings
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error, r2_score
-from tensorflow.keras.models import load_model
+from . import metrics, model_registry, plot_store
+from .evaluation_store import get_evaluation_store
+from .inference_server import get_inference_server
+from .price_store import get_price_store
+
+
+def make_windows(scaled, seq_len):
+    """
+    Build model inputs from a scaled ``(n, 1)`` price column without copying.
+
+    Returns ``(X, y)`` where ``X`` is a read-only strided view of shape
+    ``(n - seq_len, seq_len, 1)`` whose i-th window is ``scaled[i:i + seq_len]``
+    and ``y`` holds the value that follows each window.
+    """
+    series = np.asarray(scaled, dtype=np.float32).reshape(-1)
+    if len(series) <= seq_len:
+        raise ValueError(f"Need more than {seq_len} prices, got {len(series)}")
+    windows = sliding_window_view(series, seq_len)
+    X = windows[:-1, :, np.newaxis]
+    y = series[seq_len:, np.newaxis]
+    return X, y
+
+
+def last_window(scaled, seq_len):
+    """Return the trailing ``(1, seq_len, 1)`` window used for next-day inference."""
+    series = np.asarray(scaled, dtype=np.float32).reshape(-1)
+    if len(series) < seq_len:
+        raise ValueError(f"Need at least {seq_len} prices, got {len(series)}")
+    return series[-seq_len:].reshape(1, seq_len, 1)
+
+
+# Forward-pass batch size and window budget per pass for predict_many
+BATCH_SIZE = 1024
+MAX_WINDOWS_PER_PASS = 100_000
+
 
 class StockPredictor:
-    def __init__(self, ticker, model_path=None, seq_len=60):
+    def __init__(self, ticker, model_path=None, seq_len=60, source=None):
         self.ticker = ticker.upper()
         self.seq_len = seq_len
         self.model_path = model_path or settings.MODEL_PATH
+        # Market data source name; None uses MARKET_DATA_SOURCE
+        self.source = source
+        from sklearn.preprocessing import MinMaxScaler
         self.scaler = MinMaxScaler()
         self.model = None
         self.df = None
+        self.scaled = None
 
     def fetch_data(self):
-        # Download last 10 years of OHLCV data
-        self.df = yf.download(self.ticker, period="10y", progress=False)
+        # Last 10 years of OHLCV data, served from the local price store which
+        # only downloads the bars added since the previous request
+        self.df = get_price_store(self.source).history(self.ticker)
         if self.df.empty:
             raise ValueError(f"No data found for ticker {self.ticker}")
         return self.df
 
     def preprocess(self):
         prices = self.df[['Close']].values
-        scaled = self.scaler.fit_transform(prices)
+        self.scaled = self.scaler.fit_transform(prices).astype(np.float32)
         
-        # Create sequences
-        X, y = [], []
-        for i in range(self.seq_len, len(scaled)):
-            X.append(scaled[i - self.seq_len:i])
-            y.append(scaled[i])
-        X = np.array(X).reshape(-1, self.seq_len, 1)
-        y = np.array(y)
-        return X, y
+        # Create sequences as strided views over the scaled prices
+        return make_windows(self.scaled, self.seq_len)
 
     def load_model(self):
-        if not os.path.exists(self.model_path):
-            raise FileNotFoundError(f"Model not found at {self.model_path}")
-        self.model = load_model(self.model_path)
+        # Models are loaded once per process and shared between predictors
+        self.model = model_registry.get_model(self.model_path)
 
     def predict(self, X):
         # Predict all data
@@ -50,52 +81,132 @@ class StockPredictor:
         return y_pred
 
     def calculate_metrics(self, y_true, y_pred):
+        from sklearn.metrics import mean_squared_error, r2_score
         y_true_inv = self.scaler.inverse_transform(y_true)
         mse = mean_squared_error(y_true_inv, y_pred)
         rmse = np.sqrt(mse)
         r2 = r2_score(y_true_inv, y_pred)
         return mse, rmse, r2
 
-    def predict_next_day(self, X):
-        last_seq = X[-1].reshape(1, self.seq_len, 1)
-        pred_scaled = self.model.predict(last_seq, verbose=0)
-        pred_price = self.scaler.inverse_transform(pred_scaled)[0][0]
-        return float(pred_price)
-
-    def save_plot(self, filename, fig):
-        media_root = settings.MEDIA_ROOT
-        plots_dir = os.path.join(media_root, "plots")
-        os.makedirs(plots_dir, exist_ok=True)
-        path = os.path.join(plots_dir, filename)
-        fig.savefig(path)
-        plt.close(fig)
-        return f"/media/plots/{filename}"
+    def predict_next_day_async(self):
+        """
+        Queue the next-day inference and return a Future resolving to the price.
+
+        With ``INFERENCE_BATCHING`` enabled the window goes through the shared
+        micro-batching server, so concurrent predictions in this process are
+        coalesced into one forward pass.
+        """
+        # The window ending at the latest close predicts the following session
+        last_seq = last_window(self.scaled, self.seq_len)
+        price = Future()
+
+        if not settings.INFERENCE_BATCHING:
+            pred_scaled = self.model.predict(last_seq, verbose=0)
+            price.set_result(float(self.scaler.inverse_transform(pred_scaled)[0][0]))
+            return price
+
+        def resolve(future):
+            try:
+                pred_scaled = future.result()
+                price.set_result(float(self.scaler.inverse_transform(pred_scaled)[0][0]))
+            except Exception as e:
+                price.set_exception(e)
+
+        get_inference_server().submit(last_seq, self.model_path).add_done_callback(resolve)
+        return price
+
+    def predict_next_day(self):
+        return self.predict_next_day_async().result(timeout=settings.INFERENCE_RESULT_TIMEOUT)
+
+    def run_next_day(self):
+        """
+        Predict only the next-day price from the trailing ``seq_len`` closes.
+
+        The scaler is fit on the same history as :meth:`preprocess`, so the
+        price matches the one :meth:`run` returns, but a single window is
+        inferred and no metrics or plots are produced.
+        """
+        closes = get_price_store(self.source).closes(self.ticker).reshape(-1, 1)
+        if len(closes) < self.seq_len:
+            raise ValueError(f"Need at least {self.seq_len} prices for {self.ticker}, got {len(closes)}")
+        self.scaler.fit(closes)
+        self.scaled = self.scaler.transform(closes[-self.seq_len:]).astype(np.float32)
+        self.load_model()
+        return {
+            "ticker": self.ticker,
+            "next_day_price": round(self.predict_next_day(), 2),
+        }
 
     def generate_plots(self, y_actual, y_pred):
-        # Plot 1: Price history
-        fig1, ax1 = plt.subplots(figsize=(10, 4))
-        ax1.plot(self.df['Close'])
-        ax1.set_title(f"{self.ticker} Closing Price History")
-        path1 = self.save_plot(f"{self.ticker}_history.png", fig1)
+        # Only the chart data is stored here; images are rendered on first view
+        history = plot_store.save_chart(
+            [(None, self.df.index.values, self.df['Close'].to_numpy())],
+            f"{self.ticker} Closing Price History",
+        )
 
-        # Plot 2: Actual vs predicted
         y_actual_inv = self.scaler.inverse_transform(y_actual)
-        fig2, ax2 = plt.subplots(figsize=(10, 4))
-        ax2.plot(y_actual_inv, label="Actual")
-        ax2.plot(y_pred, label="Predicted")
-        ax2.legend()
-        ax2.set_title("Actual vs Predicted Prices")
-        path2 = self.save_plot(f"{self.ticker}_pred_vs_actual.png", fig2)
-
-        return [path1, path2]
-
-    def run(self):
-        self.fetch_data()
-        X, y = self.preprocess()
+        steps = np.arange(len(y_pred))
+        pred_vs_actual = plot_store.save_chart(
+            [("Actual", steps, y_actual_inv), ("Predicted", steps, y_pred)],
+            "Actual vs Predicted Prices",
+        )
+
+        return [plot_store.chart_url(history), plot_store.chart_url(pred_vs_actual)]
+
+    def target_dates(self):
+        """Dates (days since the epoch) of the bars predicted by each window."""
+        days = self.df.index.values.astype("datetime64[D]").astype(np.int64)
+        return days[self.seq_len:]
+
+    def evaluate(self, X, y):
+        """
+        Return ``(y_pred, next_day_price, metrics)`` for the windows ``X``.
+
+        Predictions for windows already in the evaluation store are reused as
+        long as the model version, scaler range and window length match, so
+        after a new session only the new windows are inferred. When nothing
+        changed the stored metrics are returned without loading the model.
+        """
+        store = get_evaluation_store(self.source)
+        version = model_registry.model_version(self.model_path)
+        dates = self.target_dates()
+        scale = [float(self.scaler.data_min_[0]), float(self.scaler.data_max_[0])]
+
+        known = np.empty((0, 1))
+        stored, meta = store.load(self.ticker, version)
+        if stored is not None and meta.get("scale") == scale and meta.get("seq_len") == self.seq_len:
+            # Align on the first date still in the lookback window; the stored
+            # series must cover a contiguous prefix of the current one
+            first = int(np.searchsorted(stored[0], dates[0]))
+            count = min(stored.shape[1] - first, len(dates))
+            if count > 0 and np.array_equal(stored[0, first:first + count], dates[:count]):
+                known = stored[1, first:first + count].reshape(-1, 1)
+
+        if len(known) == len(dates):
+            return known, meta["next_day_price"], tuple(meta["metrics"])
+
         self.load_model()
-        y_pred = self.predict(X)
-        mse, rmse, r2 = self.calculate_metrics(y, y_pred)
-        next_day_price = self.predict_next_day(X)
+        # Queue the next-day window first so it is batched while X is evaluated
+        next_day = self.predict_next_day_async()
+        y_pred = np.vstack([known, self.predict(X[len(known):])])
+        next_day_price = next_day.result(timeout=settings.INFERENCE_RESULT_TIMEOUT)
+        scores = tuple(float(m) for m in self.calculate_metrics(y, y_pred))
+
+        store.save(self.ticker, version, np.vstack([dates, y_pred[:, 0]]), {
+            "seq_len": self.seq_len,
+            "scale": scale,
+            "last_date": int(dates[-1]),
+            "next_day_price": next_day_price,
+            "metrics": scores,
+        })
+        return y_pred, next_day_price, scores
+
+    def finalize(self, y, y_pred, next_day_price, scores=None):
+        """
+        Build the result dict from model output, computing the metrics unless
+        ``scores`` already holds ``(mse, rmse, r2)``, and render the plots.
+        """
+        mse, rmse, r2 = scores or self.calculate_metrics(y, y_pred)
         plot_urls = self.generate_plots(y, y_pred)
 
         return {
@@ -106,3 +217,97 @@ class StockPredictor:
             "r2": round(r2, 3),
             "plot_urls": plot_urls,
         }
+
+    def run(self, progress=None):
+        """
+        Run the full pipeline for this ticker.
+
+        Args:
+            progress (callable): Optional callback receiving each stage name
+                ("fetching", "preprocessing", "inferring", "plotting") as it starts
+        """
+        report = progress or (lambda stage: None)
+
+        report("fetching")
+        with metrics.time_stage("fetching"):
+            self.fetch_data()
+        report("preprocessing")
+        with metrics.time_stage("preprocessing"):
+            X, y = self.preprocess()
+        report("inferring")
+        with metrics.time_stage("inferring"):
+            y_pred, next_day_price, scores = self.evaluate(X, y)
+        report("plotting")
+        with metrics.time_stage("plotting"):
+            return self.finalize(y, y_pred, next_day_price, scores)
+
+
+def predict_many(tickers, model_path=None, seq_len=60, source=None,
+                 batch_size=BATCH_SIZE, max_windows=MAX_WINDOWS_PER_PASS):
+    """
+    Run predictions for several tickers with stacked forward passes.
+
+    Every ticker's evaluation windows plus its next-day window are
+    concatenated into one input so the model runs a few large batches
+    instead of two small ``predict`` calls per ticker. Tickers are grouped
+    into passes of at most ``max_windows`` windows to bound memory. Scaling,
+    metrics and plots stay per ticker.
+
+    Returns:
+        tuple: (results, errors) where ``results`` maps ticker to the same
+        dict as :meth:`StockPredictor.run` and ``errors`` maps ticker to the
+        exception raised while fetching, preprocessing or inferring it.
+    """
+    model = model_registry.get_model(model_path or settings.MODEL_PATH)
+    results, errors = {}, {}
+
+    prepared = []
+    for ticker in dict.fromkeys(t.upper() for t in tickers):
+        predictor = StockPredictor(ticker, model_path=model_path, seq_len=seq_len, source=source)
+        try:
+            predictor.fetch_data()
+            X, y = predictor.preprocess()
+        except Exception as e:
+            errors[ticker] = e
+            continue
+        predictor.model = model
+        prepared.append((predictor, X, y))
+
+    def run_pass(group):
+        inputs = []
+        for predictor, X, _ in group:
+            inputs.append(X)
+            inputs.append(last_window(predictor.scaled, seq_len))
+        try:
+            output = model.predict(np.concatenate(inputs), batch_size=batch_size, verbose=0)
+        except Exception as e:
+            # Only this pass's tickers fail; other passes keep their results
+            for predictor, _, _ in group:
+                errors[predictor.ticker] = e
+            return
+
+        offset = 0
+        for predictor, X, y in group:
+            chunk = output[offset:offset + len(X) + 1]
+            offset += len(X) + 1
+            try:
+                y_pred = predictor.scaler.inverse_transform(chunk[:-1])
+                next_day_price = float(predictor.scaler.inverse_transform(chunk[-1:])[0][0])
+                results[predictor.ticker] = predictor.finalize(y, y_pred, next_day_price)
+            except Exception as e:
+                errors[predictor.ticker] = e
+
+    group, windows = [], 0
+    for item in prepared:
+        size = len(item[1]) + 1
+        # Close the pass before it would exceed the budget; a ticker larger
+        # than the whole budget still runs, alone
+        if group and windows + size > max_windows:
+            run_pass(group)
+            group, windows = [], 0
+        group.append(item)
+        windows += size
+    if group:
+        run_pass(group)
+
+    return results, errors
@@ -0,0 +1,231 @@
+"""
+Persistent per-ticker OHLCV store.
+
+Each ticker is kept as a single ``.npy`` file holding a ``(len(COLUMNS), n)``
+float64 array, one contiguous row per column, so it can be memory-mapped and a
+single column read without touching the others. Dates are stored as days since
+the Unix epoch. A small JSON sidecar records when the upstream was last asked
+for new bars, which together with the market-close freshness policy decides
+whether a request needs any network I/O at all.
+
+Bars come from a pluggable data source (see ``data_sources``); each source has
+its own subdirectory so a replayed or synthetic history never mixes with real
+quotes.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pytz
+from django.conf import settings
+
+from .data_sources import get_data_source
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("Date", "Open", "High", "Low", "Close", "Volume")
+_EPOCH = date(1970, 1, 1)
+# Relative change of a re-fetched close that means the history was re-adjusted
+# (dividends move adjusted prices by well over this; float noise stays below)
+ADJUSTMENT_TOLERANCE = 1e-4
+
+# Serialises writers inside one process; across processes writes are atomic
+# renames so readers never observe a partially written file.
+_write_lock = threading.Lock()
+
+
+def _to_days(d):
+    return (d - _EPOCH).days
+
+
+def _from_days(days):
+    return _EPOCH + timedelta(days=int(days))
+
+
+def last_completed_session(now=None):
+    """
+    Return the date of the most recent trading session that has closed.
+
+    Sessions are weekdays ending at ``settings.MARKET_CLOSE_TIME`` in
+    ``settings.MARKET_TIMEZONE``. Exchange holidays are not modelled; they are
+    absorbed by the ``checked_at`` sidecar so a holiday costs one fetch.
+    """
+    tz = pytz.timezone(settings.MARKET_TIMEZONE)
+    now = (now or datetime.now(pytz.utc)).astimezone(tz)
+    close = time.fromisoformat(settings.MARKET_CLOSE_TIME)
+
+    session = now.date()
+    if now.time() < close:
+        session -= timedelta(days=1)
+    while session.weekday() >= 5:
+        session -= timedelta(days=1)
+    return session
+
+
+def _session_close(session):
+    tz = pytz.timezone(settings.MARKET_TIMEZONE)
+    close = time.fromisoformat(settings.MARKET_CLOSE_TIME)
+    return tz.localize(datetime.combine(session, close))
+
+
+class PriceStore:
+    """On-disk OHLCV history with incremental delta fetches."""
+
+    def __init__(self, root=None, lookback_years=10, source=None):
+        self.source = get_data_source(source)
+        self.root = os.path.join(str(root or settings.PRICE_STORE_DIR), self.source.name)
+        self.lookback_years = lookback_years
+
+    def _paths(self, ticker):
+        base = os.path.join(self.root, ticker.upper())
+        return f"{base}.npy", f"{base}.json"
+
+    def _read(self, ticker):
+        data_path, meta_path = self._paths(ticker)
+        if not os.path.exists(data_path):
+            return None, {}
+        data = np.load(data_path, mmap_mode="r")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        return data, meta
+
+    def _write(self, ticker, data, meta):
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(ticker)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with _write_lock:
+            if data is not None:
+                with open(data_path + suffix, "wb") as f:
+                    np.save(f, np.ascontiguousarray(data, dtype=np.float64))
+                os.replace(data_path + suffix, data_path)
+            with open(meta_path + suffix, "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + suffix, meta_path)
+
+    def _download(self, ticker, start=None):
+        return self.source.fetch(ticker, start=start, years=self.lookback_years)
+
+    @staticmethod
+    def _frame_to_array(df):
+        """Convert a yfinance frame into the stored ``(columns, n)`` layout."""
+        if df is None or df.empty:
+            return np.empty((len(COLUMNS), 0))
+        if getattr(df.columns, "nlevels", 1) > 1:
+            df = df.droplevel(-1, axis=1)
+        dates = np.array([_to_days(ts.date()) for ts in df.index], dtype=np.float64)
+        columns = [dates] + [df[name].to_numpy(dtype=np.float64) for name in COLUMNS[1:]]
+        return np.vstack(columns)
+
+    @staticmethod
+    def _array_to_frame(data):
+        import pandas as pd
+
+        index = pd.to_datetime(data[0].astype("int64"), unit="D")
+        index.name = "Date"
+        return pd.DataFrame(
+            {name: np.asarray(data[i]) for i, name in enumerate(COLUMNS) if i},
+            index=index,
+        )
+
+    def is_fresh(self, meta, now=None):
+        """Whether the stored history already covers the last closed session."""
+        if not meta.get("last_date"):
+            return False
+        session = last_completed_session(now)
+        if meta["last_date"] >= session.isoformat():
+            return True
+        checked_at = meta.get("checked_at")
+        return bool(checked_at) and datetime.fromisoformat(checked_at) >= _session_close(session)
+
+    def update(self, ticker, now=None):
+        """
+        Bring the stored history for ``ticker`` up to date and return it as a
+        memory-mapped array. Only bars from the last stored date on are
+        fetched, unless upstream re-adjusted the prices since.
+        """
+        ticker = ticker.upper()
+        data, meta = self._read(ticker)
+        if data is not None and self.is_fresh(meta, now):
+            return data
+
+        # Bars of a session that has not closed yet are still moving; skip them
+        session_day = _to_days(last_completed_session(now))
+        if data is None or data.shape[1] == 0:
+            new = self._frame_to_array(self._download(ticker))
+            new = new[:, new[0] <= session_day]
+            if new.shape[1] == 0:
+                raise ValueError(f"No data found for ticker {ticker}")
+            merged = new
+        else:
+            last_day = int(data[0, -1])
+            close = COLUMNS.index("Close")
+            rebased = None
+            try:
+                # Start at the last stored bar: if its close changed upstream, a
+                # split or dividend re-based the adjusted prices and the stored
+                # bars no longer line up with new ones
+                new = self._frame_to_array(self._download(ticker, start=_from_days(last_day)))
+                overlap = new[close, new[0] == last_day]
+                if len(overlap) and not np.isclose(overlap[0], data[close, -1], rtol=ADJUSTMENT_TOLERANCE):
+                    logger.info(f"Prices of {ticker} were adjusted upstream; fetching its full history again")
+                    rebased = self._frame_to_array(self._download(ticker))
+                    rebased = rebased[:, rebased[0] <= session_day]
+            except Exception as e:
+                # Serve the stored history rather than failing while the
+                # upstream is down; the next request retries the fetch
+                logger.warning(f"Could not fetch new bars for {ticker} from {self.source.name}: {e}")
+                return data
+            if rebased is not None and rebased.shape[1]:
+                merged = rebased
+            else:
+                new = new[:, (new[0] > last_day) & (new[0] <= session_day)]
+                merged = np.hstack([data, new]) if new.shape[1] else None
+                logger.info(f"Fetched {new.shape[1]} new bars for {ticker}")
+
+        stored = merged if merged is not None else data
+        meta = {
+            "last_date": _from_days(stored[0, -1]).isoformat(),
+            "rows": int(stored.shape[1]),
+            "checked_at": (now or datetime.now(pytz.utc)).isoformat(),
+        }
+        self._write(ticker, merged, meta)
+        return self._read(ticker)[0]
+
+    def last_date(self, ticker):
+        """Return the date of the last stored bar, or ``None``."""
+        _, meta = self._read(ticker)
+        return date.fromisoformat(meta["last_date"]) if meta.get("last_date") else None
+
+    def history(self, ticker, now=None):
+        """
+        Return the trailing ``lookback_years`` of OHLCV for ``ticker`` as a
+        DataFrame indexed by date, fetching only missing bars when stale.
+        """
+        data = self.update(ticker, now)
+        return self._array_to_frame(data[:, self._lookback_start(data):])
+
+    def closes(self, ticker, now=None):
+        """
+        Return the closing prices covered by :meth:`history` as a float64
+        array, without building a DataFrame.
+        """
+        data = self.update(ticker, now)
+        return np.asarray(data[COLUMNS.index("Close"), self._lookback_start(data):])
+
+    def _lookback_start(self, data):
+        """Index of the first bar within ``lookback_years`` of the last one."""
+        last = _from_days(data[0, -1])
+        try:
+            start = last.replace(year=last.year - self.lookback_years)
+        except ValueError:  # 29 February
+            start = last.replace(year=last.year - self.lookback_years, day=28)
+        return int(np.searchsorted(data[0], _to_days(start), side="right"))
+
+
+def get_price_store(source=None):
+    return PriceStore(source=source)
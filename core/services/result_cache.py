@@ -0,0 +1,206 @@
+"""
+Shared cache of prediction results with single-flight computation.
+
+Results are keyed by ticker, data source, model version and the last closed
+market session, so every request for the same ticker on the same trading day
+can reuse one computation. Concurrent misses are deduplicated with a Redis lock
+(SET NX, released by a compare-and-delete script so a leader that outlived
+its lock never deletes its successor's): one caller computes, the others wait
+for its result. Once a new session closes, the previous session's result is still
+served (stale-while-revalidate) while a Celery task refreshes it.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics, model_registry
+from .price_store import last_completed_session
+from ..utils.redis_client import get_redis, redis_cache_configured
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: lock; ARGV[1]: the owner's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_script = None
+# Without Redis the lock lives in this process's cache; this makes its
+# check-and-delete atomic with respect to other threads
+_local_lock = threading.Lock()
+
+
+def _acquire(lock_key, token):
+    if redis_cache_configured():
+        return bool(get_redis().set(lock_key, token, nx=True, ex=settings.SINGLE_FLIGHT_LOCK_TIMEOUT))
+    with _local_lock:
+        return cache.add(lock_key, token, timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+
+
+def _is_locked(lock_key):
+    if redis_cache_configured():
+        return bool(get_redis().exists(lock_key))
+    return cache.get(lock_key) is not None
+
+
+def _release(lock_key, token):
+    """Delete ``lock_key`` only if ``token`` still owns it."""
+    global _release_script
+    if redis_cache_configured():
+        if _release_script is None:
+            _release_script = get_redis().register_script(RELEASE_LOCK_SCRIPT)
+        _release_script(keys=[lock_key], args=[token])
+        return
+    with _local_lock:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _base_key(ticker, model_path=None):
+    version = model_registry.model_version(model_path)
+    return f"prediction:{ticker.upper()}:{settings.MARKET_DATA_SOURCE}:{version}"
+
+
+def _store(base_key, session, result):
+    entry = {"session": session, "computed_at": time.time(), "result": result}
+    cache.set_many({
+        f"{base_key}:{session}": entry,
+        f"{base_key}:latest": entry,
+    }, timeout=settings.RESULT_CACHE_TIMEOUT)
+
+
+def peek_cached_prediction(ticker, model_path=None, allow_stale=True):
+    """Return the cached result for ``ticker`` without computing anything."""
+    base_key = _base_key(ticker, model_path)
+    session = last_completed_session().isoformat()
+    entry = cache.get(f"{base_key}:{session}")
+    if entry is None and allow_stale:
+        entry = cache.get(f"{base_key}:latest")
+    return entry["result"] if entry else None
+
+
+def get_cached_prediction(ticker, compute, model_path=None, allow_stale=True):
+    """
+    Return the prediction for ``ticker``, calling ``compute()`` at most once
+    per ticker, model version and market session across all processes.
+
+    Args:
+        ticker (str): The stock ticker symbol
+        compute (callable): Runs the full prediction and returns its result dict
+        model_path (str): Model used to compute the result (defaults to MODEL_PATH)
+        allow_stale (bool): Serve the previous session's result while refreshing
+
+    Returns:
+        dict: The prediction result as produced by ``StockPredictor.run``
+    """
+    ticker = ticker.upper()
+    base_key = _base_key(ticker, model_path)
+    session = last_completed_session().isoformat()
+    key = f"{base_key}:{session}"
+
+    entry = cache.get(key)
+    if entry is not None:
+        metrics.RESULT_CACHE_REQUESTS.labels(result="hit").inc()
+        return entry["result"]
+
+    if allow_stale:
+        latest = cache.get(f"{base_key}:latest")
+        if latest is not None:
+            metrics.RESULT_CACHE_REQUESTS.labels(result="stale").inc()
+            schedule_refresh(ticker, f"{key}:lock")
+            return latest["result"]
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    while True:
+        token = uuid.uuid4().hex
+        if _acquire(lock_key, token):
+            try:
+                # Another leader may have finished between our miss and the lock
+                entry = cache.get(key)
+                if entry is not None:
+                    metrics.RESULT_CACHE_REQUESTS.labels(result="waited").inc()
+                    return entry["result"]
+                metrics.RESULT_CACHE_REQUESTS.labels(result="miss").inc()
+                result = compute()
+                _store(base_key, session, result)
+                return result
+            finally:
+                _release(lock_key, token)
+
+        # Someone else is computing; wait for their result
+        while time.monotonic() < deadline:
+            time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                metrics.RESULT_CACHE_REQUESTS.labels(result="waited").inc()
+                return entry["result"]
+            if not _is_locked(lock_key):
+                # The leader failed or expired; try to take over
+                break
+        else:
+            logger.warning(f"Timed out waiting for in-flight prediction of {ticker}")
+            metrics.RESULT_CACHE_REQUESTS.labels(result="miss").inc()
+            return compute()
+
+
+def get_next_day_prediction(ticker, compute_price, model_path=None):
+    """
+    Return the next-day price for ``ticker`` without waiting for a full
+    evaluation.
+
+    If this session's full result is cached it is returned as is. Otherwise
+    ``compute_price()`` (a single-window inference, cached per session) is
+    combined with the metrics and plots of the most recent evaluation, and a
+    background refresh is queued so the full result is ready for the next
+    request. ``evaluation_session`` tells which session the metrics belong to;
+    it is ``None`` (and the metrics are empty) when none has run yet.
+
+    Args:
+        ticker (str): The stock ticker symbol
+        compute_price (callable): Returns ``{"ticker", "next_day_price"}``
+        model_path (str): Model used for the prediction (defaults to MODEL_PATH)
+
+    Returns:
+        dict: Same keys as ``StockPredictor.run`` plus ``evaluation_session``
+    """
+    ticker = ticker.upper()
+    base_key = _base_key(ticker, model_path)
+    session = last_completed_session().isoformat()
+    key = f"{base_key}:{session}"
+
+    entry = cache.get(key)
+    if entry is not None:
+        return {**entry["result"], "evaluation_session": session}
+
+    next_day = cache.get(f"{key}:next_day")
+    if next_day is None:
+        next_day = compute_price()
+        cache.set(f"{key}:next_day", next_day, timeout=settings.RESULT_CACHE_TIMEOUT)
+
+    schedule_refresh(ticker, f"{key}:lock")
+    latest = cache.get(f"{base_key}:latest")
+    if latest is None:
+        evaluation = {"mse": None, "rmse": None, "r2": None, "plot_urls": [], "evaluation_session": None}
+    else:
+        evaluation = {**latest["result"], "evaluation_session": latest["session"]}
+    return {**evaluation, **next_day}
+
+
+def schedule_refresh(ticker, lock_key):
+    """Queue one background recomputation of ``ticker`` per session."""
+    if not cache.add(f"{lock_key}:refresh", 1, timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        return
+    try:
+        from core.tasks import refresh_prediction_cache
+
+        refresh_prediction_cache.delay(ticker)
+    except Exception as e:
+        logger.error(f"Could not schedule refresh of {ticker}: {e}")
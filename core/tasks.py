@@ -1,15 +1,23 @@
 import os
 import asyncio
 
-from celery import shared_task
+from asgiref.sync import sync_to_async
+from celery import chain, group, shared_task
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.conf import settings
 import logging
 import traceback
 from telegram import Bot
 from telegram.error import TelegramError
-from .models import Prediction
+from .models import BulkPrediction, Prediction
+from .services import bulk, cache_warming, fair_queue
 from .services.predictor import StockPredictor
+from .services.jobs import STAGES, report_stage, update_job
+from .services.plot_store import resolve_plot_file
+from .services.price_store import get_price_store, last_completed_session
+from .services.result_cache import get_cached_prediction, get_next_day_prediction
+from .telegram.request import InstrumentedRequest
 
 # Configure logging
 logging.basicConfig(
@@ -19,52 +27,151 @@ logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# A prediction runs as a chain of stages on two queues (see CELERY_TASK_ROUTES):
+# network-bound stages on "io", served by a thread pool with high concurrency,
+# and model inference and plot rendering on "cpu", served by a prefork pool
+# with one process per core. Stages hand over JSON results; the price history
+# itself is shared through the price store on disk.
+
+
+def _get_user(user_id):
+    try:
+        return User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        raise ValueError(f"User with id {user_id} does not exist")
+
+
+def _save_prediction(user, result):
+    return Prediction.objects.create(
+        user=user,
+        ticker=result['ticker'],
+        metrics={
+            name: result[name]
+            for name in ("next_day_price", "mse", "rmse", "r2")
+            if result[name] is not None
+        },
+        plot_urls=result["plot_urls"]
+    )
+
+
+@shared_task
+def fetch_prices(ticker, job_id=None):
+    """
+    I/O stage: bring the local price history of ``ticker`` up to date, so
+    the CPU stage that follows reads it from disk.
+    """
+    report_stage(job_id, "fetching")
+    get_price_store().update(ticker.upper())
+    return ticker
+
+
+@shared_task
+def compute_prediction(ticker, job_id=None):
+    """CPU stage: full prediction, reusing a cached result for this session if any."""
+    return get_cached_prediction(
+        ticker,
+        compute=lambda: StockPredictor(ticker).run(
+            progress=lambda stage: report_stage(job_id, stage)
+        )
+    )
+
+
 @shared_task
-def run_stock_prediction(user_id, ticker):
+def save_prediction(result, user_id, job_id=None):
+    """I/O stage: store the result of ``compute_prediction`` for the user."""
+    prediction = _save_prediction(_get_user(user_id), result)
+    update_job(
+        job_id,
+        status="succeeded",
+        stage="saved",
+        progress=STAGES["saved"],
+        prediction_id=prediction.id
+    )
+    return {
+        "success": True,
+        "prediction_id": prediction.id,
+        "ticker": result['ticker'],
+        "next_day_price": result["next_day_price"]
+    }
+
+
+@shared_task
+def compute_next_day(ticker):
+    """
+    CPU stage: next-day price with the latest cached evaluation, and render
+    its plots so the send stage only uploads files.
+    """
+    result = get_next_day_prediction(
+        ticker,
+        compute_price=lambda: StockPredictor(ticker).run_next_day()
+    )
+    for plot_url in result["plot_urls"]:
+        resolve_plot_file(plot_url)
+    return result
+
+
+@shared_task
+def send_prediction(result, user_id, chat_id):
+    """I/O stage: store a Telegram prediction and send it to the chat."""
+    prediction = _save_prediction(_get_user(user_id), result)
+    asyncio.run(send_telegram_prediction_result(chat_id, result))
+    return {
+        "success": True,
+        "prediction_id": prediction.id,
+        "ticker": result['ticker'],
+        "chat_id": chat_id
+    }
+
+
+@shared_task
+def prediction_failed(request, exc, tb, job_id=None, chat_id=None, ticker=None):
+    """Error callback of the prediction chains: fail the job or tell the chat."""
+    logger.error(f"Prediction task {request.id} failed: {exc!r}")
+    update_job(job_id, status="failed", error=str(exc))
+    if chat_id is not None:
+        asyncio.run(send_telegram_error(chat_id, f"Error predicting {ticker}: {exc}"))
+
+
+def prediction_pipeline(user_id, ticker, job_id=None):
+    """Return the chain running an API prediction: fetch, predict, save."""
+    return chain(
+        fetch_prices.si(ticker, job_id=job_id),
+        compute_prediction.si(ticker, job_id=job_id),
+        save_prediction.s(user_id, job_id=job_id),
+    ).on_error(prediction_failed.s(job_id=job_id))
+
+
+def telegram_prediction_pipeline(user_id, ticker, chat_id):
+    """Return the chain running a Telegram prediction: fetch, predict, send."""
+    return chain(
+        fetch_prices.si(ticker),
+        compute_next_day.si(ticker),
+        send_prediction.s(user_id, chat_id),
+    ).on_error(prediction_failed.s(chat_id=chat_id, ticker=ticker.upper()))
+
+
+@shared_task
+def run_stock_prediction(user_id, ticker, job_id=None):
     """
     Celery task to run stock prediction in the background.
     
+    Runs every stage of ``prediction_pipeline`` in one task, for callers
+    that want the whole prediction on a single worker.
+    
     Args:
         user_id (int): The ID of the user requesting the prediction
         ticker (str): The stock ticker symbol to predict
+        job_id (str): Optional job record to report progress to (async API)
     
     Returns:
         dict: The prediction result with metrics and plot URLs
     """
     try:
-        # Get the user
-        user = User.objects.get(id=user_id)
-        
-        # Run the prediction
-        predictor = StockPredictor(ticker)
-        result = predictor.run()
-        
-        # Save the prediction to the database
-        prediction = Prediction.objects.create(
-            user=user,
-            ticker=result['ticker'],
-            metrics={
-                "next_day_price": result["next_day_price"],
-                "mse": result["mse"],
-                "rmse": result["rmse"],
-                "r2": result["r2"],
-            },
-            plot_urls=result["plot_urls"]
-        )
-        
-        return {
-            "success": True,
-            "prediction_id": prediction.id,
-            "ticker": result['ticker'],
-            "next_day_price": result["next_day_price"]
-        }
-        
-    except User.DoesNotExist:
-        return {
-            "success": False,
-            "error": f"User with id {user_id} does not exist"
-        }
+        _get_user(user_id)
+        result = compute_prediction(ticker, job_id=job_id)
+        return save_prediction(result, user_id, job_id=job_id)
     except Exception as e:
+        update_job(job_id, status="failed", error=str(e))
         return {
             "success": False,
             "error": str(e)
@@ -76,6 +183,8 @@ def run_stock_prediction_telegram(user_id, ticker, chat_id):
     """
     Celery task to run stock prediction and send results back to Telegram.
     
+    Runs every stage of ``telegram_prediction_pipeline`` in one task.
+    
     Args:
         user_id (int): The ID of the user requesting the prediction
         ticker (str): The stock ticker symbol to predict
@@ -84,44 +193,20 @@ def run_stock_prediction_telegram(user_id, ticker, chat_id):
     Returns:
         dict: Status of the operation
     """
+    logger.info(f"Running stock prediction for ticker {ticker}, user {user_id}, chat {chat_id}")
     try:
-        logger.info(f"Running stock prediction for ticker {ticker}, user {user_id}, chat {chat_id}")
-        
-        # Get the user
-        user = User.objects.get(id=user_id)
-        
-        # Run the prediction
-        predictor = StockPredictor(ticker)
-        result = predictor.run()
-        
-        # Save the prediction to the database
-        prediction = Prediction.objects.create(
-            user=user,
-            ticker=result['ticker'],
-            metrics={
-                "next_day_price": result["next_day_price"],
-                "mse": result["mse"],
-                "rmse": result["rmse"],
-                "r2": result["r2"],
-            },
-            plot_urls=result["plot_urls"]
-        )
-        
-        # Send results back to the user via Telegram
-        asyncio.run(send_telegram_prediction_result(chat_id, result))
-        
-        return {
-            "success": True,
-            "prediction_id": prediction.id,
-            "ticker": result['ticker'],
-            "chat_id": chat_id
-        }
-        
-    except User.DoesNotExist:
-        error_msg = f"User with id {user_id} does not exist"
+        _get_user(user_id)
+    except ValueError as e:
+        error_msg = str(e)
         logger.error(error_msg)
         asyncio.run(send_telegram_error(chat_id, error_msg))
         return {"success": False, "error": error_msg}
+    
+    try:
+        # Only the next-day price is computed here; metrics and plots come from
+        # the latest cached evaluation, which is refreshed in the background
+        result = compute_next_day(ticker)
+        return send_prediction(result, user_id, chat_id)
         
     except Exception as e:
         error_msg = f"Error predicting {ticker}: {str(e)}"
@@ -131,17 +216,139 @@ def run_stock_prediction_telegram(user_id, ticker, chat_id):
         return {"success": False, "error": error_msg}
 
 
-async def send_telegram_prediction_result(chat_id, prediction_result):
+@shared_task
+def predict_batch(bulk_id, tickers, source=None):
+    """
+    CPU stage of a bulk prediction: predict and save one batch, then record its outcome.
+
+    The task is acknowledged late, so a worker crash redelivers it: tickers
+    that already have an outcome are skipped. Any failure is recorded for
+    the whole batch, so the record still completes.
+    """
+    try:
+        user_id, tickers = bulk.pending(bulk_id, tickers)
+        output = bulk.run_batch(tickers, user_id, source=source) if tickers else {"results": {}, "errors": {}}
+    except Exception as e:
+        logger.error(f"Batch of bulk prediction {bulk_id} failed: {e}")
+        logger.error(traceback.format_exc())
+        output = {"results": {}, "errors": {t.upper(): str(e) for t in tickers}}
+    try:
+        record = bulk.merge(bulk_id, output)
+    except Exception as e:
+        logger.error(f"Could not record batch of bulk prediction {bulk_id}: {e}")
+        logger.error(traceback.format_exc())
+        return {"bulk_id": bulk_id, "success": False, "error": str(e)}
+    if record.status == BulkPrediction.COMPLETED:
+        logger.info(
+            f"Bulk prediction {bulk_id} finished: {len(record.results)} succeeded, {len(record.errors)} failed"
+        )
+    return {"bulk_id": bulk_id, "succeeded": len(output["results"]), "failed": len(output["errors"])}
+
+
+def submit_bulk_prediction(record, batch_size=None, source=None):
+    """
+    Submit every batch of ``record`` to the batch tier of the fair queue,
+    behind interactive work. Returns the number of batches.
+    """
+    batches = bulk.shard(record.tickers, batch_size)
+    for batch in batches:
+        fair_queue.submit(
+            "batch",
+            f"user:{record.user_id}",
+            predict_batch.si(record.id, batch, source=source),
+            cost=len(batch)
+        )
+    return len(batches)
+
+
+@shared_task
+def refresh_prediction_cache(ticker):
+    """
+    Celery task to recompute a cached prediction in the background.
+    
+    Scheduled when a stale result from a previous session was served, so the
+    next request for the ticker gets a fresh one.
+    
+    Args:
+        ticker (str): The stock ticker symbol to refresh
+    
+    Returns:
+        dict: Status of the refresh
+    """
+    try:
+        get_cached_prediction(
+            ticker,
+            compute=lambda: StockPredictor(ticker).run(),
+            allow_stale=False
+        )
+        return {"success": True, "ticker": ticker.upper()}
+    except Exception as e:
+        logger.error(f"Error refreshing cached prediction for {ticker}: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@shared_task
+def warm_ticker(ticker):
+    """Precompute the cached prediction and plots of one ticker; never fails its lane."""
+    try:
+        cache_warming.warm_ticker(ticker)
+        return {"success": True, "ticker": ticker}
+    except Exception as e:
+        logger.error(f"Error warming cached prediction for {ticker}: {e}")
+        return {"success": False, "ticker": ticker, "error": str(e)}
+
+
+@shared_task
+def warm_prediction_cache(force=False):
+    """
+    Beat task: warm the result cache for popular tickers before the open.
+    
+    Runs every half hour on weekdays but only acts inside the pre-market
+    window, once per session (``force`` skips both checks). The tickers are
+    split into CACHE_WARM_CONCURRENCY lanes of sequential ``warm_ticker``
+    tasks on the cpu queue.
+    
+    Returns:
+        dict: The tickers queued, or why nothing was done
+    """
+    claim = None
+    if not force:
+        if not cache_warming.in_warm_window():
+            return {"queued": [], "skipped": "outside warm window"}
+        session = last_completed_session().isoformat()
+        # Later runs in the window find the session already claimed
+        claim = f"cache-warm:{session}"
+        if not cache.add(claim, 1, timeout=24 * 3600):
+            return {"queued": [], "skipped": f"already warmed for {session}"}
+    
+    try:
+        tickers = cache_warming.warm_targets()
+        if tickers:
+            group(
+                chain(warm_ticker.si(ticker) for ticker in lane)
+                for lane in cache_warming.lanes(tickers)
+            ).apply_async()
+    except Exception:
+        # Nothing was queued: give the session back to the next run in the window
+        if claim:
+            cache.delete(claim)
+        raise
+    logger.info(f"Queued cache warming of {len(tickers)} tickers: {', '.join(tickers)}")
+    return {"queued": tickers}
+
+
+async def send_telegram_prediction_result(chat_id, prediction_result, render_plots=True):
     """
     Send the prediction result to a Telegram chat.
     
     Args:
         chat_id (str): The Telegram chat ID to send the message to
         prediction_result (dict): The prediction result dictionary from StockPredictor
+        render_plots (bool): Render plots nobody viewed yet; otherwise they are sent as URLs
     """
     try:
         # Create bot instance
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN, request=InstrumentedRequest())
         
         # Format the prediction message
         ticker = prediction_result['ticker']
@@ -150,14 +357,16 @@ async def send_telegram_prediction_result(chat_id, prediction_result):
         rmse = prediction_result['rmse']
         r2 = prediction_result['r2']
         
-        message = (
-            f"📊 *Stock Prediction: {ticker}*\n\n"
-            f"*Next Day Price:* ${next_day_price}\n\n"
-            f"*Metrics:*\n"
-            f"- MSE: {mse}\n"
-            f"- RMSE: {rmse}\n"
-            f"- R²: {r2}\n"
-        )
+        message = f"📊 *Stock Prediction: {ticker}*\n\n*Next Day Price:* ${next_day_price}\n\n"
+        if mse is None:
+            message += "_Metrics are being computed and will be available shortly._\n"
+        else:
+            message += (
+                f"*Metrics:*\n"
+                f"- MSE: {mse}\n"
+                f"- RMSE: {rmse}\n"
+                f"- R²: {r2}\n"
+            )
         
         # Send the text message
         await bot.send_message(
@@ -172,15 +381,16 @@ async def send_telegram_prediction_result(chat_id, prediction_result):
         for plot_url in prediction_result['plot_urls']:
             full_url = f"{base_url}{plot_url}"
             try:
-                # Try to send the image directly from the file path
-                image_path = os.path.join(settings.MEDIA_ROOT, plot_url.lstrip('/media/'))
+                # Send the image itself, rendering it now if nobody viewed it yet
+                image_path = await sync_to_async(resolve_plot_file)(plot_url, render=render_plots)
                 
-                if os.path.exists(image_path):
-                    await bot.send_photo(
-                        chat_id=chat_id,
-                        photo=open(image_path, 'rb'),
-                        caption=f"{ticker} - {os.path.basename(plot_url)}"
-                    )
+                if image_path:
+                    with open(image_path, 'rb') as photo_file:
+                        await bot.send_photo(
+                            chat_id=chat_id,
+                            photo=photo_file,
+                            caption=f"{ticker} - {os.path.basename(plot_url)}"
+                        )
                 else:
                     # If the file doesn't exist locally, send the URL
                     await bot.send_message(
@@ -211,7 +421,7 @@ async def send_telegram_error(chat_id, error_message):
         error_message (str): The error message to send
     """
     try:
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN, request=InstrumentedRequest())
         
         message = (
             f"❌ *Error*\n\n"
@@ -13,8 +13,12 @@ from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 import pytz
 
-from core.models import TelegramProfile
-from core.tasks import run_stock_prediction_telegram
+from core.models import Prediction, TelegramProfile
+from core.services import admission, fair_queue, metrics
+from core.services.plot_store import resolve_plot_file
+from core.services.result_cache import peek_cached_prediction
+from core.telegram.request import InstrumentedRequest
+from core.tasks import send_telegram_prediction_result, telegram_prediction_pipeline
 from core.utils import check_rate_limit
 
 # Configure logging
@@ -136,6 +140,34 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text(help_text)
 
 
+async def reply_overloaded(update: Update, user, ticker, decision) -> None:
+    """
+    Answer a /predict that was not admitted: with the cached prediction for
+    the ticker if there is one, otherwise ask the user to retry later.
+    """
+    chat_id = update.effective_chat.id
+    cached = await sync_to_async(peek_cached_prediction)(ticker)
+    if cached is None:
+        metrics.ADMISSION_DECISIONS.labels(channel="telegram", decision="rejected").inc()
+        await update.message.reply_text(
+            f"The prediction service is busy right now. Please try /predict {ticker} again in {decision.retry_after} seconds."
+        )
+        return
+    
+    metrics.ADMISSION_DECISIONS.labels(channel="telegram", decision="degraded").inc()
+    await sync_to_async(Prediction.objects.create)(
+        user=user,
+        ticker=cached["ticker"],
+        metrics={name: cached[name] for name in ("next_day_price", "mse", "rmse", "r2")},
+        plot_urls=cached["plot_urls"]
+    )
+    await update.message.reply_text(
+        f"The prediction service is busy, so here is the most recent prediction for {ticker}."
+    )
+    # No plot rendering in the bot process while the workers are overloaded
+    await send_telegram_prediction_result(chat_id, cached, render_plots=False)
+
+
 async def predict_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handler for the /predict command.
@@ -177,15 +209,22 @@ async def predict_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         telegram_profile = await sync_to_async(lambda: TelegramProfile.objects.select_related("user").get(chat_id=str(chat_id)))()
         user = telegram_profile.user
         logger.info(f"Found user {user.username} for chat_id {chat_id}")
+        
+        decision = await sync_to_async(admission.admit)("telegram")
+        if not decision.allowed:
+            await reply_overloaded(update, user, ticker, decision)
+            return
+        metrics.ADMISSION_DECISIONS.labels(channel="telegram", decision="admitted").inc()
+        
         # Send immediate response
         await update.message.reply_text(f"Prediction started for {ticker}... ({remaining} predictions remaining this minute)")
         
         logger.info(f"Queuing prediction task for user {user.username} with ticker {ticker}")
-        # Queue the Celery task
-        await sync_to_async(run_stock_prediction_telegram.delay)(
-            user.id, 
-            ticker, 
-            chat_id
+        # Queue the fetch, predict and send stages, sharing the workers fairly between chats
+        await sync_to_async(fair_queue.submit)(
+            "telegram",
+            f"telegram:{chat_id}",
+            telegram_prediction_pipeline(user.id, ticker, chat_id)
         )
         logger.info(f"Prediction task queued for user {user.username} with ticker {ticker}")
         
@@ -251,10 +290,10 @@ async def latest_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             
             for plot_url in plot_urls:
                 try:
-                    # Try to send the image directly from the file path
-                    image_path = os.path.join(settings.MEDIA_ROOT, plot_url.lstrip('/media/'))
+                    # Send the image if it was rendered already; the bot never draws charts
+                    image_path = await sync_to_async(resolve_plot_file)(plot_url, render=False)
                     
-                    if os.path.exists(image_path):
+                    if image_path:
                         with open(image_path, 'rb') as photo_file:
                             await context.bot.send_photo(
                                 chat_id=chat_id,
@@ -262,7 +301,7 @@ async def latest_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                                 caption=f"{ticker} - {os.path.basename(plot_url)}"
                             )
                     else:
-                        # If the file doesn't exist locally, send the URL
+                        # Not rendered yet: the link renders it on first view
                         full_url = f"{base_url}{plot_url}"
                         await update.message.reply_text(f"Plot available at: {full_url}")
                         
@@ -294,8 +333,13 @@ def create_application() -> Application:
         logger.error("TELEGRAM_BOT_TOKEN not set in environment variables")
         raise ValueError("TELEGRAM_BOT_TOKEN not set in environment variables")
     
-    # Create the Application
-    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    # Create the Application; replies are timed, long polling (getUpdates) is not
+    application = (
+        Application.builder()
+        .token(settings.TELEGRAM_BOT_TOKEN)
+        .request(InstrumentedRequest())
+        .build()
+    )
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start_command))
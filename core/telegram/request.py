@@ -0,0 +1,15 @@
+"""
+HTTP transport for the Telegram Bot API that records call latency.
+"""
+from telegram.request import HTTPXRequest
+
+from core.services import metrics
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """``HTTPXRequest`` timing every Bot API call by method name."""
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        with metrics.time_telegram(api_method):
+            return await super().do_request(url, method, request_data=request_data, **kwargs)
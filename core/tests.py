@@ -1,20 +1,60 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.core.cache import cache
+from django.conf import settings
 from django.http import JsonResponse
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from asgiref.sync import sync_to_async
 from unittest.mock import patch, MagicMock
-from datetime import timedelta
+from django.core.management import CommandError, call_command
+from io import StringIO
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import date, datetime, timedelta
+import base64
 import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytz
 
 from .views import HealthCheckView
-from .models import Prediction
-from .tasks import run_stock_prediction
+from .models import BulkPrediction, Prediction
+from .tasks import (
+    fetch_prices,
+    predict_batch,
+    prediction_failed,
+    prediction_pipeline,
+    run_stock_prediction,
+    submit_bulk_prediction,
+    telegram_prediction_pipeline,
+    warm_prediction_cache,
+)
+from .services import model_registry
+from .services.predictor import StockPredictor, make_windows, last_window, predict_many
+from .services.price_store import PriceStore
+from .services.data_sources import FileSource, SyntheticSource
+from .services.inference_server import InferenceServer
+from .services.plotting import lttb_indices, render_line_chart
+from .services import admission, bulk, cache_warming, fair_queue, plot_store, result_cache
+from .services.result_cache import get_cached_prediction, get_next_day_prediction
+from .services.jobs import create_job, get_job
+from .benchmarks.windowing import loop_windows
+from .utils import check_rate_limit
+from .utils import rate_limiter
+from .utils.rate_limiter import LocalSlidingWindowLimiter
 
 User = get_user_model()
 
+# Keep cached predictions and rate limits of one test from leaking into another
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 class HealthCheckViewTest(TestCase):
     """Test cases for HealthCheckView"""
@@ -43,11 +83,42 @@ class HealthCheckViewTest(TestCase):
         self.assertEqual(response_data, {"status": "ok"})
 
 
+@override_settings(CACHES=LOCMEM_CACHES)
+class MetricsViewTest(TestCase):
+    """Test cases for the Prometheus metrics endpoint"""
+    
+    def test_metrics_exposes_pipeline_series(self):
+        """Test the endpoint serves the text format including recorded decisions"""
+        check_rate_limit('metrics-test:1', limit=1)
+        check_rate_limit('metrics-test:1', limit=1)
+        
+        response = self.client.get(reverse('metrics'))
+        body = response.content.decode()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response['Content-Type'])
+        self.assertIn('predictor_stage_seconds', body)
+        self.assertIn('rate_limit_decisions_total{channel="metrics-test",decision="rejected"}', body)
+    
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token_required_when_configured(self):
+        """Test a configured token must be sent as a bearer token"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ADMISSION_CONTROL=False)
 class PredictViewTest(APITestCase):
     """Test cases for PredictView"""
     
     def setUp(self):
         """Set up test client and user"""
+        cache.clear()
+        rate_limiter.reset()
         self.client = APIClient()
         self.user = User.objects.create_user(
             username='testuser',
@@ -172,10 +243,10 @@ class PredictionListViewTest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
         
         # Check that only user1's predictions are returned
-        tickers = [pred['ticker'] for pred in response.data]
+        tickers = [pred['ticker'] for pred in response.data['results']]
         self.assertIn('AAPL', tickers)
         self.assertIn('GOOGL', tickers)
         self.assertNotIn('TSLA', tickers)
@@ -188,8 +259,8 @@ class PredictionListViewTest(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # The second prediction (GOOGL) should be first as it was created later
-        self.assertEqual(response.data[0]['ticker'], 'GOOGL')
-        self.assertEqual(response.data[1]['ticker'], 'AAPL')
+        self.assertEqual(response.data['results'][0]['ticker'], 'GOOGL')
+        self.assertEqual(response.data['results'][1]['ticker'], 'AAPL')
     
     def test_prediction_list_empty_for_new_user(self):
         """Test new user with no predictions gets empty list"""
@@ -203,14 +274,214 @@ class PredictionListViewTest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
+    
+    def test_prediction_list_fields(self):
+        """Test rows carry the same fields as the serializer did"""
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse('predictions'))
+        
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'ticker', 'created', 'metrics', 'plot_urls'})
+        self.assertEqual(row['id'], self.prediction2.id)
+        self.assertEqual(row['metrics']['next_day_price'], 2500.0)
+    
+    @override_settings(PREDICTIONS_PAGE_SIZE=2)
+    def test_prediction_list_cursor_pages(self):
+        """Test following next links walks every prediction exactly once, newest first"""
+        base = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            prediction = Prediction.objects.create(
+                user=self.user1, ticker=f'T{i}', metrics={}, plot_urls=[]
+            )
+            prediction.created = base - timedelta(minutes=i)
+            prediction.save()
+        self.client.force_authenticate(user=self.user1)
+        
+        ids = []
+        url = reverse('predictions')
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        
+        expected = list(
+            Prediction.objects.filter(user=self.user1).order_by('-created').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(ids), 7)
+    
+    def test_prediction_list_filter_by_ticker(self):
+        """Test ?ticker= filters case-insensitively on the symbol"""
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse('predictions'), {'ticker': 'aapl'})
+        
+        self.assertEqual([row['ticker'] for row in response.data['results']], ['AAPL'])
+    
+    def test_prediction_list_filter_by_date_range(self):
+        """Test ?created_after= and ?created_before= bound the creation time"""
+        self.client.force_authenticate(user=self.user1)
+        cutoff = (self.prediction1.created + timedelta(minutes=5)).isoformat()
+        
+        after = self.client.get(reverse('predictions'), {'created_after': cutoff})
+        before = self.client.get(reverse('predictions'), {'created_before': cutoff})
+        
+        self.assertEqual([row['ticker'] for row in after.data['results']], ['GOOGL'])
+        self.assertEqual([row['ticker'] for row in before.data['results']], ['AAPL'])
+    
+    def test_prediction_list_filter_by_day(self):
+        """Test a bare date for created_before includes the whole day"""
+        self.client.force_authenticate(user=self.user1)
+        today = timezone.localdate(self.prediction2.created).isoformat()
+        response = self.client.get(reverse('predictions'), {'created_before': today})
+        
+        self.assertEqual(len(response.data['results']), 2)
+    
+    def test_prediction_list_invalid_date(self):
+        """Test an unparsable date filter returns 400"""
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse('predictions'), {'created_after': 'yesterday'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_prediction_list_not_modified(self):
+        """Test a repeat request with the ETag gets 304 until a prediction is added"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('predictions')
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.assertIn('Last-Modified', first)
+        
+        repeat = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(repeat['ETag'], etag)
+        
+        Prediction.objects.create(user=self.user1, ticker='MSFT', metrics={}, plot_urls=[])
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed['ETag'], etag)
+    
+    def test_prediction_list_etag_per_query(self):
+        """Test filtered lists and other users' lists have their own ETags"""
+        self.client.force_authenticate(user=self.user1)
+        etag = self.client.get(reverse('predictions'))['ETag']
+        
+        filtered = self.client.get(reverse('predictions'), {'ticker': 'AAPL'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(filtered.status_code, status.HTTP_200_OK)
+        
+        self.client.force_authenticate(user=self.user2)
+        other = self.client.get(reverse('predictions'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+    
+    def test_prediction_list_etag_after_delete(self):
+        """Test deleting a prediction invalidates the list ETag"""
+        self.client.force_authenticate(user=self.user1)
+        etag = self.client.get(reverse('predictions'))['ETag']
+        
+        self.prediction1.delete()
+        response = self.client.get(reverse('predictions'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+    
+    def test_prediction_detail(self):
+        """Test the detail endpoint returns one prediction and honours its ETag"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('prediction-detail', args=[self.prediction1.id])
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['ticker'], 'AAPL')
+        self.assertIn('max-age', response['Cache-Control'])
+        
+        repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_prediction_detail_other_user(self):
+        """Test users cannot read each other's predictions"""
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse('prediction-detail', args=[self.prediction3.id]))
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PredictionSeriesViewTest(APITestCase):
+    """Test cases for the prediction series endpoint"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmpdir)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            username='seriesuser',
+            email='series@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        dates = pd.bdate_range('2015-01-01', periods=2520).values
+        history = plot_store.save_chart([(None, dates, np.linspace(100, 200, 2520))], 'AAPL history')
+        steps = np.arange(2460)
+        pred = plot_store.save_chart(
+            [('Actual', steps, np.linspace(100, 200, 2460)), ('Predicted', steps, np.linspace(101, 201, 2460))],
+            'Actual vs Predicted Prices'
+        )
+        self.prediction = Prediction.objects.create(
+            user=self.user,
+            ticker='AAPL',
+            metrics={'next_day_price': 200.0},
+            plot_urls=[plot_store.chart_url(history), plot_store.chart_url(pred)]
+        )
+        self.url = reverse('prediction-series', args=[self.prediction.id])
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def decode(self, value):
+        return np.frombuffer(base64.b64decode(value), dtype='<f4')
+    
+    def test_series_are_float32_and_downsampled(self):
+        """Test series decode to float32 arrays with at most ?points= values"""
+        response = self.client.get(f'{self.url}?points=500')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        history, pred = response.data['charts']
+        self.assertEqual(history['x_type'], 'date')
+        self.assertEqual(len(self.decode(history['series'][0]['y'])), 500)
+        self.assertEqual(self.decode(history['series'][0]['x'])[0], pd.Timestamp('2015-01-01').value // 86400_000_000_000)
+        self.assertEqual([series['label'] for series in pred['series']], ['Actual', 'Predicted'])
+    
+    def test_etag_allows_not_modified(self):
+        """Test a repeat request with the ETag gets 304"""
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_response_is_gzipped(self):
+        """Test clients accepting gzip get a compressed body"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+    
+    def test_other_users_prediction_is_404(self):
+        """Test series of another user's prediction are not exposed"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=other)
+        
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
 
 
+@override_settings(CACHES=LOCMEM_CACHES)
 class CeleryTaskTest(APITestCase):
     """Test cases for Celery tasks"""
     
     def setUp(self):
         """Set up test user"""
+        cache.clear()
         self.user = User.objects.create_user(
             username='taskuser',
             email='task@example.com',
@@ -267,3 +538,1390 @@ class CeleryTaskTest(APITestCase):
         
         # Verify no prediction was created
         self.assertEqual(Prediction.objects.count(), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PredictionPipelineTest(APITestCase):
+    """Test cases for the staged io/cpu prediction chains"""
+    
+    RESULT = {
+        'ticker': 'AAPL',
+        'next_day_price': 150.25,
+        'mse': 2.5,
+        'rmse': 1.58,
+        'r2': 0.85,
+        'plot_urls': []
+    }
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='pipelineuser',
+            email='pipeline@example.com',
+            password='testpass123'
+        )
+    
+    def test_pipeline_stages_and_queues(self):
+        """Test the API chain is fetch (io), predict (cpu), save (io)"""
+        pipeline = prediction_pipeline(self.user.id, 'AAPL', job_id='job')
+        names = [task.task for task in pipeline.tasks]
+        
+        self.assertEqual(names, ['core.tasks.fetch_prices', 'core.tasks.compute_prediction', 'core.tasks.save_prediction'])
+        queues = [settings.CELERY_TASK_ROUTES[name]['queue'] for name in names]
+        self.assertEqual(queues, ['io', 'cpu', 'io'])
+    
+    def test_telegram_pipeline_stages_and_queues(self):
+        """Test the Telegram chain is fetch (io), predict and render (cpu), send (io)"""
+        pipeline = telegram_prediction_pipeline(self.user.id, 'aapl', '123')
+        names = [task.task for task in pipeline.tasks]
+        
+        self.assertEqual(names, ['core.tasks.fetch_prices', 'core.tasks.compute_next_day', 'core.tasks.send_prediction'])
+        queues = [settings.CELERY_TASK_ROUTES[name]['queue'] for name in names]
+        self.assertEqual(queues, ['io', 'cpu', 'io'])
+    
+    @patch('core.tasks.get_price_store')
+    @patch('core.tasks.StockPredictor')
+    def test_pipeline_runs_and_saves(self, mock_predictor_class, mock_get_store):
+        """Test the chain updates the price store, predicts once and saves the result"""
+        mock_predictor_class.return_value.run.return_value = self.RESULT
+        job_id = create_job(self.user.id, 'AAPL')
+        
+        result = prediction_pipeline(self.user.id, 'AAPL', job_id=job_id).apply().get()
+        
+        mock_get_store.return_value.update.assert_called_once_with('AAPL')
+        mock_predictor_class.return_value.run.assert_called_once()
+        self.assertTrue(result['success'])
+        prediction = Prediction.objects.get(id=result['prediction_id'])
+        self.assertEqual(prediction.metrics['next_day_price'], 150.25)
+        self.assertEqual(get_job(job_id)['status'], 'succeeded')
+    
+    def test_prediction_failed_marks_job(self):
+        """Test the chain error callback fails the job"""
+        job_id = create_job(self.user.id, 'AAPL')
+        
+        prediction_failed(MagicMock(id='task'), ValueError('No data found'), None, job_id=job_id)
+        
+        job = get_job(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'No data found')
+    
+    @patch('core.tasks.send_telegram_error')
+    def test_prediction_failed_tells_chat(self, mock_send_error):
+        """Test the Telegram chain error callback reports to the chat"""
+        prediction_failed(MagicMock(id='task'), ValueError('boom'), None, chat_id='123', ticker='AAPL')
+        
+        mock_send_error.assert_called_once_with('123', 'Error predicting AAPL: boom')
+    
+    @patch('core.management.commands.startcelery.subprocess.Popen')
+    def test_startcelery_roles(self, mock_popen):
+        """Test --role all starts a thread-pool io worker, a prefork cpu worker and the dispatcher"""
+        mock_popen.return_value.poll.return_value = 0
+        call_command('startcelery', stdout=StringIO())
+        
+        io_cmd, cpu_cmd, dispatcher_cmd = [call.args[0] for call in mock_popen.call_args_list]
+        self.assertIn('threads', io_cmd)
+        self.assertEqual(io_cmd[io_cmd.index('-Q') + 1], 'io')
+        self.assertIn('prefork', cpu_cmd)
+        self.assertEqual(cpu_cmd[cpu_cmd.index('-Q') + 1], 'cpu,celery')
+        self.assertEqual(dispatcher_cmd[-1], 'dispatchpredictions')
+    
+    @patch('core.management.commands.startcelery.subprocess.Popen')
+    def test_startcelery_rejects_worker_options_for_all_roles(self, mock_popen):
+        """Test --concurrency and --queue need a single worker role"""
+        with self.assertRaises(CommandError):
+            call_command('startcelery', concurrency=4, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('startcelery', queue='io', stdout=StringIO())
+        
+        mock_popen.assert_not_called()
+
+
+class BulkPredictionTest(TestCase):
+    """Test cases for bulk predictions over ticker lists"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.user = User.objects.create_user(
+            username='bulkuser',
+            email='bulk@example.com',
+            password='testpass123'
+        )
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    @staticmethod
+    def fake_predict_many(tickers, source=None):
+        """Predicts every ticker except BAD"""
+        results, errors = {}, {}
+        for ticker in tickers:
+            if ticker == 'BAD':
+                errors[ticker] = ValueError('No data found for ticker BAD')
+            else:
+                results[ticker] = {
+                    'ticker': ticker,
+                    'next_day_price': 100.0,
+                    'mse': 1.0,
+                    'rmse': 1.0,
+                    'r2': 0.9,
+                    'plot_urls': []
+                }
+        return results, errors
+    
+    def test_parse_tickers(self):
+        """Test tickers are split on whitespace and commas, comments dropped, deduplicated"""
+        text = "aapl, MSFT\n# watchlist\nTSLA  AAPL # again\n\n"
+        
+        self.assertEqual(bulk.parse_tickers(text), ['AAPL', 'MSFT', 'TSLA'])
+    
+    def test_shard(self):
+        """Test batches cover the list in order"""
+        self.assertEqual(bulk.shard(['A', 'B', 'C', 'D', 'E'], 2), [['A', 'B'], ['C', 'D'], ['E']])
+    
+    @patch('core.services.bulk.predict_many')
+    def test_run_local_aggregates_results_and_failures(self, mock_predict_many):
+        """Test every batch is saved and merged into one summary record"""
+        mock_predict_many.side_effect = self.fake_predict_many
+        record = BulkPrediction.objects.create(user=self.user, tickers=['AAPL', 'BAD', 'MSFT'])
+        
+        record = bulk.run_local(record, batch_size=2)
+        
+        self.assertEqual(mock_predict_many.call_count, 2)
+        self.assertEqual(record.status, BulkPrediction.COMPLETED)
+        self.assertIsNotNone(record.finished)
+        self.assertEqual(set(record.results), {'AAPL', 'MSFT'})
+        self.assertEqual(record.errors, {'BAD': 'No data found for ticker BAD'})
+        self.assertEqual(Prediction.objects.filter(user=self.user).count(), 2)
+        prediction = Prediction.objects.get(id=record.results['AAPL']['prediction_id'])
+        self.assertEqual(prediction.metrics['next_day_price'], 100.0)
+    
+    @patch('core.services.bulk.predict_many')
+    def test_failed_batch_is_recorded(self, mock_predict_many):
+        """Test a batch that cannot run fails its tickers without stopping the rest"""
+        mock_predict_many.side_effect = [FileNotFoundError('model missing'), self.fake_predict_many(['MSFT'])]
+        record = BulkPrediction.objects.create(user=self.user, tickers=['AAPL', 'MSFT'])
+        
+        record = bulk.run_local(record, batch_size=1)
+        
+        self.assertEqual(record.errors, {'AAPL': 'model missing'})
+        self.assertEqual(set(record.results), {'MSFT'})
+    
+    @patch('core.tasks.fair_queue.submit')
+    def test_submit_batches_to_fair_queue(self, mock_submit):
+        """Test every batch is submitted to the batch tier, costed by its size"""
+        record = BulkPrediction.objects.create(user=self.user, tickers=['A', 'B', 'C', 'D', 'E'])
+        
+        self.assertEqual(submit_bulk_prediction(record, batch_size=2), 3)
+        
+        calls = mock_submit.call_args_list
+        self.assertEqual([call.args[:2] for call in calls], [('batch', f'user:{self.user.id}')] * 3)
+        self.assertEqual([call.args[2].args[1] for call in calls], [['A', 'B'], ['C', 'D'], ['E']])
+        self.assertEqual([call.kwargs['cost'] for call in calls], [2, 2, 1])
+    
+    @patch('core.services.bulk.predict_many')
+    def test_batches_merge_into_record(self, mock_predict_many):
+        """Test the record completes once the last batch has merged its outcomes"""
+        mock_predict_many.side_effect = self.fake_predict_many
+        record = BulkPrediction.objects.create(user=self.user, tickers=['AAPL', 'BAD', 'MSFT'])
+        
+        predict_batch(record.id, ['AAPL', 'BAD'])
+        record.refresh_from_db()
+        self.assertEqual(record.status, BulkPrediction.RUNNING)
+        
+        predict_batch(record.id, ['MSFT'])
+        record.refresh_from_db()
+        self.assertEqual(record.status, BulkPrediction.COMPLETED)
+        self.assertIsNotNone(record.finished)
+        self.assertEqual(set(record.results), {'AAPL', 'MSFT'})
+        self.assertEqual(set(record.errors), {'BAD'})
+    
+    @patch('core.services.bulk.predict_many')
+    def test_redelivered_batch_is_not_predicted_again(self, mock_predict_many):
+        """Test a batch delivered twice saves and merges its tickers once"""
+        mock_predict_many.side_effect = self.fake_predict_many
+        record = BulkPrediction.objects.create(user=self.user, tickers=['AAPL', 'MSFT'])
+        
+        predict_batch(record.id, ['AAPL'])
+        predict_batch(record.id, ['AAPL'])
+        
+        mock_predict_many.assert_called_once()
+        self.assertEqual(Prediction.objects.filter(user=self.user).count(), 1)
+        record.refresh_from_db()
+        self.assertEqual(record.status, BulkPrediction.RUNNING)
+    
+    @patch('core.tasks.bulk.run_batch', side_effect=RuntimeError('worker lost'))
+    def test_batch_failure_completes_record(self, mock_run_batch):
+        """Test an unexpected batch failure is recorded for its tickers"""
+        record = BulkPrediction.objects.create(user=self.user, tickers=['AAPL', 'MSFT'])
+        
+        predict_batch(record.id, ['aapl', 'MSFT'])
+        
+        record.refresh_from_db()
+        self.assertEqual(record.status, BulkPrediction.COMPLETED)
+        self.assertEqual(record.errors, {'AAPL': 'worker lost', 'MSFT': 'worker lost'})
+    
+    @patch('core.services.bulk.predict_many')
+    def test_command_tickers_file(self, mock_predict_many):
+        """Test predict --tickers-file runs a bulk prediction and prints its summary"""
+        mock_predict_many.side_effect = self.fake_predict_many
+        path = os.path.join(self.tmpdir, 'watchlist.txt')
+        with open(path, 'w') as f:
+            f.write('AAPL\nBAD\nMSFT\n')
+        out = StringIO()
+        
+        call_command('predict', '--tickers-file', path, stdout=out)
+        
+        record = BulkPrediction.objects.get()
+        self.assertEqual(record.tickers, ['AAPL', 'BAD', 'MSFT'])
+        self.assertIn('2 succeeded, 1 failed', out.getvalue())
+    
+    @patch('core.tasks.submit_bulk_prediction')
+    def test_command_via_celery(self, mock_submit):
+        """Test predict --via-celery queues the batches instead of predicting"""
+        out = StringIO()
+        
+        call_command('predict', '--all', '--via-celery', stdout=out)
+        
+        record = BulkPrediction.objects.get()
+        mock_submit.assert_called_once_with(record, None, None)
+        self.assertEqual(record.status, BulkPrediction.RUNNING)
+        self.assertIn('Queued bulk prediction', out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CACHE_WARM_WATCHLIST='', CACHE_WARM_MAX_TICKERS=50, CACHE_WARM_CONCURRENCY=2)
+class CacheWarmingTest(TestCase):
+    """Test cases for pre-market cache warming"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='warmuser',
+            email='warm@example.com',
+            password='testpass123'
+        )
+        self.system_user = User.objects.create_user(
+            username=cache_warming.SYSTEM_USERNAME,
+            email='system@example.com',
+            password='testpass123'
+        )
+    
+    def request(self, ticker, times, user=None):
+        for _ in range(times):
+            Prediction.objects.create(user=user or self.user, ticker=ticker, metrics={}, plot_urls=[])
+    
+    def test_warm_window(self):
+        """Test warming only happens on weekdays between the warm start and the open"""
+        ny = pytz.timezone('America/New_York')
+        
+        self.assertTrue(cache_warming.in_warm_window(ny.localize(datetime(2025, 7, 7, 7, 0))))
+        self.assertFalse(cache_warming.in_warm_window(ny.localize(datetime(2025, 7, 7, 9, 45))))
+        self.assertFalse(cache_warming.in_warm_window(ny.localize(datetime(2025, 7, 7, 5, 0))))
+        self.assertFalse(cache_warming.in_warm_window(ny.localize(datetime(2025, 7, 5, 7, 0))))
+    
+    def test_popular_tickers(self):
+        """Test tickers are ranked by requests, ignoring the system user and old rows"""
+        self.request('AAPL', 3)
+        self.request('TSLA', 1)
+        self.request('MSFT', 2)
+        self.request('NVDA', 10, user=self.system_user)
+        old = Prediction.objects.create(user=self.user, ticker='IBM', metrics={}, plot_urls=[])
+        Prediction.objects.filter(id=old.id).update(created=timezone.now() - timedelta(days=30))
+        
+        self.assertEqual(cache_warming.popular_tickers(10), ['AAPL', 'MSFT', 'TSLA'])
+        self.assertEqual(cache_warming.popular_tickers(2), ['AAPL', 'MSFT'])
+    
+    @override_settings(CACHE_WARM_WATCHLIST='spy, AAPL', CACHE_WARM_MAX_TICKERS=3)
+    def test_warm_targets(self):
+        """Test the watchlist comes first and the list is capped"""
+        self.request('AAPL', 3)
+        self.request('MSFT', 2)
+        self.request('TSLA', 1)
+        
+        self.assertEqual(cache_warming.warm_targets(), ['SPY', 'AAPL', 'MSFT'])
+    
+    def test_lanes(self):
+        """Test tickers are dealt into at most the concurrency budget of lanes"""
+        self.assertEqual(cache_warming.lanes(['A', 'B', 'C', 'D', 'E'], 2), [['A', 'C', 'E'], ['B', 'D']])
+        self.assertEqual(cache_warming.lanes(['A'], 4), [['A']])
+    
+    @patch('core.services.cache_warming.resolve_plot_file')
+    @patch('core.services.cache_warming.StockPredictor')
+    def test_warm_ticker_computes_once(self, mock_predictor_class, mock_resolve):
+        """Test warming caches the prediction and renders its plots; warm tickers are skipped"""
+        mock_predictor_class.return_value.run.return_value = {
+            'ticker': 'AAPL', 'next_day_price': 1.0, 'mse': 1.0, 'rmse': 1.0, 'r2': 1.0,
+            'plot_urls': ['/api/v1/plots/a.png', '/api/v1/plots/b.png']
+        }
+        
+        cache_warming.warm_ticker('AAPL')
+        cache_warming.warm_ticker('AAPL')
+        
+        mock_predictor_class.return_value.run.assert_called_once()
+        self.assertEqual(mock_resolve.call_count, 4)
+        self.assertIsNotNone(get_cached_prediction('AAPL', compute=MagicMock(side_effect=AssertionError)))
+    
+    @patch('core.tasks.group')
+    @patch('core.services.cache_warming.in_warm_window', return_value=True)
+    def test_warm_task_runs_once_per_session(self, mock_window, mock_group):
+        """Test the beat task queues the popular tickers once per session"""
+        self.request('AAPL', 2)
+        self.request('MSFT', 1)
+        
+        first = warm_prediction_cache()
+        second = warm_prediction_cache()
+        
+        self.assertEqual(first['queued'], ['AAPL', 'MSFT'])
+        self.assertEqual(second['queued'], [])
+        mock_group.assert_called_once()
+        mock_group.return_value.apply_async.assert_called_once()
+    
+    @patch('core.tasks.group')
+    @patch('core.services.cache_warming.in_warm_window', return_value=True)
+    def test_warm_task_retried_after_failed_enqueue(self, mock_window, mock_group):
+        """Test a run that could not queue the warming does not claim the session"""
+        self.request('AAPL', 1)
+        mock_group.return_value.apply_async.side_effect = [ConnectionError('broker down'), None]
+        
+        with self.assertRaises(ConnectionError):
+            warm_prediction_cache()
+        result = warm_prediction_cache()
+        
+        self.assertEqual(result['queued'], ['AAPL'])
+        self.assertEqual(mock_group.return_value.apply_async.call_count, 2)
+    
+    @patch('core.tasks.group')
+    @patch('core.services.cache_warming.in_warm_window', return_value=False)
+    def test_warm_task_outside_window(self, mock_window, mock_group):
+        """Test the beat task does nothing outside the pre-market window"""
+        self.request('AAPL', 2)
+        
+        result = warm_prediction_cache()
+        
+        self.assertEqual(result['queued'], [])
+        mock_group.assert_not_called()
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    ADMISSION_CONTROL=True,
+    ADMISSION_CACHE_SECONDS=60,
+    ADMISSION_RETRY_AFTER=30,
+    ADMISSION_LIMITS={
+        'api': {'max_queued': 10, 'max_in_flight': 4},
+        'telegram': {'max_queued': 5, 'max_in_flight': 0},
+    }
+)
+class AdmissionControlTest(APITestCase):
+    """Test cases for queue-depth admission control"""
+    
+    RESULT = {
+        'ticker': 'AAPL',
+        'next_day_price': 150.25,
+        'mse': 2.5,
+        'rmse': 1.58,
+        'r2': 0.85,
+        'plot_urls': []
+    }
+    
+    def setUp(self):
+        cache.clear()
+        rate_limiter.reset()
+        admission.reset()
+        self.user = User.objects.create_user(
+            username='admissionuser',
+            email='admission@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def tearDown(self):
+        admission.reset()
+    
+    @patch('core.services.admission.read_load', return_value=admission.Load(queued=3, in_flight=1))
+    def test_admitted_under_limits(self, mock_read_load):
+        """Test requests are admitted while the load is under the limits"""
+        self.assertTrue(admission.admit('api').allowed)
+    
+    @patch('core.services.admission.read_load', return_value=admission.Load(queued=20, in_flight=1))
+    def test_rejected_with_retry_after(self, mock_read_load):
+        """Test the retry hint grows with how far the queue is over its limit"""
+        decision = admission.admit('api')
+        
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.retry_after, 60)
+        self.assertIn('20 queued', decision.reason)
+    
+    @patch('core.services.admission.read_load', return_value=admission.Load(queued=7, in_flight=100))
+    def test_limits_per_channel(self, mock_read_load):
+        """Test each channel has its own limits; 0 disables a limit"""
+        self.assertFalse(admission.admit('api').allowed)
+        decision = admission.admit('telegram')
+        self.assertFalse(decision.allowed)
+        self.assertNotIn('in flight', decision.reason)
+    
+    @patch('core.services.admission.read_load', return_value=admission.Load(queued=0, in_flight=0))
+    def test_load_is_cached(self, mock_read_load):
+        """Test the broker is read once per cache interval"""
+        for _ in range(5):
+            admission.admit('api')
+        
+        mock_read_load.assert_called_once()
+    
+    @patch('core.services.admission.read_load', side_effect=ConnectionError('broker down'))
+    def test_fails_open(self, mock_read_load):
+        """Test requests are admitted when the load cannot be read"""
+        self.assertTrue(admission.admit('api').allowed)
+    
+    @patch('core.views.StockPredictor')
+    @patch('core.services.admission.read_load', return_value=admission.Load(queued=50, in_flight=0))
+    def test_predict_rejected_when_busy(self, mock_read_load, mock_predictor_class):
+        """Test the predict API answers 503 with Retry-After when overloaded and nothing is cached"""
+        response = self.client.post(reverse('predict'), {'ticker': 'AAPL'})
+        
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], str(response.data['retry_after']))
+        mock_predictor_class.assert_not_called()
+        self.assertEqual(Prediction.objects.count(), 0)
+    
+    @patch('core.views.StockPredictor')
+    @patch('core.services.admission.read_load', return_value=admission.Load(queued=50, in_flight=0))
+    def test_predict_served_from_cache_when_busy(self, mock_read_load, mock_predictor_class):
+        """Test an overloaded predict API still answers from the result cache"""
+        get_cached_prediction('AAPL', compute=lambda: self.RESULT)
+        
+        response = self.client.post(reverse('predict'), {'ticker': 'AAPL', 'async': True}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response['X-Prediction-Source'], 'cache')
+        self.assertEqual(response.data['metrics']['next_day_price'], 150.25)
+        mock_predictor_class.assert_not_called()
+
+
+FAIR_QUEUE_SETTINGS = {
+    'CACHES': LOCMEM_CACHES,
+    'FAIR_QUEUE_ENABLED': True,
+    'FAIR_QUEUE_QUANTUM': 1,
+    'FAIR_QUEUE_MAX_DISPATCHED': 8,
+    'FAIR_QUEUE_WEIGHTS': {},
+}
+
+
+class FairQueueCases:
+    """Scheduling cases run against both fair queue implementations; the
+    concrete test classes provide ``make_queue``"""
+    
+    def setUp(self):
+        cache.clear()
+        self.queue = self.make_queue()
+        patcher = patch('core.services.fair_queue.get_fair_queue', return_value=self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    @staticmethod
+    def job(name, cost=1):
+        return json.dumps({'cost': cost, 'queued_at': 0, 'sig': name})
+    
+    def drain(self, tier):
+        order = []
+        while (popped := self.queue.pop(tier)) is not None:
+            order.append(json.loads(popped[1])['sig'])
+        return order
+    
+    def test_tenants_take_turns(self):
+        """Test a tenant with a long backlog does not delay another tenant's job"""
+        for i in range(5):
+            self.queue.push('api', 'user:1', self.job(f'heavy{i}'), 1)
+        self.queue.push('api', 'user:2', self.job('light'), 1)
+        
+        self.assertEqual(self.drain('api'), ['heavy0', 'light', 'heavy1', 'heavy2', 'heavy3', 'heavy4'])
+        self.assertEqual(self.queue.pending(), 0)
+    
+    def test_cost_is_charged_against_share(self):
+        """Test a costly job waits until its tenant has earned enough credit"""
+        self.queue.push('batch', 'user:1', self.job('big', cost=3), 1)
+        for i in range(3):
+            self.queue.push('batch', 'user:2', self.job(f'small{i}'), 1)
+        
+        self.assertEqual(self.drain('batch'), ['small0', 'small1', 'big', 'small2'])
+    
+    def test_weight_scales_share(self):
+        """Test a tenant with twice the quantum gets twice the jobs per round"""
+        for i in range(4):
+            self.queue.push('api', 'user:1', self.job(f'a{i}'), 2)
+            self.queue.push('api', 'user:2', self.job(f'b{i}'), 1)
+        
+        self.assertEqual(self.drain('api'), ['a0', 'a1', 'b0', 'a2', 'a3', 'b1', 'b2', 'b3'])
+    
+    def test_returning_tenant_rejoins_round(self):
+        """Test a tenant whose queue ran empty starts again with fresh credit at the end of the round"""
+        self.queue.push('api', 'user:1', self.job('first'), 1)
+        self.assertEqual(self.drain('api'), ['first'])
+        self.queue.push('api', 'user:2', self.job('other'), 1)
+        self.queue.push('api', 'user:1', self.job('again'), 1)
+        
+        self.assertEqual(self.drain('api'), ['other', 'again'])
+    
+    def test_tiers_are_strict_priorities(self):
+        """Test batch work waits until the API and Telegram tiers are empty"""
+        self.queue.push('batch', 'user:1', self.job('batch'), 1)
+        self.queue.push('telegram', 'telegram:1', self.job('telegram'), 1)
+        self.queue.push('api', 'user:2', self.job('api'), 1)
+        
+        order = [fair_queue.next_job()[:2] for _ in range(3)]
+        
+        self.assertEqual(order, [('api', 'user:2'), ('telegram', 'telegram:1'), ('batch', 'user:1')])
+        self.assertIsNone(fair_queue.next_job())
+        self.assertEqual(fair_queue.pending(), 0)
+    
+    @override_settings(FAIR_QUEUE_MAX_DISPATCHED=2)
+    @patch('core.services.fair_queue.signature')
+    def test_dispatch_respects_budget(self, mock_signature):
+        """Test only FAIR_QUEUE_MAX_DISPATCHED jobs are handed to Celery at a time"""
+        for i in range(3):
+            self.queue.push('api', 'user:1', self.job(f'job{i}'), 1)
+        
+        self.assertEqual(fair_queue.dispatch(), 2)
+        
+        self.assertEqual([call.args[0] for call in mock_signature.call_args_list], ['job0', 'job1'])
+        self.assertEqual(mock_signature.return_value.apply_async.call_count, 2)
+        self.assertEqual(fair_queue.pending(), 1)
+    
+    @patch('core.services.fair_queue.signature')
+    def test_dispatch_keeps_job_when_broker_fails(self, mock_signature):
+        """Test a job that cannot be sent stays queued and is counted once"""
+        mock_signature.return_value.apply_async.side_effect = ConnectionError('broker down')
+        self.queue.push('api', 'user:1', self.job('job'), 1)
+        
+        self.assertEqual(fair_queue.dispatch(), 0)
+        
+        self.assertEqual(fair_queue.pending(), 1)
+        self.assertEqual(self.drain('api'), ['job'])
+        self.assertEqual(fair_queue.pending(), 0)
+    
+    @patch('core.services.fair_queue.dispatch')
+    def test_pipelines_survive_serialization(self, mock_dispatch):
+        """Test a queued chain is rebuilt with its task ids and error callback"""
+        job_id = 'job-1'
+        fair_queue.submit('api', 'user:1', prediction_pipeline(1, 'AAPL', job_id=job_id).set(task_id=job_id))
+        fair_queue.submit('telegram', 'telegram:9', telegram_prediction_pipeline(1, 'aapl', '9'))
+        
+        calls = {}
+        for _ in range(2):
+            tier, tenant, job = fair_queue.next_job()
+            with patch.object(fetch_prices, 'apply_async') as mock_apply_async:
+                fair_queue.signature(json.loads(job)['sig']).apply_async()
+            calls[tier] = mock_apply_async.call_args
+        
+        api_steps = calls['api'].kwargs['chain']
+        self.assertEqual([step.task for step in api_steps], ['core.tasks.save_prediction', 'core.tasks.compute_prediction'])
+        # The chain's task id names its last task, which is what the job record tracks
+        self.assertEqual(api_steps[0].options['task_id'], job_id)
+        for options in [calls['api'].kwargs] + [step.options for step in api_steps]:
+            errback, = options['link_error']
+            self.assertEqual(errback['task'], 'core.tasks.prediction_failed')
+            self.assertEqual(errback['kwargs'], {'job_id': job_id})
+        
+        telegram_steps = calls['telegram'].kwargs['chain']
+        self.assertEqual(telegram_steps[0].task, 'core.tasks.send_prediction')
+        self.assertEqual(tuple(telegram_steps[0].args), (1, '9'))
+        errback, = calls['telegram'].kwargs['link_error']
+        self.assertEqual(errback['kwargs'], {'chat_id': '9', 'ticker': 'AAPL'})
+
+
+@override_settings(**FAIR_QUEUE_SETTINGS)
+class FairQueueTest(FairQueueCases, TestCase):
+    """Test cases for weighted fair queuing of prediction work (in-process queue)"""
+    
+    def make_queue(self):
+        return fair_queue.LocalFairQueue()
+    
+    @override_settings(FAIR_QUEUE_ENABLED=False)
+    def test_disabled_sends_directly(self):
+        """Test work goes straight to Celery when fair queuing is off"""
+        sig = MagicMock()
+        
+        fair_queue.submit('api', 'user:1', sig)
+        
+        sig.apply_async.assert_called_once()
+        self.assertEqual(self.queue.pending(), 0)
+    
+    def test_unknown_tier(self):
+        """Test submitting to a tier that does not exist fails loudly"""
+        with self.assertRaises(ValueError):
+            fair_queue.submit('vip', 'user:1', MagicMock())
+    
+    @override_settings(FAIR_QUEUE_WEIGHTS={'user:1': 3})
+    @patch('core.services.fair_queue.dispatch')
+    def test_submit_uses_configured_weight(self, mock_dispatch):
+        """Test a tenant's FAIR_QUEUE_WEIGHTS entry sets its credit per round"""
+        fair_queue.submit('api', 'user:1', warm_prediction_cache.si())
+        fair_queue.submit('api', 'user:2', warm_prediction_cache.si())
+        
+        self.assertEqual(self.queue.tiers['api']['user:1'][2], 3)
+        self.assertEqual(self.queue.tiers['api']['user:2'][2], 1)
+        mock_dispatch.assert_called()
+    
+    @patch('core.services.fair_queue.signature')
+    @patch('core.services.fair_queue.broker_depth', return_value=0)
+    @patch('core.services.fair_queue.get_redis')
+    @patch('core.services.fair_queue.redis_cache_configured', return_value=True)
+    def test_expired_dispatch_lock_is_not_an_error(self, mock_configured, mock_get_redis, mock_depth, mock_signature):
+        """Test a dispatch lock lost during slow broker retries does not fail the submit"""
+        from redis.exceptions import LockNotOwnedError
+        
+        mock_get_redis.return_value.lock.return_value.release.side_effect = LockNotOwnedError('expired')
+        
+        fair_queue.submit('api', 'user:1', warm_prediction_cache.si())
+        
+        mock_signature.return_value.apply_async.assert_called_once()
+        self.assertEqual(self.queue.pending(), 0)
+
+
+@override_settings(**FAIR_QUEUE_SETTINGS)
+class RedisFairQueueTest(FairQueueCases, TestCase):
+    """Test cases for the Redis fair queue scripts, dispatch lock and broker budget (fakeredis)"""
+    
+    def make_queue(self):
+        import fakeredis
+        
+        self.redis = fakeredis.FakeRedis()
+        for name in ('get_redis', 'get_broker_redis'):
+            patcher = patch(f'core.services.fair_queue.{name}', return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('core.services.fair_queue.redis_cache_configured', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return fair_queue.RedisFairQueue(self.redis)
+    
+    def test_empty_tenants_leave_no_keys(self):
+        """Test a drained tier leaves no round, credit or queue keys behind"""
+        self.queue.push('api', 'user:1', self.job('a'), 1)
+        self.queue.push('api', 'user:2', self.job('b', cost=2), 1)
+        self.drain('api')
+        
+        self.assertEqual(sorted(self.redis.keys('fairq:*')), [fair_queue.PENDING_KEY.encode()])
+        self.assertEqual(fair_queue.pending(), 0)
+    
+    @patch('core.services.fair_queue.signature')
+    def test_broker_backlog_limits_dispatch(self, mock_signature):
+        """Test messages already waiting in the broker queues use up the budget"""
+        self.redis.rpush('cpu', *['message'] * 7)
+        for i in range(3):
+            self.queue.push('api', 'user:1', self.job(f'job{i}'), 1)
+        
+        self.assertEqual(fair_queue.dispatch(), 1)
+        
+        self.assertEqual(fair_queue.pending(), 2)
+        self.assertIsNone(self.redis.get(fair_queue.DISPATCH_LOCK_KEY))
+
+
+class ModelRegistryTest(TestCase):
+    """Test cases for the process-wide model registry"""
+    
+    def setUp(self):
+        model_registry.clear()
+    
+    def tearDown(self):
+        model_registry.clear()
+    
+    @patch('tensorflow.keras.models.load_model')
+    def test_model_loaded_once_per_process(self, mock_load_model):
+        """Test repeated lookups reuse the loaded model"""
+        mock_load_model.return_value = MagicMock(weights=[
+            MagicMock(shape=(60, 4), dtype='float32'),
+            MagicMock(shape=(4,), dtype='float32'),
+        ])
+        
+        first = model_registry.get_model()
+        second = model_registry.get_model()
+        
+        self.assertIs(first, second)
+        mock_load_model.assert_called_once()
+        stats = model_registry.stats()
+        self.assertGreaterEqual(stats['hits'], 1)
+        self.assertEqual(len(stats['models']), 1)
+        self.assertEqual(stats['models'][0]['param_bytes'], 244 * 4)
+        first.get_weights.assert_not_called()
+    
+    def test_missing_model_raises(self):
+        """Test a missing model file raises FileNotFoundError"""
+        with self.assertRaises(FileNotFoundError):
+            model_registry.get_model('does/not/exist.keras')
+
+
+class PriceStoreTest(TestCase):
+    """Test cases for the on-disk OHLCV store"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = PriceStore(root=self.tmpdir)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def make_frame(self, start, periods):
+        index = pd.bdate_range(start=start, periods=periods)
+        close = np.arange(periods, dtype=float) + 100
+        return pd.DataFrame({
+            'Open': close, 'High': close, 'Low': close, 'Close': close,
+            'Volume': np.full(periods, 1000.0),
+        }, index=index)
+    
+    def test_repeat_request_is_served_from_disk(self):
+        """Test a fresh store does not hit the upstream again"""
+        now = pytz.utc.localize(datetime(2024, 3, 8, 22, 0))  # Friday after close
+        with patch.object(PriceStore, '_download', return_value=self.make_frame('2024-01-01', 50)) as mock_download:
+            first = self.store.history('aapl', now=now)
+            second = self.store.history('AAPL', now=now)
+        
+        mock_download.assert_called_once()
+        self.assertEqual(len(first), len(second))
+        self.assertEqual(self.store.last_date('AAPL'), date(2024, 3, 8))
+    
+    def test_stale_store_fetches_only_new_bars(self):
+        """Test a stale store requests bars after the last stored date only"""
+        friday = pytz.utc.localize(datetime(2024, 3, 8, 22, 0))
+        monday = pytz.utc.localize(datetime(2024, 3, 11, 22, 0))
+        with patch.object(PriceStore, '_download', return_value=self.make_frame('2024-01-01', 50)):
+            self.store.history('AAPL', now=friday)
+        
+        # Upstream returns the last stored bar again plus Monday's
+        with patch.object(PriceStore, '_download', return_value=self.make_frame('2024-01-01', 51).iloc[-2:]) as mock_download:
+            df = self.store.history('AAPL', now=monday)
+        
+        mock_download.assert_called_once_with('AAPL', start=date(2024, 3, 8))
+        self.assertEqual(len(df), 51)
+    
+    def test_adjusted_history_is_fetched_again(self):
+        """Test a changed close on the overlapping bar replaces the stored history"""
+        friday = pytz.utc.localize(datetime(2024, 3, 8, 22, 0))
+        monday = pytz.utc.localize(datetime(2024, 3, 11, 22, 0))
+        with patch.object(PriceStore, '_download', return_value=self.make_frame('2024-01-01', 50)):
+            self.store.history('AAPL', now=friday)
+        
+        # A 2:1 split halves every adjusted price, including the stored ones
+        adjusted = self.make_frame('2024-01-01', 51) / 2
+        with patch.object(PriceStore, '_download', side_effect=[adjusted.iloc[-2:], adjusted]) as mock_download:
+            df = self.store.history('AAPL', now=monday)
+        
+        self.assertEqual(mock_download.call_args_list[1].args, ('AAPL',))
+        self.assertEqual(len(df), 51)
+        np.testing.assert_allclose(df['Close'].to_numpy(), adjusted['Close'].to_numpy())
+
+    
+    def test_upstream_failure_serves_stored_history(self):
+        """Test a failing delta fetch falls back to the stored bars"""
+        friday = pytz.utc.localize(datetime(2024, 3, 8, 22, 0))
+        monday = pytz.utc.localize(datetime(2024, 3, 11, 22, 0))
+        with patch.object(PriceStore, '_download', return_value=self.make_frame('2024-01-01', 50)):
+            self.store.history('AAPL', now=friday)
+        
+        with patch.object(PriceStore, '_download', side_effect=TimeoutError('upstream timeout')):
+            df = self.store.history('AAPL', now=monday)
+        
+        self.assertEqual(len(df), 50)
+
+
+class DataSourceTest(TestCase):
+    """Test cases for the pluggable market data sources"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_synthetic_source_is_deterministic(self):
+        """Test the synthetic series is reproducible and delta fetches extend it"""
+        full = SyntheticSource().fetch('AAPL')
+        start = full.index[-5].date()
+        
+        tail = SyntheticSource().fetch('AAPL', start=start)
+        
+        self.assertEqual(len(tail), 5)
+        pd.testing.assert_frame_equal(tail, full.iloc[-5:])
+        self.assertFalse(SyntheticSource().fetch('MSFT')['Close'].equals(full['Close']))
+    
+    def test_file_source_replays_csv(self):
+        """Test bars are read from <TICKER>.csv and filtered by start date"""
+        pd.DataFrame({
+            'Date': pd.bdate_range('2024-01-01', periods=10),
+            'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': np.arange(10.0), 'Volume': 100.0,
+        }).to_csv(f'{self.tmpdir}/AAPL.csv', index=False)
+        
+        df = FileSource(root=self.tmpdir).fetch('aapl', start=date(2024, 1, 8))
+        
+        self.assertEqual(list(df['Close']), [5.0, 6.0, 7.0, 8.0, 9.0])
+    
+    def test_price_store_is_namespaced_by_source(self):
+        """Test each source keeps its own history files"""
+        store = PriceStore(root=self.tmpdir, source='synthetic')
+        
+        store.history('AAPL')
+        
+        self.assertTrue(os.path.exists(f'{self.tmpdir}/synthetic/AAPL.npy'))
+
+
+class WindowingTest(TestCase):
+    """Test cases for the strided windowing used by StockPredictor"""
+    
+    def test_windows_match_loop_implementation(self):
+        """Test strided windows equal the per-window loop output"""
+        scaled = np.linspace(0, 1, 200).reshape(-1, 1)
+        expected_X, expected_y = loop_windows(scaled, 60)
+        
+        X, y = make_windows(scaled, 60)
+        
+        self.assertEqual(X.shape, (140, 60, 1))
+        self.assertEqual(X.dtype, np.float32)
+        np.testing.assert_allclose(X, expected_X, rtol=1e-6)
+        np.testing.assert_allclose(y, expected_y, rtol=1e-6)
+    
+    def test_last_window_ends_at_latest_price(self):
+        """Test next-day input is the trailing window including the last close"""
+        scaled = np.arange(100, dtype=np.float32).reshape(-1, 1)
+        
+        window = last_window(scaled, 60)
+        
+        self.assertEqual(window.shape, (1, 60, 1))
+        self.assertEqual(window[0, -1, 0], 99)
+
+
+def fake_fetch(predictor):
+    """Give every ticker a distinct synthetic price history"""
+    offset = 100 if predictor.ticker == 'AAPL' else 500
+    close = np.linspace(offset, offset + 50, 120)
+    predictor.df = pd.DataFrame({'Close': close})
+    return predictor.df
+
+
+class PredictManyTest(TestCase):
+    """Test cases for batched multi-ticker inference"""
+    
+    @patch('core.services.predictor.StockPredictor.generate_plots', return_value=[])
+    @patch('core.services.predictor.StockPredictor.fetch_data', autospec=True, side_effect=fake_fetch)
+    @patch('core.services.predictor.model_registry.get_model')
+    def test_tickers_share_one_forward_pass(self, mock_get_model, mock_fetch, mock_plots):
+        """Test all tickers go through a single stacked predict call"""
+        model = MagicMock()
+        model.predict.side_effect = lambda X, **kwargs: np.asarray(X[:, -1, :])
+        mock_get_model.return_value = model
+        
+        results, errors = predict_many(['aapl', 'MSFT'])
+        
+        self.assertEqual(errors, {})
+        self.assertEqual(set(results), {'AAPL', 'MSFT'})
+        model.predict.assert_called_once()
+        # Each ticker's next-day price is scaled back with its own scaler
+        self.assertAlmostEqual(results['AAPL']['next_day_price'], 150.0, places=1)
+        self.assertAlmostEqual(results['MSFT']['next_day_price'], 550.0, places=1)
+    
+    @patch('core.services.predictor.StockPredictor.generate_plots', return_value=[])
+    @patch('core.services.predictor.StockPredictor.fetch_data', autospec=True, side_effect=fake_fetch)
+    @patch('core.services.predictor.model_registry.get_model')
+    def test_failed_pass_keeps_other_passes(self, mock_get_model, mock_fetch, mock_plots):
+        """Test a pass that fails inference only fails its own tickers"""
+        model = MagicMock()
+        model.predict.side_effect = [RuntimeError('OOM'), np.linspace(0, 1, 61).reshape(-1, 1)]
+        mock_get_model.return_value = model
+        
+        # 61 windows per ticker: both together would exceed the budget
+        results, errors = predict_many(['AAPL', 'MSFT'], max_windows=100)
+        
+        self.assertEqual(model.predict.call_count, 2)
+        for call in model.predict.call_args_list:
+            self.assertLessEqual(len(call.args[0]), 100)
+        self.assertIsInstance(errors['AAPL'], RuntimeError)
+        self.assertEqual(set(results), {'MSFT'})
+    
+    @patch('core.services.predictor.StockPredictor.fetch_data', side_effect=ValueError('No data found for ticker BAD'))
+    @patch('core.services.predictor.model_registry.get_model')
+    def test_fetch_errors_are_reported_per_ticker(self, mock_get_model, mock_fetch):
+        """Test a failing ticker is reported without aborting the batch"""
+        results, errors = predict_many(['BAD'])
+        
+        self.assertEqual(results, {})
+        self.assertIsInstance(errors['BAD'], ValueError)
+
+
+class NextDayFastPathTest(TestCase):
+    """Test cases for the single-window next-day prediction"""
+    
+    @override_settings(INFERENCE_BATCHING=False)
+    @patch('core.services.predictor.model_registry.get_model')
+    @patch('core.services.predictor.get_price_store')
+    def test_only_trailing_window_is_inferred(self, mock_store, mock_get_model):
+        """Test one window is predicted and scaled back over the full history"""
+        mock_store.return_value.closes.return_value = np.linspace(100, 150, 2500)
+        model = MagicMock()
+        model.predict.side_effect = lambda X, **kwargs: np.asarray(X[:, -1, :])
+        mock_get_model.return_value = model
+        
+        result = StockPredictor('aapl').run_next_day()
+        
+        self.assertEqual(result, {'ticker': 'AAPL', 'next_day_price': 150.0})
+        self.assertEqual(model.predict.call_args[0][0].shape, (1, 60, 1))
+    
+    @override_settings(INFERENCE_BATCHING=True, INFERENCE_RESULT_TIMEOUT=0.05)
+    @patch('core.services.predictor.get_inference_server')
+    @patch('core.services.predictor.model_registry.get_model')
+    @patch('core.services.predictor.get_price_store')
+    def test_stalled_inference_times_out(self, mock_store, mock_get_model, mock_get_server):
+        """Test a prediction gives up when the inference server never answers"""
+        mock_store.return_value.closes.return_value = np.linspace(100, 150, 2500)
+        mock_get_server.return_value.submit.return_value = Future()
+        
+        with self.assertRaises(FutureTimeoutError):
+            StockPredictor('aapl').run_next_day()
+
+
+class EvaluationStoreTest(TestCase):
+    """Test cases for incremental evaluation through the evaluation store"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.model = MagicMock()
+        self.model.predict.side_effect = lambda X, **kwargs: np.asarray(X[:, -1, :])
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def evaluate(self, close):
+        predictor = StockPredictor('AAPL')
+        predictor.df = pd.DataFrame(
+            {'Close': close},
+            index=pd.bdate_range(start='2024-01-01', periods=len(close))
+        )
+        with override_settings(EVALUATION_STORE_DIR=self.tmpdir, INFERENCE_BATCHING=False), \
+                patch('core.services.predictor.model_registry.get_model', return_value=self.model) as mock_get_model:
+            X, y = predictor.preprocess()
+            y_pred, next_day_price, metrics = predictor.evaluate(X, y)
+        return y_pred, mock_get_model
+    
+    def test_repeat_evaluation_skips_model(self):
+        """Test an unchanged history is served from the store without the model"""
+        close = np.linspace(100, 150, 120)
+        first, _ = self.evaluate(close)
+        
+        second, mock_get_model = self.evaluate(close)
+        
+        mock_get_model.assert_not_called()
+        np.testing.assert_allclose(first, second)
+    
+    def test_new_bar_infers_only_new_window(self):
+        """Test a bar inside the known price range adds a single window"""
+        close = np.linspace(100, 150, 120)
+        self.evaluate(close)
+        self.model.predict.reset_mock()
+        
+        y_pred, _ = self.evaluate(np.append(close, 125.0))
+        
+        windows = sum(len(call.args[0]) for call in self.model.predict.call_args_list)
+        self.assertEqual(windows, 2)  # the new window plus the next-day window
+        self.assertEqual(len(y_pred), 61)
+    
+    def test_new_high_recomputes_everything(self):
+        """Test a bar outside the known range invalidates the stored series"""
+        close = np.linspace(100, 150, 120)
+        self.evaluate(close)
+        self.model.predict.reset_mock()
+        
+        self.evaluate(np.append(close, 175.0))
+        
+        windows = sum(len(call.args[0]) for call in self.model.predict.call_args_list)
+        self.assertEqual(windows, 62)
+
+
+class PlottingTest(TestCase):
+    """Test cases for downsampled, thread-safe chart rendering"""
+    
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        """Test downsampling keeps the first/last points and the peak and trough"""
+        y = np.sin(np.linspace(0, 20, 5000))
+        y[1234], y[4321] = 5.0, -5.0
+        
+        indices = lttb_indices(np.arange(5000), y, 500)
+        
+        self.assertEqual(len(indices), 500)
+        self.assertEqual((indices[0], indices[-1]), (0, 4999))
+        self.assertIn(1234, indices)
+        self.assertIn(4321, indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+    
+    def test_charts_render_concurrently(self):
+        """Test several charts can be drawn from threads at once"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        dates = pd.bdate_range('2015-01-01', periods=2520).values
+        
+        def render(i):
+            return render_line_chart(
+                f'{tmpdir}/{i}.png', [(None, dates, np.arange(2520.0) + i)], f'Chart {i}'
+            )
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            paths = list(pool.map(render, range(8)))
+        
+        for path in paths:
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+
+
+class PlotStoreTest(TestCase):
+    """Test cases for content-addressed, lazily rendered plots"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmpdir)
+        self.settings_override.enable()
+        self.lines = [(None, np.arange(100), np.linspace(100, 150, 100))]
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_identical_charts_share_a_key(self):
+        """Test the key depends only on the chart content"""
+        key = plot_store.save_chart(self.lines, 'AAPL')
+        
+        self.assertEqual(plot_store.save_chart(self.lines, 'AAPL'), key)
+        self.assertNotEqual(plot_store.save_chart(self.lines, 'MSFT'), key)
+        self.assertFalse(os.path.exists(f'{self.tmpdir}/plots/{key}.png'))
+    
+    def test_image_rendered_on_first_request(self):
+        """Test the endpoint renders the PNG once and marks it immutable"""
+        key = plot_store.save_chart(self.lines, 'AAPL')
+        
+        response = self.client.get(plot_store.chart_url(key))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(os.path.exists(f'{self.tmpdir}/plots/{key}.png'))
+    
+    def test_unknown_key_is_404(self):
+        """Test missing and malformed keys are not found"""
+        self.assertEqual(self.client.get(reverse('plot', args=['0' * 24])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('plot', args=['..'])).status_code, 404)
+    
+    def test_resolve_without_rendering(self):
+        """Test render=False only returns plots already on disk"""
+        url = plot_store.chart_url(plot_store.save_chart(self.lines, 'AAPL'))
+        
+        self.assertIsNone(plot_store.resolve_plot_file(url, render=False))
+        path = plot_store.resolve_plot_file(url)
+        self.assertEqual(plot_store.resolve_plot_file(url, render=False), path)
+
+
+class InferenceServerTest(TestCase):
+    """Test cases for the micro-batching inference server"""
+    
+    @patch('core.services.inference_server.model_registry.get_model')
+    def test_concurrent_requests_are_coalesced(self, mock_get_model):
+        """Test windows submitted within the wait window share one forward pass"""
+        model = MagicMock(side_effect=lambda X, training=False: X[:, -1, :] * 2)
+        mock_get_model.return_value = model
+        server = InferenceServer(max_batch_size=8, max_wait_ms=200)
+        
+        futures = [
+            server.submit(np.full((1, 60, 1), i, dtype=np.float32))
+            for i in range(3)
+        ]
+        outputs = [future.result(timeout=5) for future in futures]
+        
+        self.assertEqual([float(out[0][0]) for out in outputs], [0.0, 2.0, 4.0])
+        model.assert_called_once()
+        stats = server.stats()
+        self.assertEqual(stats['batch_size_histogram'], {3: 1})
+        self.assertEqual(stats['requests'], 3)
+    
+    @patch('core.services.inference_server.model_registry.get_model')
+    def test_server_survives_loop_errors(self, mock_get_model):
+        """Test an error outside the forward pass fails its batch and the next batch is still served"""
+        mock_get_model.return_value = MagicMock(side_effect=lambda X, training=False: X[:, -1, :])
+        server = InferenceServer(max_batch_size=1, max_wait_ms=0)
+        serve = server._serve
+        batches = []
+        
+        def flaky_serve(batch):
+            batches.append(batch)
+            if len(batches) == 1:
+                raise RuntimeError('boom')
+            serve(batch)
+        
+        with patch.object(server, '_serve', side_effect=flaky_serve):
+            with self.assertRaises(RuntimeError):
+                server.submit(np.zeros((1, 60, 1))).result(timeout=5)
+            output = server.submit(np.ones((1, 60, 1))).result(timeout=5)
+        
+        self.assertEqual(float(output[0][0]), 1.0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RateLimiterTest(TestCase):
+    """Test cases for the sliding-window rate limiter"""
+    
+    def test_concurrent_checks_admit_exactly_limit(self):
+        """Test threads racing on one key cannot exceed the limit"""
+        limiter = LocalSlidingWindowLimiter()
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda _: limiter.check('race', 10, 60)[0], range(200)))
+        
+        self.assertEqual(sum(results), 10)
+    
+    def test_rejection_reports_reset_time(self):
+        """Test a rejected request gets an aware reset time inside the window"""
+        for _ in range(2):
+            self.assertTrue(check_rate_limit('reset-test', limit=2)[0])
+        
+        is_allowed, remaining, reset_time = check_rate_limit('reset-test', limit=2)
+        
+        self.assertFalse(is_allowed)
+        self.assertEqual(remaining, 0)
+        self.assertIsNotNone(reset_time.tzinfo)
+        self.assertLessEqual(reset_time, timezone.now() + timedelta(minutes=60))
+
+
+class ImportTimeTest(TestCase):
+    """Guard against the web/bot entry points importing the ML stack"""
+    
+    def test_entry_points_do_not_import_heavy_modules(self):
+        """Test importing urls, tasks and the bot leaves TensorFlow & co. unloaded"""
+        out = StringIO()
+        call_command('importtime', stdout=out)
+        
+        self.assertIn('No heavy ML modules imported', out.getvalue())
+
+
+class BenchmarkPredictorTest(TransactionTestCase):
+    """Test cases for the pipeline benchmark command"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    @override_settings(INFERENCE_BATCHING=False)
+    @patch('core.services.predictor.StockPredictor.generate_plots', return_value=[])
+    @patch('core.services.predictor.model_registry.get_model')
+    def test_reports_every_stage_as_json(self, mock_get_model, mock_plots):
+        """Test each case reports all stages and benchmark rows are cleaned up"""
+        model = MagicMock()
+        model.predict.side_effect = lambda X, **kwargs: np.asarray(X[:, -1, :])
+        mock_get_model.return_value = model
+        output = f'{self.tmpdir}/bench.json'
+        
+        with override_settings(PRICE_STORE_DIR=self.tmpdir):
+            call_command(
+                'benchmark_predictor', '--tickers', '2', '--history-bars', '200',
+                '--concurrency', '1', '2', '--repeat', '1', '--warmup', '0',
+                '--output', output, stdout=StringIO()
+            )
+        
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual([case['concurrency'] for case in report['cases']], [1, 2])
+        self.assertEqual(
+            set(report['cases'][0]['stages']),
+            {'fetch', 'preprocess', 'load_model', 'predict', 'metrics', 'plots', 'db_save'}
+        )
+        self.assertEqual(Prediction.objects.count(), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResultCacheTest(TestCase):
+    """Test cases for the shared prediction result cache"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_repeat_requests_compute_once(self):
+        """Test the second request for a ticker is served from the cache"""
+        compute = MagicMock(return_value={'ticker': 'AAPL', 'next_day_price': 150.0})
+        
+        first = get_cached_prediction('aapl', compute)
+        second = get_cached_prediction('AAPL', compute)
+        
+        self.assertEqual(first, second)
+        compute.assert_called_once()
+    
+    def test_expired_leader_keeps_successor_lock(self):
+        """Test a leader whose lock expired mid-compute does not release the next leader's lock"""
+        lock_key = f"{result_cache._base_key('AAPL')}:{result_cache.last_completed_session().isoformat()}:lock"
+        
+        def slow_compute():
+            # The lock expires and another process takes over meanwhile
+            cache.set(lock_key, 'successor')
+            return {'ticker': 'AAPL', 'next_day_price': 150.0}
+        
+        get_cached_prediction('AAPL', slow_compute, allow_stale=False)
+        
+        self.assertEqual(cache.get(lock_key), 'successor')
+    
+    def test_redis_lock_released_by_owner_only(self):
+        """Test the Redis lock is deleted by compare-and-delete with the owner's token"""
+        import fakeredis
+        
+        client = fakeredis.FakeRedis()
+        with patch('core.services.result_cache.get_redis', return_value=client), \
+                patch('core.services.result_cache.redis_cache_configured', return_value=True), \
+                patch('core.services.result_cache._release_script', None):
+            self.assertTrue(result_cache._acquire('lock', 'leader'))
+            self.assertFalse(result_cache._acquire('lock', 'other'))
+            client.delete('lock')
+            self.assertTrue(result_cache._acquire('lock', 'successor'))
+            
+            result_cache._release('lock', 'leader')
+            self.assertTrue(result_cache._is_locked('lock'))
+            result_cache._release('lock', 'successor')
+            self.assertFalse(result_cache._is_locked('lock'))
+    
+    @patch('core.tasks.refresh_prediction_cache.delay')
+    @patch('core.services.result_cache.last_completed_session')
+    def test_stale_result_served_while_refreshing(self, mock_session, mock_refresh):
+        """Test the previous session's result is served and a refresh is queued"""
+        compute = MagicMock(return_value={'ticker': 'AAPL', 'next_day_price': 150.0})
+        mock_session.return_value = date(2024, 3, 8)
+        get_cached_prediction('AAPL', compute)
+        
+        mock_session.return_value = date(2024, 3, 11)
+        result = get_cached_prediction('AAPL', compute)
+        
+        self.assertEqual(result['next_day_price'], 150.0)
+        compute.assert_called_once()
+        mock_refresh.assert_called_once_with('AAPL')
+
+    
+    @patch('core.tasks.refresh_prediction_cache.delay')
+    def test_next_day_reuses_latest_evaluation(self, mock_refresh):
+        """Test the fast path merges its price with cached metrics and queues a refresh"""
+        with patch('core.services.result_cache.last_completed_session', return_value=date(2024, 3, 8)):
+            get_cached_prediction('AAPL', lambda: {'ticker': 'AAPL', 'next_day_price': 150.0, 'mse': 2.5})
+        compute_price = MagicMock(return_value={'ticker': 'AAPL', 'next_day_price': 151.0})
+        
+        with patch('core.services.result_cache.last_completed_session', return_value=date(2024, 3, 11)):
+            result = get_next_day_prediction('AAPL', compute_price)
+            get_next_day_prediction('AAPL', compute_price)
+        
+        self.assertEqual(result['next_day_price'], 151.0)
+        self.assertEqual(result['mse'], 2.5)
+        self.assertEqual(result['evaluation_session'], '2024-03-08')
+        compute_price.assert_called_once()
+        mock_refresh.assert_called_once_with('AAPL')
+    
+    @patch('core.tasks.refresh_prediction_cache.delay')
+    def test_next_day_without_evaluation(self, mock_refresh):
+        """Test the fast path returns empty metrics before any evaluation ran"""
+        result = get_next_day_prediction('AAPL', lambda: {'ticker': 'AAPL', 'next_day_price': 151.0})
+        
+        self.assertEqual(result['next_day_price'], 151.0)
+        self.assertIsNone(result['mse'])
+        self.assertEqual(result['plot_urls'], [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ADMISSION_CONTROL=False)
+class PredictJobViewTest(APITestCase):
+    """Test cases for the asynchronous predict API"""
+    
+    def setUp(self):
+        cache.clear()
+        rate_limiter.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='asyncuser',
+            email='async@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    @patch('core.views.fair_queue.submit')
+    @patch('core.views.prediction_pipeline')
+    def test_async_predict_returns_job(self, mock_pipeline, mock_submit):
+        """Test async mode queues the pipeline in the user's fair queue and returns 202 with a job id"""
+        response = self.client.post(reverse('predict'), {'ticker': 'AAPL', 'async': True}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        mock_pipeline.assert_called_once_with(self.user.id, 'AAPL', job_id=job_id)
+        mock_pipeline.return_value.set.assert_called_once_with(task_id=job_id)
+        mock_submit.assert_called_once_with(
+            'api', f'user:{self.user.id}', mock_pipeline.return_value.set.return_value
+        )
+        
+        status_response = self.client.get(response.data['status_url'])
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_response.data['status'], 'queued')
+        self.assertIsNone(status_response.data['prediction'])
+    
+    @patch('core.tasks.StockPredictor')
+    def test_job_reports_saved_prediction(self, mock_predictor_class):
+        """Test the status endpoint returns the Prediction once the task finishes"""
+        mock_predictor_class.return_value.run.return_value = {
+            'ticker': 'AAPL',
+            'next_day_price': 150.25,
+            'mse': 2.5,
+            'rmse': 1.58,
+            'r2': 0.85,
+            'plot_urls': ['plot1.png', 'plot2.png']
+        }
+        job_id = create_job(self.user.id, 'AAPL')
+        run_stock_prediction(self.user.id, 'AAPL', job_id=job_id)
+        
+        response = self.client.get(reverse('predict-status', args=[job_id]))
+        
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertEqual(response.data['progress'], 100)
+        self.assertEqual(response.data['prediction']['ticker'], 'AAPL')
+    
+    def test_other_users_job_is_not_found(self):
+        """Test a job cannot be read by another user"""
+        job_id = create_job(self.user.id + 1, 'AAPL')
+        
+        response = self.client.get(reverse('predict-status', args=[job_id]))
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PredictionEventsTest(TestCase):
+    """Test cases for the server-sent events stream"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='sseuser',
+            email='sse@example.com',
+            password='testpass123'
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.job_id = create_job(self.user.id, 'AAPL')
+    
+    async def read_stream(self, response):
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+    
+    @patch('core.views.events.subscribe')
+    async def test_stream_sends_progress_until_saved(self, mock_subscribe):
+        """Test published stages are forwarded and the stream ends when saved"""
+        async def fake_subscribe(job_id, timeout):
+            yield None
+            yield {**job, 'status': 'running', 'stage': 'inferring', 'progress': 50}
+            yield {**job, 'status': 'succeeded', 'stage': 'saved', 'progress': 100}
+        job = await sync_to_async(get_job)(self.job_id)
+        mock_subscribe.side_effect = fake_subscribe
+        
+        url = reverse('predict-events', args=[self.job_id])
+        response = await self.async_client.get(f'{url}?token={self.token}')
+        body = await self.read_stream(response)
+        
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('"stage": "inferring"', body)
+        self.assertTrue(body.rstrip().startswith('event: progress'))
+        self.assertIn('event: saved', body)
+        self.assertNotIn('user_id', body)
+    
+    async def test_stream_requires_token(self):
+        """Test the stream rejects unauthenticated requests"""
+        response = await self.async_client.get(reverse('predict-events', args=[self.job_id]))
+        
+        self.assertEqual(response.status_code, 401)
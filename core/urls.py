@@ -1,7 +1,22 @@
 from django.urls import path
-from .views import PredictView, PredictionListView
+from .views import (
+    PlotView,
+    PredictView,
+    PredictJobView,
+    PredictionListView,
+    PredictionDetailView,
+    PredictionSeriesView,
+    ModelStatsView,
+    prediction_events,
+)
 
 urlpatterns = [
     path("v1/predict/", PredictView.as_view(), name="predict"),
+    path("v1/predict/<str:job_id>/", PredictJobView.as_view(), name="predict-status"),
+    path("v1/predict/<str:job_id>/events/", prediction_events, name="predict-events"),
     path("v1/predictions/", PredictionListView.as_view(), name="predictions"),
+    path("v1/predictions/<int:pk>/", PredictionDetailView.as_view(), name="prediction-detail"),
+    path("v1/predictions/<int:pk>/series/", PredictionSeriesView.as_view(), name="prediction-series"),
+    path("v1/model/stats/", ModelStatsView.as_view(), name="model-stats"),
+    path("v1/plots/<str:key>.png", PlotView.as_view(), name="plot"),
 ]
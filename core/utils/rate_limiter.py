@@ -1,34 +1,115 @@
-from django.core.cache import cache
+"""
+Sliding-window rate limiting.
+
+Each key is a Redis sorted set of request timestamps. A Lua script trims
+entries older than the window, counts the rest and records the new request in
+one atomic round-trip, so concurrent callers cannot both slip under the limit
+and every check is O(log n) in the number of requests in the window.
+
+When the default cache is not Redis (tests, local runs without Redis) an
+in-process limiter with the same semantics is used instead.
+"""
+import threading
 import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from core.services import metrics
+
+from .redis_client import get_redis, redis_cache_configured
+
+# KEYS[1]: sorted set of request times (ms); ARGV: window_ms, limit, member
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, 0, tonumber(oldest[2]) + window}
+end
+
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, limit - count - 1, 0}
+"""
+
+
+class RedisSlidingWindowLimiter:
+    def __init__(self, client):
+        self.script = client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    def check(self, key, limit, window_seconds):
+        """Return ``(is_allowed, remaining, reset_at_ms)`` for one request."""
+        allowed, remaining, reset_at = self.script(
+            keys=[f"ratelimit:{key}"],
+            args=[int(window_seconds * 1000), limit, uuid.uuid4().hex],
+        )
+        return bool(allowed), int(remaining), int(reset_at) or None
+
+
+class LocalSlidingWindowLimiter:
+    """Same algorithm over per-process deques; only for non-Redis setups."""
 
-def is_rate_limited(user_id, action, limit=5, window=3600):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(deque)
+
+    def check(self, key, limit, window_seconds):
+        now = int(time.time() * 1000)
+        window = int(window_seconds * 1000)
+        with self.lock:
+            entries = self.requests[key]
+            while entries and entries[0] <= now - window:
+                entries.popleft()
+            if len(entries) >= limit:
+                return False, 0, entries[0] + window
+            entries.append(now)
+            return True, limit - len(entries), None
+
+
+_local_limiter = LocalSlidingWindowLimiter()
+_redis_limiter = None
+
+
+def reset():
+    """Forget the requests recorded by the in-process limiter (tests)."""
+    global _local_limiter
+    _local_limiter = LocalSlidingWindowLimiter()
+
+
+def get_limiter():
+    global _redis_limiter
+    if not redis_cache_configured():
+        return _local_limiter
+    if _redis_limiter is None:
+        _redis_limiter = RedisSlidingWindowLimiter(get_redis())
+    return _redis_limiter
+
+
+def check_rate_limit(key, limit=None, window_minutes=60):
     """
-    Simple rate limiter using Django cache.
-    
+    Check if the rate limit is exceeded for a given key and record the request.
+
     Args:
-        user_id: User identifier
-        action: Action type (e.g., 'predict')
-        limit: Number of requests allowed (default: 5)
-        window: Time window in seconds (default: 3600 = 1 hour)
-    
+        key: Unique identifier for the rate limit (e.g., user_id, chat_id)
+        limit: Number of requests allowed per window (defaults to PREDICT_PER_MIN setting)
+        window_minutes: Time window in minutes
+
     Returns:
-        bool: True if rate limited, False otherwise
+        tuple: (is_allowed, remaining_requests, reset_time) where reset_time is
+        an aware UTC datetime when the request was rejected, else None
     """
-    cache_key = f"rate_limit:{action}:{user_id}"
-    
-    # Get current count and timestamps
-    data = cache.get(cache_key, [])
-    current_time = time.time()
-    
-    # Remove old entries outside the window
-    data = [timestamp for timestamp in data if current_time - timestamp < window]
-    
-    # Check if limit exceeded
-    if len(data) >= limit:
-        return True
-    
-    # Add current timestamp and save
-    data.append(current_time)
-    cache.set(cache_key, data, window)
-    
-    return False
+    if limit is None:
+        limit = settings.PREDICT_PER_MIN
+
+    is_allowed, remaining, reset_at = get_limiter().check(key, limit, window_minutes * 60)
+    metrics.rate_limit_decision(key, is_allowed)
+    reset_time = datetime.fromtimestamp(reset_at / 1000, tz=timezone.utc) if reset_at else None
+    return is_allowed, remaining, reset_time
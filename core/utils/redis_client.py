@@ -0,0 +1,33 @@
+"""
+Shared synchronous Redis client for features that need more than the Django
+cache API (pub/sub, Lua scripts).
+"""
+from django.conf import settings
+
+_client = None
+_broker_client = None
+
+
+def get_redis():
+    """Return a process-wide Redis client for ``settings.REDIS_URL``."""
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def get_broker_redis():
+    """Return a process-wide Redis client for the Celery broker (``CELERY_BROKER_URL``)."""
+    global _broker_client
+    if _broker_client is None:
+        import redis
+
+        _broker_client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _broker_client
+
+
+def redis_cache_configured():
+    """Whether the default cache is Redis, i.e. Redis is expected to be reachable."""
+    return "redis" in settings.CACHES["default"]["BACKEND"].lower()
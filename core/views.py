@@ -1,25 +1,109 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, time as time_of_day
+
+from asgiref.sync import sync_to_async
 from django.views import View
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import status
 from django.conf import settings
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 import pytz
 from .models import Prediction
+from .pagination import PredictionCursorPagination
 from .serializers import PredictionSerializer
+from .services import admission, events, fair_queue, metrics, model_registry, plot_store
+from .services.inference_server import get_inference_server
 from .services.predictor import StockPredictor
+from .services.jobs import create_job, get_job
+from .services.result_cache import get_cached_prediction, peek_cached_prediction
+from .tasks import prediction_pipeline
 from .utils import check_rate_limit
 
+class ConditionalGet:
+    """
+    ETag / Last-Modified validators for a read endpoint.
+    
+    ``etag_source`` must change whenever the response body would, and be
+    cheap to compute, so that ``not_modified`` can answer before the body
+    is built.
+    """
+    
+    def __init__(self, etag_source, last_modified, cache_control):
+        self.etag = '"{}"'.format(hashlib.sha256(etag_source.encode()).hexdigest()[:32])
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+        self.cache_control = cache_control
+    
+    def apply(self, response):
+        response["ETag"] = self.etag
+        if self.last_modified is not None:
+            response["Last-Modified"] = http_date(self.last_modified)
+        response["Cache-Control"] = self.cache_control
+        return response
+    
+    def not_modified(self, request):
+        """Return a 304 response if the client's copy is current, else ``None``."""
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        return self.apply(response) if response is not None else None
+
+
 class HealthCheckView(View):
     def get(self, request, *args, **kwargs):
         return JsonResponse({"status": "ok"}, status=200)
 
 
+class MetricsView(View):
+    def get(self, request, *args, **kwargs):
+        """Prometheus scrape endpoint, aggregated over all processes."""
+        token = settings.METRICS_TOKEN
+        # Constant-time comparison; bytes so non-ASCII headers cannot raise
+        authorization = request.headers.get("Authorization", "").encode()
+        if token and not hmac.compare_digest(authorization, f"Bearer {token}".encode()):
+            return JsonResponse({"error": "Unauthorized"}, status=401)
+        body, content_type = metrics.render()
+        return HttpResponse(body, content_type=content_type)
+
+
+class PlotView(View):
+    def get(self, request, key):
+        """Serve a plot image, rendering it from its stored data on first access."""
+        try:
+            path = plot_store.chart_image(key)
+        except (ValueError, FileNotFoundError):
+            raise Http404("Plot not found")
+        response = FileResponse(open(path, "rb"), content_type="image/png")
+        # The key is a hash of the data, so the image at a URL never changes
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
 class PredictView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        start = time.perf_counter()
+        response = self.predict(request)
+        metrics.PREDICT_REQUEST_SECONDS.labels(
+            mode="async" if self.is_async(request) else "sync",
+            status=response.status_code
+        ).observe(time.perf_counter() - start)
+        return response
+    
+    def predict(self, request):
         # Check rate limit
         is_allowed, remaining, reset_time = check_rate_limit(f"user:{request.user.id}", window_minutes=1)
         
@@ -36,13 +120,26 @@ class PredictView(APIView):
         ticker = request.data.get("ticker")
         if not ticker:
             return Response({"error": "Ticker is required"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        decision = admission.admit("api")
+        if not decision.allowed:
+            return self.overloaded(request, ticker, decision)
+        metrics.ADMISSION_DECISIONS.labels(channel="api", decision="admitted").inc()
+        
+        if self.is_async(request):
+            return self.enqueue(request, ticker)
+        
         try:
-            predictor = StockPredictor(ticker)
-            result = predictor.run()
+            # Identical requests share one computation per trading session
+            with admission.in_flight():
+                result = get_cached_prediction(ticker, compute=lambda: StockPredictor(ticker).run())
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Save the prediction to the database
+        return self.save(request, result)
+    
+    def save(self, request, result, headers=None):
+        """Save the prediction to the database and return it with 201"""
         prediction = Prediction.objects.create(
             user = request.user,
             ticker = result['ticker'],
@@ -56,12 +153,284 @@ class PredictView(APIView):
         )
         
         serializer = PredictionSerializer(prediction)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    
+    def overloaded(self, request, ticker, decision):
+        """
+        Answer a request that was not admitted: with the cached result for the
+        ticker if there is one (possibly from an earlier session), otherwise
+        503 with Retry-After.
+        """
+        cached = peek_cached_prediction(ticker)
+        if cached is not None:
+            metrics.ADMISSION_DECISIONS.labels(channel="api", decision="degraded").inc()
+            return self.save(request, cached, headers={"X-Prediction-Source": "cache"})
+        
+        metrics.ADMISSION_DECISIONS.labels(channel="api", decision="rejected").inc()
+        return Response({
+            "error": f"Prediction service is busy ({decision.reason}). Try again in {decision.retry_after} seconds.",
+            "retry_after": decision.retry_after,
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": str(decision.retry_after)})
+    
+    @staticmethod
+    def is_async(request):
+        """Async mode is requested with ``"async": true`` in the body or ``?async=1``"""
+        value = request.data.get("async", request.query_params.get("async", False))
+        return str(value).lower() in ("1", "true", "yes")
+    
+    def enqueue(self, request, ticker):
+        """Queue the prediction on Celery and return 202 with the job id"""
+        job_id = create_job(request.user.id, ticker)
+        # Users share the workers fairly however many jobs each submits
+        fair_queue.submit(
+            "api",
+            f"user:{request.user.id}",
+            prediction_pipeline(request.user.id, ticker, job_id=job_id).set(task_id=job_id)
+        )
+        
+        status_url = reverse("predict-status", args=[job_id])
+        return Response({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": status_url,
+        }, status=status.HTTP_202_ACCEPTED, headers={"Location": status_url})
+
+
+class PredictJobView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        """Return progress of an async prediction and the Prediction once saved"""
+        job = get_job(job_id)
+        if job is None or job["user_id"] != request.user.id:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        data = {key: value for key, value in job.items() if key != "user_id"}
+        data["prediction"] = None
+        if job["prediction_id"]:
+            prediction = Prediction.objects.filter(id=job["prediction_id"], user=request.user).first()
+            if prediction:
+                data["prediction"] = PredictionSerializer(prediction).data
+        return Response(data, status=status.HTTP_200_OK)
+
+def _authenticate_jwt(request):
+    """
+    Return the user for a JWT passed as ``Authorization: Bearer`` or, since
+    EventSource cannot set headers, as a ``?token=`` query parameter.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = (auth.get_raw_token(header) if header else None) or request.GET.get("token")
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except AuthenticationFailed:
+        return None
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _job_event(job):
+    """Strip private fields and name the event after the job status"""
+    data = {key: value for key, value in job.items() if key != "user_id"}
+    event = {"succeeded": "saved", "failed": "failed"}.get(job["status"], "progress")
+    return event, data
+
+
+async def prediction_events(request, job_id):
+    """
+    Stream stage events of a prediction job as server-sent events.
+    
+    Sends the current state first, then every update published by the worker
+    (fetching, preprocessing, inferring, plotting, saved) until the job
+    succeeds or fails. Serve through ``zproject.asgi`` so idle streams don't
+    hold a worker thread.
+    """
+    user = await sync_to_async(_authenticate_jwt)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+    
+    job = await sync_to_async(get_job)(job_id)
+    if job is None or job["user_id"] != user.id:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    
+    async def stream():
+        deadline = time.monotonic() + settings.SSE_MAX_DURATION
+        messages = events.subscribe(job_id, timeout=settings.SSE_KEEPALIVE_SECONDS)
+        try:
+            # Subscribed; now read the state so no update falls in between
+            await messages.__anext__()
+            current = await sync_to_async(get_job)(job_id)
+            if current is None:
+                return
+            event, data = _job_event(current)
+            yield _sse(event, data)
+            if event != "progress":
+                return
+            
+            async for update in messages:
+                if update is None:
+                    yield ": keepalive\n\n"
+                else:
+                    event, data = _job_event(update)
+                    yield _sse(event, data)
+                    if event != "progress":
+                        return
+                if time.monotonic() > deadline:
+                    return
+        finally:
+            await messages.aclose()
+    
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 
 class PredictionListView(APIView):
     permission_classes = [IsAuthenticated]
     
+    # Rows are built straight from the query, without model instances
+    fields = ("id", "ticker", "created", "metrics", "plot_urls")
+    
+    def get(self, request):
+        """
+        Return the user's predictions, newest first, one cursor page at a time.
+        
+        Optional filters: ``?ticker=`` and ``?created_after=`` /
+        ``?created_before=`` (ISO date or datetime, inclusive).
+        """
+        predictions = Prediction.objects.filter(user=request.user)
+        
+        ticker = request.query_params.get("ticker")
+        if ticker:
+            predictions = predictions.filter(ticker=ticker.strip().upper())
+        for param, lookup in (("created_after", "created__gte"), ("created_before", "created__lte")):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            moment = self.parse_moment(value, end_of_day=param == "created_before")
+            if moment is None:
+                return Response(
+                    {"error": f"Invalid {param}, expected an ISO date or datetime"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            predictions = predictions.filter(**{lookup: moment})
+        
+        # Any new or deleted row in the filtered set changes the id/count
+        # aggregate, so unchanged lists are answered from it without reading rows
+        state = predictions.aggregate(latest_id=Max("id"), count=Count("id"), latest=Max("created"))
+        validators = ConditionalGet(
+            f"{request.get_full_path()}:{state['latest_id']}:{state['count']}",
+            state["latest"],
+            "private, no-cache",
+        )
+        response = validators.not_modified(request)
+        if response is not None:
+            return response
+        
+        paginator = PredictionCursorPagination()
+        page = paginator.paginate_queryset(predictions.values(*self.fields), request, view=self)
+        return validators.apply(paginator.get_paginated_response(page))
+    
+    @staticmethod
+    def parse_moment(value, end_of_day=False):
+        """Parse a date or datetime; a bare date covers the whole day when ``end_of_day``."""
+        try:
+            # Dates first: parse_datetime also accepts a bare date, as midnight
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.combine(day, time_of_day.max if end_of_day else time_of_day.min)
+            else:
+                moment = parse_datetime(value)
+                if moment is None:
+                    return None
+        except ValueError:
+            return None
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+
+class PredictionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        """Return one prediction; predictions never change, so repeat reads get 304."""
+        prediction = (
+            Prediction.objects.filter(id=pk, user=request.user)
+            .values(*PredictionListView.fields)
+            .first()
+        )
+        if prediction is None:
+            return Response({"error": "Prediction not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        validators = ConditionalGet(
+            f"{prediction['id']}:{prediction['created'].isoformat()}",
+            prediction["created"],
+            "private, max-age=86400",
+        )
+        response = validators.not_modified(request)
+        if response is not None:
+            return response
+        return validators.apply(Response(prediction, status=status.HTTP_200_OK))
+
+
+@method_decorator(gzip_page, name="dispatch")
+class PredictionSeriesView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        """
+        Return the chart data of a prediction for drawing in the browser.
+        
+        ``?points=N`` reduces every series to at most N points. The data of a
+        prediction never changes, so responses carry an ETag and repeat views
+        are answered with 304.
+        """
+        prediction = Prediction.objects.filter(id=pk, user=request.user).values("id", "ticker", "plot_urls").first()
+        if prediction is None:
+            return Response({"error": "Prediction not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        keys = [
+            match.group(1)
+            for match in (plot_store.URL_PATTERN.search(url) for url in prediction["plot_urls"])
+            if match
+        ]
+        if not keys:
+            return Response({"error": "No series stored for this prediction"}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            points = int(request.query_params.get("points", 0))
+        except ValueError:
+            return Response({"error": "points must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        points = min(max(points, 3), settings.SERIES_MAX_POINTS) if points else None
+        
+        etag = '"{}"'.format(hashlib.sha256(f"{keys}:{points}".encode()).hexdigest()[:32])
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        try:
+            charts = [plot_store.chart_series(key, points) for key in keys]
+        except FileNotFoundError:
+            return Response({"error": "No series stored for this prediction"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "prediction_id": prediction["id"],
+            "ticker": prediction["ticker"],
+            "charts": charts,
+        }, status=status.HTTP_200_OK, headers=headers)
+
+
+class ModelStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
     def get(self, request):
-        prediction = Prediction.objects.filter(user=request.user).order_by('-created')
-        serializer = PredictionSerializer(prediction, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        """Report model registry and micro-batching statistics for this process."""
+        return Response({
+            "model_registry": model_registry.stats(),
+            "inference_server": get_inference_server().stats(),
+        }, status=status.HTTP_200_OK)
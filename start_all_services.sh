@@ -17,6 +17,10 @@ trap cleanup SIGINT SIGTERM
 # Ensure Redis data directory exists
 mkdir -p /var/lib/redis
 
+# Metrics of the previous run must not be aggregated into the new one
+rm -rf /tmp/prometheus
+mkdir -p /tmp/prometheus
+
 # Run database migrations
 echo "Running database migrations..."
 python manage.py makemigrations
@@ -61,7 +61,7 @@ sleep 2
 
 # Start Celery worker
 echo "Starting Celery worker..."
-python manage.py startcelery &
+python manage.py startcelery --beat &
 CELERY_PID=$!
 
 echo "All services started successfully!"
@@ -5,6 +5,7 @@ $(document).ready(function() {
     const $predictBtn = $('#predict-btn');
     const $predictBtnText = $('#predict-btn-text');
     const $predictBtnLoading = $('#predict-btn-loading');
+    const $predictBtnStage = $('#predict-btn-stage');
     const $logoutBtn = $('#logout-btn');
     
     // Message elements
@@ -80,9 +81,20 @@ $(document).ready(function() {
         $messageContainer[0].scrollIntoView({ behavior: 'smooth', block: 'center' });
     }
     
+    // Labels for the stages streamed while an async prediction runs
+    const stageLabels = {
+        queued: 'Queued...',
+        fetching: 'Fetching data...',
+        preprocessing: 'Preparing data...',
+        inferring: 'Running model...',
+        plotting: 'Drawing charts...',
+        saved: 'Saving...'
+    };
+    
     // Toggle loading state
     function setLoading(loading) {
         $predictBtn.prop('disabled', loading);
+        $predictBtnStage.text('Predicting...');
         if (loading) {
             $predictBtnText.addClass('hidden');
             $predictBtnLoading.removeClass('hidden');
@@ -118,39 +130,116 @@ $(document).ready(function() {
         $rmseValue.text(rmse ? parseFloat(rmse).toFixed(4) : '--');
         $r2Value.text(r2 ? parseFloat(r2).toFixed(4) : '--');
         
-        // Update charts if plot URLs are provided
-        if (data.plot_urls && Array.isArray(data.plot_urls) && data.plot_urls.length >= 2) {
-            console.log('Loading charts:', data.plot_urls);
+        // Draw charts in the browser from the prediction's series; predictions
+        // saved before series were stored fall back to the rendered images
+        if (data.id) {
+            loadSeries(data.id, data.plot_urls);
+        } else {
+            showChartImages(data.plot_urls);
+        }
+    }
+    
+    // Charts drawn with Chart.js, keyed by canvas id
+    const charts = {};
+    
+    function decodeFloat32(base64) {
+        const bytes = Uint8Array.from(atob(base64), c => c.charCodeAt(0));
+        return new Float32Array(bytes.buffer);
+    }
+    
+    function formatDay(days) {
+        return new Date(days * 86400000).toISOString().slice(0, 10);
+    }
+    
+    function drawChart($canvas, $placeholder, chart) {
+        const canvasId = $canvas.attr('id');
+        if (charts[canvasId]) {
+            charts[canvasId].destroy();
+        }
+        
+        const isDate = chart.x_type === 'date';
+        const datasets = chart.series.map(function(series) {
+            const xs = decodeFloat32(series.x);
+            const ys = decodeFloat32(series.y);
+            return {
+                label: series.label || chart.title,
+                data: Array.from(ys, (y, i) => ({ x: xs[i], y: y })),
+                borderWidth: 1.5,
+                pointRadius: 0,
+            };
+        });
+        
+        $canvas.removeClass('hidden');
+        $placeholder.addClass('hidden');
+        charts[canvasId] = new Chart($canvas[0], {
+            type: 'line',
+            data: { datasets: datasets },
+            options: {
+                parsing: false,
+                animation: false,
+                maintainAspectRatio: false,
+                plugins: {
+                    title: { display: true, text: chart.title },
+                    legend: { display: chart.series.some(series => series.label) },
+                },
+                scales: {
+                    x: {
+                        type: 'linear',
+                        ticks: { callback: value => isDate ? formatDay(value) : value },
+                    },
+                },
+            },
+        });
+    }
+    
+    function loadSeries(predictionId, plotUrls) {
+        const accessToken = localStorage.getItem('accessToken');
+        // One point per pixel of the widest chart is all that can be seen
+        const points = Math.max(Math.round($historyChart.parent().width() * (window.devicePixelRatio || 1)), 100);
+        
+        $.ajax({
+            url: `/api/v1/predictions/${predictionId}/series/?points=${points}`,
+            type: 'GET',
+            headers: {
+                'Authorization': `Bearer ${accessToken}`
+            },
+            success: function(data) {
+                $historyChart.addClass('hidden');
+                $predictionChart.addClass('hidden');
+                drawChart($('#history-canvas'), $historyPlaceholder, data.charts[0]);
+                drawChart($('#prediction-canvas'), $predictionPlaceholder, data.charts[1]);
+            },
+            error: function(xhr) {
+                console.warn('Series unavailable, showing rendered charts:', xhr.status);
+                showChartImages(plotUrls);
+            }
+        });
+    }
+    
+    function showChartImages(plotUrls) {
+        if (plotUrls && Array.isArray(plotUrls) && plotUrls.length >= 2) {
+            console.log('Loading charts:', plotUrls);
             
             // Show history chart
-            $historyChart.attr('src', data.plot_urls[0]).removeClass('hidden');
+            $historyChart.attr('src', plotUrls[0]).removeClass('hidden');
             $historyPlaceholder.addClass('hidden');
             
             // Show prediction chart  
-            $predictionChart.attr('src', data.plot_urls[1]).removeClass('hidden');
+            $predictionChart.attr('src', plotUrls[1]).removeClass('hidden');
             $predictionPlaceholder.addClass('hidden');
             
             // Handle image load errors
             $historyChart.off('error').on('error', function() {
-                console.error('Failed to load history chart:', data.plot_urls[0]);
+                console.error('Failed to load history chart:', plotUrls[0]);
                 $(this).addClass('hidden');
                 $historyPlaceholder.removeClass('hidden');
             });
             
             $predictionChart.off('error').on('error', function() {
-                console.error('Failed to load prediction chart:', data.plot_urls[1]);
+                console.error('Failed to load prediction chart:', plotUrls[1]);
                 $(this).addClass('hidden');
                 $predictionPlaceholder.removeClass('hidden');
             });
-            
-            // Add load success handlers for better debugging
-            $historyChart.off('load').on('load', function() {
-                console.log('History chart loaded successfully');
-            });
-            
-            $predictionChart.off('load').on('load', function() {
-                console.log('Prediction chart loaded successfully');
-            });
         } else {
             console.warn('No plot URLs found or insufficient charts in response');
         }
@@ -167,6 +256,11 @@ $(document).ready(function() {
         // Hide charts and show placeholders
         $historyChart.addClass('hidden').attr('src', '');
         $predictionChart.addClass('hidden').attr('src', '');
+        Object.keys(charts).forEach(function(canvasId) {
+            charts[canvasId].destroy();
+            delete charts[canvasId];
+            $(`#${canvasId}`).addClass('hidden');
+        });
         $historyPlaceholder.removeClass('hidden');
         $predictionPlaceholder.removeClass('hidden');
     }
@@ -186,7 +280,8 @@ $(document).ready(function() {
             },
             success: function(data, textStatus, xhr) {
                 console.log('Prediction history loaded:', data);
-                populatePredictionTable(data);
+                // Paginated response; the table shows the newest page
+                populatePredictionTable(data.results);
             },
             error: function(xhr, textStatus, errorThrown) {
                 console.error('Failed to load prediction history:', xhr.responseJSON);
@@ -305,60 +400,137 @@ $(document).ready(function() {
         resetResults();
         
         const accessToken = localStorage.getItem('accessToken');
+        // Without EventSource fall back to a synchronous prediction
+        const useAsync = typeof window.EventSource !== 'undefined';
         
         $.ajax({
             url: '/api/v1/predict/',
             type: 'POST',
             contentType: 'application/json',
-            data: JSON.stringify({ ticker: ticker }),
+            data: JSON.stringify({ ticker: ticker, async: useAsync }),
             headers: {
                 'Authorization': `Bearer ${accessToken}`,
                 'X-CSRFToken': $('[name=csrfmiddlewaretoken]').val() || ''
             },
             success: function(data, textStatus, xhr) {
-                console.log('Prediction successful:', data);
-                updateResults(data);
-                showSuccess(`Prediction completed successfully for ${ticker}!`);
-                
-                // Refresh prediction history table
-                loadPredictionHistory();
+                if (xhr.status === 202) {
+                    // Queued; follow progress over server-sent events
+                    watchJob(data, ticker);
+                    return;
+                }
+                handlePredictionSuccess(data, ticker);
+                setLoading(false);
             },
             error: function(xhr, textStatus, errorThrown) {
-                console.error('Prediction error:', xhr.responseJSON);
-                
-                if (xhr.status === 401) {
-                    // Token expired or invalid
-                    localStorage.removeItem('accessToken');
-                    localStorage.removeItem('refreshToken');
-                    showError('Session expired. Please log in again.');
+                handlePredictionError(xhr);
+                setLoading(false);
+            }
+        });
+    });
+    
+    // Show a finished prediction
+    function handlePredictionSuccess(data, ticker) {
+        console.log('Prediction successful:', data);
+        updateResults(data);
+        showSuccess(`Prediction completed successfully for ${ticker}!`);
+        
+        // Refresh prediction history table
+        loadPredictionHistory();
+    }
+    
+    // Show why a prediction request failed
+    function handlePredictionError(xhr) {
+        console.error('Prediction error:', xhr.responseJSON);
+        
+        if (xhr.status === 401) {
+            // Token expired or invalid
+            localStorage.removeItem('accessToken');
+            localStorage.removeItem('refreshToken');
+            showError('Session expired. Please log in again.');
+            setTimeout(function() {
+                window.location.href = '/login/';
+            }, 2000);
+        } else if (xhr.status === 400) {
+            // Bad request - invalid ticker or other client error
+            const errorMsg = xhr.responseJSON?.error || 
+                            xhr.responseJSON?.detail || 
+                            'Invalid ticker symbol or request data';
+            showError(errorMsg);
+        } else if (xhr.status >= 500) {
+            // Server error
+            showError('Server error occurred. Please try again later.');
+        } else if (xhr.responseJSON) {
+            // Other API errors
+            const errorMsg = xhr.responseJSON.error || 
+                           xhr.responseJSON.detail || 
+                           'Prediction failed. Please try again.';
+            showError(errorMsg);
+        } else {
+            // Network or unknown error
+            showError('Network error. Please check your connection and try again.');
+        }
+    }
+    
+    // Follow an async prediction job until it is saved or fails
+    function watchJob(job, ticker) {
+        const accessToken = localStorage.getItem('accessToken');
+        const source = new EventSource(`/api/v1/predict/${job.job_id}/events/?token=${encodeURIComponent(accessToken)}`);
+        
+        source.addEventListener('progress', function(e) {
+            const data = JSON.parse(e.data);
+            $predictBtnStage.text(stageLabels[data.stage] || 'Predicting...');
+        });
+        
+        source.addEventListener('saved', function() {
+            source.close();
+            loadJobResult(job.status_url, ticker);
+        });
+        
+        source.addEventListener('failed', function(e) {
+            source.close();
+            const data = JSON.parse(e.data);
+            showError(data.error || 'Prediction failed. Please try again.');
+            setLoading(false);
+        });
+        
+        source.onerror = function() {
+            // The stream ended or dropped; the status endpoint has the final answer
+            source.close();
+            loadJobResult(job.status_url, ticker);
+        };
+    }
+    
+    // Fetch the saved prediction of a finished job
+    function loadJobResult(statusUrl, ticker) {
+        const accessToken = localStorage.getItem('accessToken');
+        
+        $.ajax({
+            url: statusUrl,
+            type: 'GET',
+            headers: {
+                'Authorization': `Bearer ${accessToken}`
+            },
+            success: function(data) {
+                if (data.prediction) {
+                    handlePredictionSuccess(data.prediction, ticker);
+                    setLoading(false);
+                } else if (data.status === 'failed') {
+                    showError(data.error || 'Prediction failed. Please try again.');
+                    setLoading(false);
+                } else {
+                    // Still running; check again shortly
+                    $predictBtnStage.text(stageLabels[data.stage] || 'Predicting...');
                     setTimeout(function() {
-                        window.location.href = '/login/';
+                        loadJobResult(statusUrl, ticker);
                     }, 2000);
-                } else if (xhr.status === 400) {
-                    // Bad request - invalid ticker or other client error
-                    const errorMsg = xhr.responseJSON?.error || 
-                                    xhr.responseJSON?.detail || 
-                                    'Invalid ticker symbol or request data';
-                    showError(errorMsg);
-                } else if (xhr.status >= 500) {
-                    // Server error
-                    showError('Server error occurred. Please try again later.');
-                } else if (xhr.responseJSON) {
-                    // Other API errors
-                    const errorMsg = xhr.responseJSON.error || 
-                                   xhr.responseJSON.detail || 
-                                   'Prediction failed. Please try again.';
-                    showError(errorMsg);
-                } else {
-                    // Network or unknown error
-                    showError('Network error. Please check your connection and try again.');
                 }
             },
-            complete: function() {
+            error: function(xhr) {
+                handlePredictionError(xhr);
                 setLoading(false);
             }
         });
-    });
+    }
     
     // Check authentication on page load
     checkAuthentication();
@@ -14,6 +14,13 @@
 
 import os
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zproject.settings')
@@ -31,3 +38,46 @@ app.autodiscover_tasks()
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+@worker_process_init.connect
+def warm_up_model(**kwargs):
+    """Load and warm up the prediction model in every prefork child."""
+    from django.conf import settings
+    from core.services.model_registry import warm_up_safely
+
+    if settings.MODEL_WARMUP_ON_START:
+        warm_up_safely()
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    """Let the multiprocess metrics collector drop an exited prefork child."""
+    from core.services.metrics import mark_process_dead
+
+    mark_process_dead(pid or os.getpid())
+
+
+@before_task_publish.connect
+def stamp_publish_time(**kwargs):
+    from core.services.metrics import on_before_task_publish
+
+    on_before_task_publish(**kwargs)
+
+
+@task_prerun.connect
+def record_task_start(**kwargs):
+    from core.services import admission
+    from core.services.metrics import on_task_prerun
+
+    on_task_prerun(**kwargs)
+    admission.on_task_prerun(**kwargs)
+
+
+@task_postrun.connect
+def record_task_duration(**kwargs):
+    from core.services import admission
+    from core.services.metrics import on_task_postrun
+
+    on_task_postrun(**kwargs)
+    admission.on_task_postrun(**kwargs)
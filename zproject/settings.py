@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from datetime import timedelta
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 ISPRODUCTION = os.getenv("ISPRODUCTION", "False") == "True"
@@ -214,6 +215,41 @@ MEDIA_URL = '/media/'
 
 MODEL_PATH = os.getenv('MODEL_PATH', "stock_prediction_model.keras")
 
+# Load the model and run a dummy inference when a Celery worker starts
+MODEL_WARMUP_ON_START = os.getenv('MODEL_WARMUP_ON_START', 'True') == 'True'
+# Same for web workers; off by default so web processes never import TensorFlow
+# unless they serve synchronous predictions
+WEB_MODEL_WARMUP = os.getenv('WEB_MODEL_WARMUP', 'False') == 'True'
+
+# Micro-batching of next-day inference requests within one process
+INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'True') == 'True'
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '64'))
+INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '10'))
+# Seconds a prediction waits for its batched result (includes a cold model load)
+INFERENCE_RESULT_TIMEOUT = float(os.getenv('INFERENCE_RESULT_TIMEOUT', '60'))
+
+# Local OHLCV store; history is refreshed once per session after market close
+PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', os.path.join(BASE_DIR, 'data', 'prices'))
+MARKET_TIMEZONE = os.getenv('MARKET_TIMEZONE', 'America/New_York')
+MARKET_CLOSE_TIME = os.getenv('MARKET_CLOSE_TIME', '16:00')
+MARKET_OPEN_TIME = os.getenv('MARKET_OPEN_TIME', '09:30')
+# Where bars come from: yfinance, file (CSV/Parquet under MARKET_DATA_DIR) or synthetic
+MARKET_DATA_SOURCE = os.getenv('MARKET_DATA_SOURCE', 'yfinance')
+MARKET_DATA_DIR = os.getenv('MARKET_DATA_DIR', os.path.join(BASE_DIR, 'data', 'market'))
+
+# Per-ticker evaluation results (predicted series and metrics) per model version
+EVALUATION_STORE_DIR = os.getenv('EVALUATION_STORE_DIR', os.path.join(BASE_DIR, 'data', 'evaluations'))
+
+# Prediction result cache; entries are per market session, kept over weekends
+RESULT_CACHE_TIMEOUT = int(os.getenv('RESULT_CACHE_TIMEOUT', str(4 * 24 * 3600)))
+# Single-flight lock held while one process computes a missing result
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', '120'))
+SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', '60'))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', '0.2'))
+
+# How long status records of asynchronous prediction jobs are kept
+PREDICTION_JOB_TIMEOUT = int(os.getenv('PREDICTION_JOB_TIMEOUT', str(24 * 3600)))
+
 # Telegram bot configuration
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 
@@ -231,10 +267,120 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Prediction stages are split by what they wait on: network-bound stages go to
+# the "io" queue (thread pool, many slots), inference and plotting to "cpu"
+# (prefork, one process per core); see `manage.py startcelery --role`
+CELERY_TASK_ROUTES = {
+    'core.tasks.fetch_prices': {'queue': 'io'},
+    'core.tasks.save_prediction': {'queue': 'io'},
+    'core.tasks.send_prediction': {'queue': 'io'},
+    'core.tasks.prediction_failed': {'queue': 'io'},
+    'core.tasks.warm_prediction_cache': {'queue': 'io'},
+    'core.tasks.predict_batch': {'queue': 'cpu'},
+    'core.tasks.warm_ticker': {'queue': 'cpu'},
+    'core.tasks.compute_prediction': {'queue': 'cpu'},
+    'core.tasks.compute_next_day': {'queue': 'cpu'},
+    'core.tasks.refresh_prediction_cache': {'queue': 'cpu'},
+    'core.tasks.run_stock_prediction': {'queue': 'cpu'},
+    'core.tasks.run_stock_prediction_telegram': {'queue': 'cpu'},
+}
+CELERY_IO_CONCURRENCY = int(os.getenv('CELERY_IO_CONCURRENCY', '32'))
+# 0 uses one process per CPU core
+CELERY_CPU_CONCURRENCY = int(os.getenv('CELERY_CPU_CONCURRENCY', '0'))
+# Workers reserve one message per slot rather than four, and cpu tasks are
+# acknowledged when they finish so a busy process reserves nothing more: the
+# backlog stays in the broker queues, where the fair-queue dispatcher sees it
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ANNOTATIONS = {
+    name: {'acks_late': True} for name, route in CELERY_TASK_ROUTES.items() if route['queue'] == 'cpu'
+}
+
+# Tickers per predict_batch task of a bulk prediction
+BULK_PREDICTION_BATCH_SIZE = int(os.getenv('BULK_PREDICTION_BATCH_SIZE', '25'))
+
+# Admission control: over either limit of its channel a new prediction is
+# served from the cache if possible, otherwise rejected with a retry hint.
+# Queued counts messages waiting on ADMISSION_QUEUES, in flight counts
+# predictions running in cpu workers or web processes; 0 disables a limit
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'True') == 'True'
+ADMISSION_QUEUES = ['cpu']
+ADMISSION_LIMITS = {
+    'api': {
+        'max_queued': int(os.getenv('ADMISSION_API_MAX_QUEUED', '200')),
+        'max_in_flight': int(os.getenv('ADMISSION_API_MAX_IN_FLIGHT', '64')),
+    },
+    'telegram': {
+        'max_queued': int(os.getenv('ADMISSION_TELEGRAM_MAX_QUEUED', '100')),
+        'max_in_flight': int(os.getenv('ADMISSION_TELEGRAM_MAX_IN_FLIGHT', '48')),
+    },
+}
+ADMISSION_CACHE_SECONDS = float(os.getenv('ADMISSION_CACHE_SECONDS', '2'))
+ADMISSION_IN_FLIGHT_TTL = int(os.getenv('ADMISSION_IN_FLIGHT_TTL', '600'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '30'))
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv('ADMISSION_MAX_RETRY_AFTER', '300'))
+
+# Fair queuing in front of Celery: per-tenant queues served by deficit round
+# robin, in strict priority order of the tiers. The dispatcher
+# (`manage.py startcelery --role dispatcher`, part of `all`) keeps at most
+# FAIR_QUEUE_MAX_DISPATCHED messages waiting on FAIR_QUEUE_BROKER_QUEUES, so a
+# job at the head of its round starts after at most FAIR_QUEUE_MAX_DISPATCHED
+# plus CELERY_IO_CONCURRENCY (messages reserved by busy io threads) others
+FAIR_QUEUE_ENABLED = os.getenv('FAIR_QUEUE_ENABLED', 'True') == 'True'
+FAIR_QUEUE_TIERS = ['api', 'telegram', 'batch']
+FAIR_QUEUE_BROKER_QUEUES = ['io', 'cpu']
+FAIR_QUEUE_MAX_DISPATCHED = int(os.getenv('FAIR_QUEUE_MAX_DISPATCHED', '8'))
+FAIR_QUEUE_QUANTUM = int(os.getenv('FAIR_QUEUE_QUANTUM', '1'))
+# Relative shares of tenants within their tier, e.g. "user:42=3,telegram:1001=2";
+# tenants not listed have weight 1
+FAIR_QUEUE_WEIGHTS = {
+    tenant.strip(): int(weight)
+    for tenant, weight in (
+        item.rsplit('=', 1) for item in os.getenv('FAIR_QUEUE_WEIGHTS', '').split(',') if item.strip()
+    )
+}
+# Seconds a dispatcher may hold the dispatch lock; keep above the broker's
+# publish retry time
+FAIR_QUEUE_LOCK_TIMEOUT = int(os.getenv('FAIR_QUEUE_LOCK_TIMEOUT', '30'))
+FAIR_QUEUE_POLL_INTERVAL = float(os.getenv('FAIR_QUEUE_POLL_INTERVAL', '0.2'))
+
+# Pre-market cache warming (needs celery beat: `manage.py startcelery --beat`).
+# Between CACHE_WARM_START and MARKET_OPEN_TIME (MARKET_TIMEZONE) the watchlist
+# and the most requested tickers of the last CACHE_WARM_LOOKBACK_DAYS are
+# predicted, at most CACHE_WARM_CONCURRENCY at a time
+CELERY_BEAT_SCHEDULE = {
+    'warm-prediction-cache': {
+        'task': 'core.tasks.warm_prediction_cache',
+        'schedule': crontab(minute='*/30', day_of_week='mon-fri'),
+    },
+}
+CACHE_WARM_START = os.getenv('CACHE_WARM_START', '06:00')
+CACHE_WARM_WATCHLIST = os.getenv('CACHE_WARM_WATCHLIST', '')
+CACHE_WARM_MAX_TICKERS = int(os.getenv('CACHE_WARM_MAX_TICKERS', '50'))
+CACHE_WARM_LOOKBACK_DAYS = int(os.getenv('CACHE_WARM_LOOKBACK_DAYS', '7'))
+CACHE_WARM_CONCURRENCY = int(os.getenv('CACHE_WARM_CONCURRENCY', '2'))
+
+# Redis used for the cache and for prediction progress pub/sub
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
+
 # Cache for rate limiting
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': 'redis://localhost:6379/1',
+        'LOCATION': REDIS_URL,
     }
 }
+
+# Server-sent events: keepalive interval and maximum stream duration (seconds)
+SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+SSE_MAX_DURATION = int(os.getenv('SSE_MAX_DURATION', '600'))
+
+# Page size of the prediction list (?page_size= up to the maximum)
+PREDICTIONS_PAGE_SIZE = int(os.getenv('PREDICTIONS_PAGE_SIZE', '50'))
+PREDICTIONS_MAX_PAGE_SIZE = int(os.getenv('PREDICTIONS_MAX_PAGE_SIZE', '500'))
+
+# Upper bound for ?points= on the prediction series endpoint
+SERIES_MAX_POINTS = int(os.getenv('SERIES_MAX_POINTS', '5000'))
+
+# Prometheus /metrics/; set PROMETHEUS_MULTIPROC_DIR in the environment of every
+# process when running more than one (web workers, bot, Celery prefork)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
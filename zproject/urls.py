@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
-from core.views import HealthCheckView
+from core.views import HealthCheckView, MetricsView
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/', include('core.urls')),
     
     path('healthz/', HealthCheckView.as_view(), name='healthz'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('test/', TemplateView.as_view(template_name='test.html'), name='test_template'),
     path('register/', TemplateView.as_view(template_name='register.html'), name='register'),
     path('login/', TemplateView.as_view(template_name='login.html'), name='login'),
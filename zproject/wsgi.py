@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zproject.settings')
 
 application = get_wsgi_application()
+
+# Warm up the prediction model once the app registry is ready
+from django.conf import settings  # noqa: E402
+from core.services.model_registry import warm_up_safely  # noqa: E402
+
+if settings.WEB_MODEL_WARMUP:
+    warm_up_safely()